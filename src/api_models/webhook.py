@@ -1,10 +1,17 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
+
+from db.models.models import WebhookCompression
 
 
 class MatchStatsWebhookPayload(BaseModel):
     url: str
     active: bool
     expected_steam_ids: list[str]
+    batch_window: float | None = Field(default=None, gt=0)
+    batch_max_events: int | None = Field(default=None, gt=0)
+    compression: WebhookCompression | None = None
+    slim_payload: bool = False
+    delta_players: bool = False
 
 class PlayerStatWebhookRequestBody(BaseModel):
     player_steam_ids: list[str]
\ No newline at end of file
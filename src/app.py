@@ -4,15 +4,25 @@ from logging.config import dictConfig
 from fastapi import FastAPI
 
 from conf.logging import LOGGING_CONFIG
+from db import get_mongo_db
 from db.managers.base import NotFoundError
+from db.managers.managers import ensure_all_indexes
 from middlewares import APIKeyMiddleware, ExceptionMiddleware
 from routes import prepare_routes
+from utils.http import HTTPClientPool
+
+
+@asynccontextmanager
+async def lifespan(_: FastAPI):
+    await ensure_all_indexes(get_mongo_db())
+    yield
+    await HTTPClientPool.close_all()
 
 
 def prepare_app() -> FastAPI:
     dictConfig(LOGGING_CONFIG)
 
-    fastapi_app = FastAPI()
+    fastapi_app = FastAPI(lifespan=lifespan)
 
     fastapi_app.add_middleware(
         ExceptionMiddleware,
@@ -0,0 +1,115 @@
+# Drives run_demo_parsing against benchmarks.stand_ins and reports per-stage latency.
+# Needs the API env (Mongo, Redis) and running celery workers pointed at the stand-ins.
+# Creates real matches in the configured database: use a dev database.
+# Compare worker layouts by total throughput (the "completed" line): run it once against the combined
+# `celery` target, once against `celery-io` + `celery-cpu`, with the same --matches and --rate.
+import argparse
+import asyncio
+import time
+import uuid
+
+import aiohttp
+
+from benchmarks.stand_ins import StandInServer
+from components.parsing.parser import CS2DemoInfoParser
+from components.runner.parsing_runner import run_demo_parsing
+from db import get_mongo_db
+from db.managers.managers import WebhookManager
+from db.models.models import Webhook
+
+STAGES = [
+    ("queued", "dispatched", "demo_url_requested"),
+    ("demo_url", "demo_url_requested", "demo_url_resolved"),
+    ("to_download", "demo_url_resolved", "download_started"),
+    ("download", "download_started", "download_finished"),
+    ("parse_rank_webhook", "download_finished", "webhook_received"),
+    ("end_to_end", "dispatched", "webhook_received"),
+]
+
+
+def _percentile(values: list[float], q: float) -> float:
+    values = sorted(values)
+    return values[min(int(len(values) * q), len(values) - 1)]
+
+
+async def _register_webhook(stand_in_url: str, demo_file: str) -> Webhook:
+    expected_steam_ids = CS2DemoInfoParser(demo_file).get_match().player_steam_ids
+
+    return await WebhookManager(get_mongo_db()).create({
+        "url": f"{stand_in_url}/webhook/load-test-{uuid.uuid4().hex[:8]}/",
+        "active": True,
+        "expected_steam_ids": expected_steam_ids,
+    })
+
+
+async def run(stand_in_url: str, demo_file: str, matches: int, rate: float, timeout: float) -> None:
+    async with aiohttp.ClientSession() as session:
+        await session.post(f"{stand_in_url}/_stand_in/reset/")
+
+        webhook = await _register_webhook(stand_in_url, demo_file)
+        run_id = uuid.uuid4().hex
+        match_codes = [StandInServer.make_match_code(f"{run_id}:{i}") for i in range(matches)]
+        dispatched: dict[str, float] = {}
+
+        try:
+            started = time.time()
+            for match_code in match_codes:
+                dispatched[match_code] = time.time()
+                await run_demo_parsing(match_code)
+                await asyncio.sleep(1 / rate)
+
+            deadline = time.monotonic() + timeout
+            while True:
+                async with session.get(f"{stand_in_url}/_stand_in/events/") as resp:
+                    events: dict[str, dict[str, float]] = await resp.json()
+
+                completed = [code for code in match_codes if "webhook_received" in events.get(code, {})]
+                if len(completed) == len(match_codes) or time.monotonic() > deadline:
+                    break
+                await asyncio.sleep(1)
+
+            async with session.get(f"{stand_in_url}/_stand_in/counters/") as resp:
+                counters = await resp.json()
+
+        finally:
+            await WebhookManager(get_mongo_db()).delete(id_=webhook.id)
+
+    for match_code in match_codes:
+        events.setdefault(match_code, {})["dispatched"] = dispatched[match_code]
+
+    finished_at = max((events[code]["webhook_received"] for code in completed), default=time.time())
+    print(f"completed: {len(completed)}/{len(match_codes)} matches in {finished_at - started:.1f}s "
+          f"({len(completed) / max(finished_at - started, 1e-9):.2f} matches/s)")
+
+    for stage, start_event, end_event in STAGES:
+        durations = [
+            events[code][end_event] - events[code][start_event]
+            for code in match_codes
+            if start_event in events[code] and end_event in events[code]
+        ]
+        if not durations:
+            print(f"{stage:>20}: no samples")
+            continue
+        print(
+            f"{stage:>20}: n={len(durations)} p50={_percentile(durations, 0.5):.3f}s "
+            f"p95={_percentile(durations, 0.95):.3f}s max={max(durations):.3f}s"
+        )
+
+    for service, service_counters in counters.items():
+        print(f"{service:>20}: {dict(service_counters)}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Parsing pipeline load test against local stand-ins")
+    parser.add_argument("--stand-in-url", default="http://localhost:9000")
+    parser.add_argument("--demo-file", required=True, help="Same demo file the stand-in serves")
+    parser.add_argument("--matches", type=int, default=50)
+    parser.add_argument("--rate", type=float, default=5, help="Pipelines dispatched per second")
+    parser.add_argument("--timeout", type=float, default=600)
+    args = parser.parse_args()
+
+    asyncio.run(run(args.stand_in_url, args.demo_file, args.matches, args.rate, args.timeout))
+
+
+if __name__ == "__main__":
+    main()
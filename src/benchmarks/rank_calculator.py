@@ -0,0 +1,62 @@
+import argparse
+import time
+
+import numpy as np
+
+from components.ranking.rank_updater import PlayerRankCalculator
+from components.ranking.rating import RATING_RULES, get_rating_rule
+from db.models.models import Player, PlayerMatchStat
+
+
+def _generate_rows(rows: int, seed: int) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    rng = np.random.default_rng(seed)
+    current_ranks = rng.integers(-2, 12, size=rows)
+    kills = rng.poisson(16, size=rows)
+    deaths = rng.poisson(16, size=rows)
+
+    return current_ranks, kills, deaths
+
+
+def bench_batch(current_ranks: np.ndarray, kills: np.ndarray, deaths: np.ndarray, rule_name: str) -> float:
+    rule = get_rating_rule(rule_name)
+    started = time.perf_counter()
+    PlayerRankCalculator.calculate_ranks(current_ranks, kills, deaths, rule=rule)
+
+    return time.perf_counter() - started
+
+
+def bench_single(current_ranks: np.ndarray, kills: np.ndarray, deaths: np.ndarray) -> float:
+    pairs = [
+        (
+            Player(steam_id=str(i), display_name="", rank=int(current_ranks[i])),
+            PlayerMatchStat(player_steam_id=str(i), cs2_match_id=0, kills=int(kills[i]), deaths=int(deaths[i]), assists=0),
+        )
+        for i in range(len(current_ranks))
+    ]
+    started = time.perf_counter()
+    for player, match_stat in pairs:
+        PlayerRankCalculator.calculate_player_rank_change(player, match_stat)
+
+    return time.perf_counter() - started
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="PlayerRankCalculator batch vs single-row benchmark")
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--single-rows", type=int, default=100_000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    current_ranks, kills, deaths = _generate_rows(args.rows, args.seed)
+
+    for rule_name in RATING_RULES:
+        elapsed = bench_batch(current_ranks, kills, deaths, rule_name)
+        print(f"batch[{rule_name}]: {args.rows} rows in {elapsed:.4f}s ({args.rows / elapsed:,.0f} rows/s)")
+
+    single_rows = min(args.single_rows, args.rows)
+    elapsed = bench_single(current_ranks[:single_rows], kills[:single_rows], deaths[:single_rows])
+    print(f"single: {single_rows} rows in {elapsed:.4f}s ({single_rows / elapsed:,.0f} rows/s)")
+
+
+if __name__ == "__main__":
+    main()
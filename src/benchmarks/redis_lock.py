@@ -0,0 +1,66 @@
+import argparse
+import asyncio
+import random
+import time
+import uuid
+
+from utils.concurrency import RedisLock
+
+
+async def run(contenders: int, hold_ms: float, ttl: int) -> None:
+    key = f"benchmark-lock-{uuid.uuid4().hex}"
+    holders = 0
+    max_holders = 0
+    fencing_tokens: list[int] = []
+    waits: list[float] = []
+
+    async def contender() -> None:
+        nonlocal holders, max_holders
+        lock = RedisLock(key, ttl=ttl, timeout=max(contenders, 60))
+        started = time.monotonic()
+        async with lock:
+            waits.append(time.monotonic() - started)
+            fencing_tokens.append(lock.fencing_token)
+            holders += 1
+            max_holders = max(max_holders, holders)
+            await asyncio.sleep(random.uniform(0, hold_ms) / 1000)
+            holders -= 1
+
+    started = time.monotonic()
+    await asyncio.gather(*[contender() for _ in range(contenders)])
+    elapsed = time.monotonic() - started
+
+    waits.sort()
+    print(f"contenders: {contenders}, total: {elapsed:.2f}s, handoffs/s: {contenders / elapsed:,.0f}")
+    print(f"max concurrent holders: {max_holders}")
+    print(f"fencing tokens unique and increasing: {fencing_tokens == sorted(set(fencing_tokens))}")
+    print(f"wait p50: {waits[len(waits) // 2]:.3f}s, p99: {waits[int(len(waits) * 0.99)]:.3f}s")
+
+    assert max_holders == 1, "mutual exclusion violated"
+
+
+def use_fake_redis(max_connections: int) -> None:
+    # dev dependency group: uv sync --group dev
+    import fakeredis
+    import redis_client
+
+    redis_client._redis_client = fakeredis.FakeAsyncRedis(decode_responses=True, max_connections=max_connections)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="RedisLock contention stress test against the configured Redis")
+    parser.add_argument("--contenders", type=int, default=500)
+    parser.add_argument("--hold-ms", type=float, default=5)
+    parser.add_argument("--ttl", type=int, default=10)
+    parser.add_argument("--fake-redis", action="store_true", help="Run against an in-process fakeredis server")
+    args = parser.parse_args()
+
+    if args.fake_redis:
+        # every waiter holds a connection while blocked in BLPOP
+        use_fake_redis(max_connections=args.contenders * 2)
+
+    asyncio.run(run(args.contenders, args.hold_ms, args.ttl))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,245 @@
+# Local stand-ins for the Steam Web API, the steam connector, demo file hosting and webhook receivers.
+#
+#   python -m benchmarks.stand_ins --port 9000 --demo-file demos/sample.dem
+#
+# and point the API / workers at it:
+#
+#   STEAM_API_BASE_URL=http://localhost:9000 STEAM_API_KEY=stand-in
+#   STEAM_CONNECTOR_HOST=localhost STEAM_CONNECTOR_PORT=9000
+import argparse
+import asyncio
+import hashlib
+import json
+import logging
+import random
+import time
+from collections import defaultdict
+from pathlib import Path
+
+from aiohttp import web
+from pydantic import BaseModel
+
+logger = logging.getLogger(__name__)
+
+
+class ServiceBehaviour(BaseModel):
+    latency_ms: float = 50
+    jitter_ms: float = 20
+    error_rate: float = 0
+    rate_limit: float | None = None  # requests per second before answering 429
+    retry_after: float = 1
+    bandwidth: int | None = None  # bytes per second, demo host only
+
+
+class StandInConfig(BaseModel):
+    steam_api: ServiceBehaviour = ServiceBehaviour()
+    connector: ServiceBehaviour = ServiceBehaviour(latency_ms=500, jitter_ms=200)
+    demo_host: ServiceBehaviour = ServiceBehaviour(latency_ms=20, jitter_ms=5, bandwidth=50 * 1024 * 1024)
+    webhook: ServiceBehaviour = ServiceBehaviour(latency_ms=30, jitter_ms=10)
+
+    history_length: int = 5
+    demo_file: str | None = None
+
+
+class _RateWindow:
+
+    def __init__(self):
+        self.window_started = time.monotonic()
+        self.count = 0
+
+    def allow(self, rate_limit: float | None) -> bool:
+        if rate_limit is None:
+            return True
+
+        now = time.monotonic()
+        if now - self.window_started >= 1:
+            self.window_started = now
+            self.count = 0
+
+        self.count += 1
+        return self.count <= rate_limit
+
+
+class StandInServer:
+
+    def __init__(self, config: StandInConfig):
+        self.config = config
+        self.events: dict[str, dict[str, float]] = defaultdict(dict)
+        self.counters: dict[str, dict[str, int]] = defaultdict(lambda: defaultdict(int))
+        self.webhooks_received: list[dict] = []
+
+        self._rate_windows: dict[str, _RateWindow] = defaultdict(_RateWindow)
+        self._history_positions: dict[str, dict[str, int]] = defaultdict(dict)
+
+    def build_app(self) -> web.Application:
+        app = web.Application()
+        app.add_routes([
+            web.get("/ISteamUser/GetPlayerSummaries/v2/", self.get_player_summaries),
+            web.get("/ICSGOPlayers_730/GetNextMatchSharingCode/v1/", self.get_next_match_sharing_code),
+            web.get("/api/cs2/demo/", self.get_demo_info),
+            web.get("/api/steam/login_info/", self.get_login_info),
+            web.get("/demos/{match_code}.dem", self.get_demo_file),
+            web.post("/webhook/{name}/", self.receive_webhook),
+            web.get("/_stand_in/events/", self.get_events),
+            web.get("/_stand_in/counters/", self.get_counters),
+            web.post("/_stand_in/reset/", self.reset),
+        ])
+        return app
+
+    async def _behave(self, service: str, behaviour: ServiceBehaviour) -> web.Response | None:
+        self.counters[service]["requests"] += 1
+
+        delay = max(behaviour.latency_ms + random.uniform(-behaviour.jitter_ms, behaviour.jitter_ms), 0)
+        await asyncio.sleep(delay / 1000)
+
+        if not self._rate_windows[service].allow(behaviour.rate_limit):
+            self.counters[service]["throttled"] += 1
+            return web.json_response(
+                {"error": "rate limited"},
+                status=429,
+                headers={"Retry-After": str(behaviour.retry_after)},
+            )
+
+        if random.random() < behaviour.error_rate:
+            self.counters[service]["errors"] += 1
+            return web.json_response({"error": "stand-in failure"}, status=500)
+
+        return None
+
+    async def get_player_summaries(self, request: web.Request) -> web.Response:
+        if failure := await self._behave("steam_api", self.config.steam_api):
+            return failure
+
+        steam_ids = [sid for sid in request.query.get("steamids", "").split(",") if sid]
+        players = [
+            {
+                "steamid": steam_id,
+                "personaname": f"stand-in-{steam_id[-4:]}",
+                "profileurl": f"https://steamcommunity.com/profiles/{steam_id}/",
+                "avatarfull": f"https://avatars.example/{steam_id}.jpg",
+            }
+            for steam_id in steam_ids
+        ]
+        return web.json_response({"response": {"players": players}})
+
+    async def get_next_match_sharing_code(self, request: web.Request) -> web.Response:
+        if failure := await self._behave("steam_api", self.config.steam_api):
+            return failure
+
+        steam_id = request.query.get("steamid", "")
+        known_code = request.query.get("knowncode", "")
+        positions = self._history_positions[steam_id]
+
+        position = positions.get(known_code, 0)
+        if position >= self.config.history_length:
+            return web.json_response({"result": {"nextcode": "n/a"}})
+
+        next_code = self.make_match_code(f"{steam_id}:{known_code}")
+        positions[next_code] = position + 1
+        return web.json_response({"result": {"nextcode": next_code}})
+
+    async def get_demo_info(self, request: web.Request) -> web.Response:
+        match_code = request.query.get("match_code", "")
+        self.events[match_code]["demo_url_requested"] = time.time()
+
+        if failure := await self._behave("connector", self.config.connector):
+            return failure
+
+        match_id = int(hashlib.sha1(match_code.encode()).hexdigest()[:12], 16)
+        self.events[match_code]["demo_url_resolved"] = time.time()
+        return web.json_response({
+            "match_code": match_code,
+            "match_id": match_id,
+            "outcome_id": match_id,
+            "token": 0,
+            "demo_url": f"{request.url.origin()}/demos/{match_code}.dem",
+        })
+
+    async def get_login_info(self, request: web.Request) -> web.Response:
+        if failure := await self._behave("connector", self.config.connector):
+            return failure
+
+        return web.json_response({"username": "stand-in"})
+
+    async def get_demo_file(self, request: web.Request) -> web.StreamResponse:
+        match_code = request.match_info["match_code"]
+        self.events[match_code]["download_started"] = time.time()
+
+        if failure := await self._behave("demo_host", self.config.demo_host):
+            return failure
+
+        if not self.config.demo_file:
+            return web.json_response({"error": "no --demo-file configured"}, status=404)
+
+        demo_path = Path(self.config.demo_file)
+        response = web.StreamResponse(headers={
+            "Content-Type": "application/octet-stream",
+            "Content-Length": str(demo_path.stat().st_size),
+        })
+        await response.prepare(request)
+
+        chunk_size = 256 * 1024
+        bandwidth = self.config.demo_host.bandwidth
+        with demo_path.open("rb") as f:
+            while chunk := f.read(chunk_size):
+                await response.write(chunk)
+                if bandwidth:
+                    await asyncio.sleep(len(chunk) / bandwidth)
+
+        await response.write_eof()
+        self.events[match_code]["download_finished"] = time.time()
+        return response
+
+    async def receive_webhook(self, request: web.Request) -> web.Response:
+        received_at = time.time()
+        if failure := await self._behave("webhook", self.config.webhook):
+            return failure
+
+        body = await request.json()
+        match_code = (body.get("match") or {}).get("match_code")
+        if match_code:
+            self.events[match_code].setdefault("webhook_received", received_at)
+
+        self.counters["webhook"]["bytes"] += request.content_length or 0
+        return web.json_response({"ok": True})
+
+    async def get_events(self, _: web.Request) -> web.Response:
+        return web.json_response(self.events)
+
+    async def get_counters(self, _: web.Request) -> web.Response:
+        return web.json_response(self.counters)
+
+    async def reset(self, _: web.Request) -> web.Response:
+        self.events.clear()
+        self.counters.clear()
+        self._history_positions.clear()
+        return web.json_response({"ok": True})
+
+    @staticmethod
+    def make_match_code(seed: str) -> str:
+        digest = hashlib.sha1(seed.encode()).hexdigest().upper()
+        return "CSGO-" + "-".join(digest[i:i + 5] for i in range(0, 25, 5))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Local stand-ins for Steam API, steam connector, demo host and webhooks")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=9000)
+    parser.add_argument("--config", help="JSON file with StandInConfig overrides per service")
+    parser.add_argument("--demo-file", help="Demo served for every match code")
+    parser.add_argument("--history-length", type=int, help="Match codes returned per source before n/a")
+    args = parser.parse_args()
+
+    config_data = json.loads(Path(args.config).read_text()) if args.config else {}
+    config = StandInConfig.model_validate(config_data)
+    if args.demo_file:
+        config.demo_file = args.demo_file
+    if args.history_length is not None:
+        config.history_length = args.history_length
+
+    logging.basicConfig(level=logging.INFO)
+    web.run_app(StandInServer(config).build_app(), host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
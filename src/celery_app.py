@@ -1,14 +1,21 @@
 import asyncio
 import functools
 import logging
+import threading
+import time
 from logging.config import dictConfig
 from typing import Callable, Awaitable, TypeVar, Any, Coroutine, ParamSpec
 
-from asgiref.sync import async_to_sync
-from celery import Celery, signals
+import msgpack  # required by the msgpack serializer, fails at startup instead of on the first task
+from celery import Celery, signals, current_task
 
+from components.runner.metrics import TaskRunMetrics, start_metrics_exporter
+from conf.celery_worker import CELERY_TASK_SERIALIZER, CELERY_RESULT_EXPIRES, CELERY_METRICS_EXPORTER_PORT
 from conf.logging import LOGGING_CONFIG
 from conf.redis import RedisSettings
+from conf.webhook import WEBHOOK_DELIVERY_REQUEUE_INTERVAL
+from utils.cache import AsyncTTLCache
+from utils.http import HTTPClientPool
 
 
 dictConfig(LOGGING_CONFIG)
@@ -23,6 +30,33 @@ def _celery_worker_process_init(*args, **kwargs):
     dictConfig(LOGGING_CONFIG)
 
 
+@signals.worker_ready.connect()
+def _celery_worker_ready(*args, **kwargs):
+    if CELERY_METRICS_EXPORTER_PORT:
+        start_metrics_exporter(CELERY_METRICS_EXPORTER_PORT)
+
+
+@signals.before_task_publish.connect()
+def _celery_before_task_publish(*args, headers: dict | None = None, **kwargs):
+    # lets the worker measure how long the task waited in the queue
+    if headers is not None:
+        headers["enqueued_at"] = time.time()
+
+
+@signals.worker_shutdown.connect()
+@signals.worker_process_shutdown.connect()
+def _celery_worker_process_shutdown(*args, **kwargs):
+    # the threads pool never runs this on its worker threads, so every thread's loop is closed here
+    with _all_worker_loops_lock:
+        loops = list(_all_worker_loops)
+        _all_worker_loops.clear()
+
+    for loop in loops:
+        if not loop.is_closed():
+            loop.run_until_complete(HTTPClientPool.close_all())
+            loop.close()
+
+
 celery_app = Celery(
     "app",
     broker=RedisSettings.uri,
@@ -30,14 +64,58 @@ celery_app = Celery(
 )
 celery_app.conf.include = ["tasks"]
 
+# json stays accepted, so messages queued before the serializer switch are still consumed
+celery_app.conf.update(
+    task_serializer=CELERY_TASK_SERIALIZER,
+    result_serializer=CELERY_TASK_SERIALIZER,
+    accept_content=["json", "msgpack"],
+    result_accept_content=["json", "msgpack"],
+    result_expires=CELERY_RESULT_EXPIRES,
+)
+# run by the celery-beat image, picks up deliveries and batches whose worker message was lost
+celery_app.conf.beat_schedule = {
+    "requeue-webhook-deliveries": {
+        "task": "tasks.webhook.requeue_webhook_deliveries_task",
+        "schedule": WEBHOOK_DELIVERY_REQUEUE_INTERVAL,
+    },
+}
+
 
 T = TypeVar("T")
 P = ParamSpec("P")
 
+# one long-lived loop per worker thread, so pooled HTTP connections survive between tasks
+_worker_loops = threading.local()
+_all_worker_loops: list[asyncio.AbstractEventLoop] = []
+_all_worker_loops_lock = threading.Lock()
+
+
+def _get_worker_loop() -> asyncio.AbstractEventLoop:
+    loop = getattr(_worker_loops, "loop", None)
+    if loop is None or loop.is_closed():
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        _worker_loops.loop = loop
+        with _all_worker_loops_lock:
+            _all_worker_loops[:] = [known for known in _all_worker_loops if not known.is_closed()]
+            _all_worker_loops.append(loop)
+
+    return loop
+
+
+async def _run_task(func: Callable[P, Coroutine[Any, Any, T]], *args: P.args, **kwargs: P.kwargs) -> T:
+    try:
+        async with TaskRunMetrics(current_task).measure():
+            return await func(*args, **kwargs)
+    finally:
+        await HTTPClientPool.publish_stats()
+        await AsyncTTLCache.publish_stats()
+
+
 def async_context(func: Callable[P, Coroutine[Any, Any, T]]) -> Callable[P, T]:
     @functools.wraps(func)
     def wrapper(*args: P.args, **kwargs: P.kwargs) -> T:
 
-        return async_to_sync(func)(*args, **kwargs)
+        return _get_worker_loop().run_until_complete(_run_task(func, *args, **kwargs))
 
-    return wrapper
\ No newline at end of file
+    return wrapper
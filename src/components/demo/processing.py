@@ -1,19 +1,29 @@
 import logging
+import time
+from collections.abc import Callable
+from typing import Any, TypeVar
 
 from components.parsing.parser import CS2DemoInfoParser
+from components.ranking.player_stats import PlayerStatsUpdater
 from components.steam_connector.models import CS2DemoInfo
+from conf.ranking import RANKING_INCREMENTAL_STATS
 from db import get_database
+from db.managers.cache import match_cache, match_cache_keys
 from db.managers.managers import MatchManager, PlayerManager, PlayerMatchStatManager
-from db.models.models import Match
+from db.models.models import Match, PlayerMatchStat
 
 logger = logging.getLogger(__name__)
 
+T = TypeVar("T")
+
 class DemoProcessing:
     def __init__(self, demo_file_path: str, demo_info: CS2DemoInfo) -> None:
         self.demo_file_path = demo_file_path
-        self.parser = CS2DemoInfoParser(demo_file_path)
         self.demo_info = demo_info
         self.mongo_db = get_database()
+        # parser time only, the db writes in between are not counted
+        self.parse_seconds = 0.0
+        self.parser = self._parse(CS2DemoInfoParser, demo_file_path)
 
     async def process_demo(self) -> tuple[Match, bool]:
         match, created = await self._create_match()
@@ -23,7 +33,7 @@ class DemoProcessing:
         return match, created
 
     async def _create_match(self) -> tuple[Match, bool]:
-        match_info = self.parser.get_match()
+        match_info = self._parse(self.parser.get_match)
         match_id = self.demo_info.match_id
         match_manager = MatchManager(self.mongo_db)
 
@@ -38,6 +48,7 @@ class DemoProcessing:
                 "ct_score": match_info.ct_score,
                 "map_name": match_info.map_name,
                 "demo_info": self.demo_info.model_dump(),
+                "rolled_back_at": None,
             }
         )
 
@@ -45,13 +56,14 @@ class DemoProcessing:
             logger.info("DemoParsing: created match %s", match_id)
         else:
             logger.info("DemoParsing: updated match %s", match_id)
+            await match_cache.invalidate(*match_cache_keys(match))
 
         return match, created
 
     async def _create_players(self, match: Match) -> None:
         player_manager = PlayerManager(self.mongo_db)
         for player_steam_id in match.player_steam_ids:
-            player_info = self.parser.get_player_info(player_steam_id)
+            player_info = self._parse(self.parser.get_player_info, player_steam_id)
             player, created = await player_manager.create_or_update(
                 search_by={
                     "steam_id": player_info.steam_id,
@@ -68,9 +80,14 @@ class DemoProcessing:
 
     async def _create_match_stats(self, match: Match) -> None:
         match_stat_manager = PlayerMatchStatManager(self.mongo_db)
+        stats_updater = PlayerStatsUpdater()
         match_id = match.cs2_match_id
 
-        for player_stat_info in self.parser.get_stats():
+        for player_stat_info in self._parse(self.parser.get_stats):
+            previous_stat: PlayerMatchStat | None = await match_stat_manager.get(
+                cs2_match_id=match_id,
+                player_steam_id=player_stat_info.steam_id,
+            )
             match_stat, created = await match_stat_manager.create_or_update(
                 search_by={
                     "cs2_match_id": match_id,
@@ -92,3 +109,12 @@ class DemoProcessing:
                     match_id,
                 )
 
+            if RANKING_INCREMENTAL_STATS:
+                await stats_updater.apply_match_stat(match_stat, previous=previous_stat)
+
+    def _parse(self, func: Callable[..., T], *args: Any) -> T:
+        started = time.perf_counter()
+        try:
+            return func(*args)
+        finally:
+            self.parse_seconds += time.perf_counter() - started
@@ -0,0 +1,89 @@
+import logging
+
+from components.ranking.models import LeaderboardMetric, LeaderboardEntry, LeaderboardPlayerPosition
+from conf.ranking import RANKING_LEADERBOARD_KEY_PREFIX
+from db import get_mongo_db
+from db.managers.managers import PlayerManager
+from db.models.models import Player
+from redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+
+class Leaderboard:
+
+    def __init__(self):
+        self.redis = get_redis()
+
+    @staticmethod
+    def key(metric: LeaderboardMetric) -> str:
+        return f"{RANKING_LEADERBOARD_KEY_PREFIX}:{metric.value}"
+
+    async def update_player(self, player: Player) -> None:
+        pipe = self.redis.pipeline(transaction=False)
+        for metric in LeaderboardMetric:
+            score = getattr(player, metric.value)
+            if score is None:
+                pipe.zrem(self.key(metric), player.steam_id)
+            else:
+                pipe.zadd(self.key(metric), {player.steam_id: float(score)})
+
+        await pipe.execute()
+
+    async def set_score(self, metric: LeaderboardMetric, steam_id: str, score: float | None) -> None:
+        if score is None:
+            await self.redis.zrem(self.key(metric), steam_id)
+            return
+
+        await self.redis.zadd(self.key(metric), {steam_id: float(score)})
+
+    async def top(self, metric: LeaderboardMetric, limit: int = 10) -> list[LeaderboardEntry]:
+        return await self.range(metric, start=0, stop=limit - 1)
+
+    async def range(self, metric: LeaderboardMetric, start: int = 0, stop: int = -1) -> list[LeaderboardEntry]:
+        members = await self.redis.zrevrange(self.key(metric), start, stop, withscores=True)
+
+        return [
+            LeaderboardEntry(steam_id=steam_id, score=score, position=start + i + 1)
+            for i, (steam_id, score) in enumerate(members)
+        ]
+
+    async def player_position(self, metric: LeaderboardMetric, steam_id: str) -> LeaderboardPlayerPosition | None:
+        pipe = self.redis.pipeline(transaction=False)
+        pipe.zrevrank(self.key(metric), steam_id)
+        pipe.zscore(self.key(metric), steam_id)
+        pipe.zcard(self.key(metric))
+        rank, score, total = await pipe.execute()
+
+        if rank is None:
+            return None
+
+        return LeaderboardPlayerPosition(
+            steam_id=steam_id,
+            score=score,
+            position=rank + 1,
+            total=total,
+            percentile=round(100 * (total - rank) / total, 2),
+        )
+
+    async def rebuild(self) -> int:
+        logger.info("Leaderboard: Rebuilding from players collection")
+        players: list[Player] = await PlayerManager(get_mongo_db()).list_()
+
+        pipe = self.redis.pipeline(transaction=True)
+        for metric in LeaderboardMetric:
+            tmp_key = f"{self.key(metric)}:rebuild"
+            scores = {
+                player.steam_id: float(getattr(player, metric.value))
+                for player in players
+                if getattr(player, metric.value) is not None
+            }
+            pipe.delete(tmp_key)
+            if scores:
+                pipe.zadd(tmp_key, scores)
+                pipe.rename(tmp_key, self.key(metric))
+            else:
+                pipe.delete(self.key(metric))
+
+        await pipe.execute()
+        return len(players)
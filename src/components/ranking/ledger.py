@@ -0,0 +1,74 @@
+import logging
+
+from db import get_database
+from db.managers.managers import MatchManager, PlayerManager, PlayerRankChangeManager
+from db.models.models import PlayerRankChange
+
+logger = logging.getLogger(__name__)
+
+
+class RankLedgerSequencer:
+
+    def __init__(self) -> None:
+        self.db = get_database()
+        self.match_manager = MatchManager(self.db)
+        self.player_manager = PlayerManager(self.db)
+        self.rank_change_manager = PlayerRankChangeManager(self.db)
+
+    async def resequence_all(self) -> int:
+        logger.info("RankLedgerSequencer: Resequencing rank ledger for all players")
+
+        docs = await self.match_manager.collection.find(
+            {"rolled_back_at": None},
+            projection={"cs2_match_id": 1},
+            sort=[("created", 1)],
+        ).to_list()
+        match_positions = {doc["cs2_match_id"]: position for position, doc in enumerate(docs)}
+
+        player_steam_ids: list[str] = await self.rank_change_manager.collection.distinct("player_steam_id")
+        for player_steam_id in player_steam_ids:
+            await self._resequence_player(player_steam_id, match_positions)
+
+        await self.rank_change_manager.ensure_indexes()
+        return len(player_steam_ids)
+
+    async def _resequence_player(self, player_steam_id: str, match_positions: dict[int, int]) -> None:
+        rank_changes: list[PlayerRankChange] = await self.rank_change_manager.list_(
+            filter_by={
+                "player_steam_id": player_steam_id,
+            },
+            sort=[("created", 1)],
+        )
+        rank_changes = await self._drop_duplicates(player_steam_id, rank_changes)
+        rank_changes.sort(key=lambda rank_change: match_positions.get(rank_change.cs2_match_id, len(match_positions)))
+
+        for sequence, rank_change in enumerate(rank_changes, start=1):
+            if rank_change.sequence == sequence:
+                continue
+            await self.rank_change_manager.update(
+                id_=rank_change.id,
+                patch={
+                    "sequence": sequence,
+                }
+            )
+
+        await self.player_manager.update(
+            search_by={
+                "steam_id": player_steam_id,
+            },
+            patch={
+                "rank_sequence": len(rank_changes),
+            }
+        )
+
+    async def _drop_duplicates(self, player_steam_id: str, rank_changes: list[PlayerRankChange]) -> list[PlayerRankChange]:
+        latest = {rank_change.cs2_match_id: rank_change for rank_change in rank_changes}
+        duplicate_ids = [rank_change.id for rank_change in rank_changes if latest[rank_change.cs2_match_id] is not rank_change]
+        if not duplicate_ids:
+            return rank_changes
+
+        logger.warning(
+            "RankLedgerSequencer: Dropping %s duplicate rank changes for player %s", len(duplicate_ids), player_steam_id
+        )
+        await self.rank_change_manager.delete_many(filter_by={"id": {"$in": duplicate_ids}})
+        return [rank_change for rank_change in rank_changes if latest[rank_change.cs2_match_id] is rank_change]
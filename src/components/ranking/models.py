@@ -1,5 +1,10 @@
+import hashlib
+import json
+
 from pydantic import BaseModel
 
+from utils.base_types import StringEnum
+
 
 class RankDescription(BaseModel):
     rank: int
@@ -63,4 +68,36 @@ RANK_DESCRIPTIONS = [
         rank=11,
         translate_ru="Паровоз",
     ),
-]
\ No newline at end of file
+]
+
+# slim webhook payloads reference the table by this version instead of inlining it
+RANK_DESCRIPTIONS_VERSION = hashlib.sha1(
+    json.dumps([description.model_dump() for description in RANK_DESCRIPTIONS], sort_keys=True).encode()
+).hexdigest()[:12]
+
+
+class RankDescriptionsVersion(BaseModel):
+    version: str
+    rank_descriptions: list[RankDescription]
+
+class LeaderboardMetric(StringEnum):
+    RANK = "rank"
+    AVG_KD = "avg_kd"
+    GAMES_PLAYED = "games_played"
+
+
+class LeaderboardEntry(BaseModel):
+    steam_id: str
+    score: float
+    position: int
+
+
+class LeaderboardPlayerPosition(LeaderboardEntry):
+    total: int
+    percentile: float
+
+
+class MatchRollbackResult(BaseModel):
+    cs2_match_id: int
+    reverted_steam_ids: list[str]
+    replayed_steam_ids: list[str]
@@ -1,9 +1,14 @@
 import asyncio
+import logging
 
+from components.ranking.leaderboard import Leaderboard
+from components.ranking.models import LeaderboardMetric
 from db import get_mongo_db
 from db.managers.managers import PlayerManager, PlayerMatchStatManager
 from db.models.models import Player, PlayerMatchStat
 
+logger = logging.getLogger(__name__)
+
 
 class PlayerStatsUpdater:
 
@@ -12,6 +17,7 @@ class PlayerStatsUpdater:
         self.db = get_mongo_db()
         self.player_manager = PlayerManager(self.db)
         self.player_stats_manager = PlayerMatchStatManager(self.db)
+        self.leaderboard = Leaderboard()
 
 
     async def calculate_players_stats(self, player_steam_ids: list[str]):
@@ -21,6 +27,93 @@ class PlayerStatsUpdater:
 
         await asyncio.gather(*tasks)
 
+    async def rebuild_all_players_stats(self) -> None:
+        logger.info("PlayerStatsUpdater: Rebuilding stats for all players")
+        player_steam_ids: list[str] = await self.player_manager.collection.distinct("steam_id")
+
+        await self.calculate_players_stats(player_steam_ids)
+
+    async def apply_match_stat(self, match_stat: PlayerMatchStat, previous: PlayerMatchStat | None = None) -> None:
+        await self._apply_delta(
+            player_steam_id=match_stat.player_steam_id,
+            kills_delta=match_stat.kills - (previous.kills if previous else 0),
+            deaths_delta=match_stat.deaths - (previous.deaths if previous else 0),
+            plus_kd_delta=int(match_stat.kills >= match_stat.deaths) - (
+                int(previous.kills >= previous.deaths) if previous else 0
+            ),
+            minus_kd_delta=int(match_stat.kills < match_stat.deaths) - (
+                int(previous.kills < previous.deaths) if previous else 0
+            ),
+            games_delta=0 if previous else 1,
+        )
+
+    async def revert_match_stat(self, match_stat: PlayerMatchStat) -> None:
+        await self._apply_delta(
+            player_steam_id=match_stat.player_steam_id,
+            kills_delta=-match_stat.kills,
+            deaths_delta=-match_stat.deaths,
+            plus_kd_delta=-int(match_stat.kills >= match_stat.deaths),
+            minus_kd_delta=-int(match_stat.kills < match_stat.deaths),
+            games_delta=-1,
+        )
+
+    async def _apply_delta(
+        self,
+        player_steam_id: str,
+        kills_delta: int,
+        deaths_delta: int,
+        plus_kd_delta: int,
+        minus_kd_delta: int,
+        games_delta: int,
+    ) -> None:
+        player: Player | None = await self.player_manager.increment(
+            search_by={
+                "steam_id": player_steam_id,
+                "kills_total": {"$ne": None},
+                "deaths_total": {"$ne": None},
+            },
+            inc={
+                "kills_total": kills_delta,
+                "deaths_total": deaths_delta,
+                "plus_kd_games": plus_kd_delta,
+                "minus_kd_games": minus_kd_delta,
+                "games_played": games_delta,
+            },
+        )
+
+        if not player:
+            # no running totals yet: build them once from stored match stats
+            logger.info(
+                "PlayerStatsUpdater: No running totals for player %s, rebuilding",
+                player_steam_id,
+            )
+            await self._calculate_for_player(player_steam_id)
+            return
+
+        avg_kd = self._avg_kd(player.kills_total, player.deaths_total)
+        res = await self.player_manager.collection.update_one(
+            {
+                "steam_id": player.steam_id,
+                "kills_total": player.kills_total,
+                "deaths_total": player.deaths_total,
+            },
+            {
+                "$set": {
+                    "avg_kd": avg_kd,
+                },
+            },
+        )
+        if res.matched_count:
+            await self._update_leaderboard(player.steam_id, avg_kd, player.games_played)
+
+    async def _update_leaderboard(self, player_steam_id: str, avg_kd: float, games_played: int) -> None:
+        await self.leaderboard.set_score(LeaderboardMetric.AVG_KD, player_steam_id, avg_kd)
+        await self.leaderboard.set_score(LeaderboardMetric.GAMES_PLAYED, player_steam_id, games_played)
+
+    @staticmethod
+    def _avg_kd(kills_total: int, deaths_total: int) -> float:
+        return kills_total / deaths_total if deaths_total else 0
+
 
     async def _calculate_for_player(self, player_steam_id: str):
         match_stats: list[PlayerMatchStat] = await self.player_stats_manager.list_(
@@ -43,18 +136,20 @@ class PlayerStatsUpdater:
                 minus_kd_games += 1
             games_played += 1
 
-        avg_kd = kills_total / deaths_total if deaths_total else 0
+        avg_kd = self._avg_kd(kills_total, deaths_total)
 
-        await self.player_manager.update(
+        player: Player | None = await self.player_manager.update(
             search_by={
                 "steam_id": player_steam_id,
             },
             patch={
                 "avg_kd": avg_kd,
+                "kills_total": kills_total,
+                "deaths_total": deaths_total,
                 "plus_kd_games": plus_kd_games,
                 "minus_kd_games": minus_kd_games,
                 "games_played": games_played,
             }
         )
-
-
+        if player:
+            await self._update_leaderboard(player_steam_id, avg_kd, games_played)
@@ -1,30 +1,48 @@
 import asyncio
 import logging
 
-from conf.ranking import RANKING_INITIAL_RANK, RANKING_MIN_RANK, RANKING_MAX_RANK
+import numpy as np
+
+from components.ranking.leaderboard import Leaderboard
+from components.ranking.models import LeaderboardMetric
+from components.ranking.rating import RatingRule, get_rating_rule
+from conf.ranking import RANKING_INITIAL_RANK, RANKING_MIN_RANK, RANKING_MAX_RANK, RANKING_RATING_RULE
 from db import get_database
+from db.managers.cache import match_cache
+from db.managers.loader import BatchLoader
 from db.managers.managers import MatchManager, PlayerMatchStatManager, PlayerManager, PlayerRankChangeManager
 from db.models.models import Match, Player, PlayerMatchStat
-from utils.math_utils import clamp
 
 logger = logging.getLogger(__name__)
 
 
 class PlayerRankCalculator:
+    rule: RatingRule = get_rating_rule(RANKING_RATING_RULE)
 
     @classmethod
     def calculate_player_rank_change(cls, player: Player, match_stat: PlayerMatchStat) -> tuple[int, int]:
         current_rank = player.rank or RANKING_INITIAL_RANK
 
-        kd_diff = match_stat.kills - match_stat.deaths
-        if kd_diff > 1:
-            new_rank = current_rank + 1
-        elif kd_diff < -1:
-            new_rank = current_rank - 1
-        else:
-            new_rank = current_rank
+        new_rank = cls.rule.calculate_one(current_rank, match_stat.kills, match_stat.deaths)
+
+        return current_rank, min(max(new_rank, RANKING_MIN_RANK), RANKING_MAX_RANK)
 
-        return current_rank, clamp(new_rank, RANKING_MIN_RANK, RANKING_MAX_RANK)
+    @classmethod
+    def calculate_ranks(
+        cls,
+        current_ranks: np.ndarray,
+        kills: np.ndarray,
+        deaths: np.ndarray,
+        rule: RatingRule | None = None,
+    ) -> np.ndarray:
+        rule = rule or cls.rule
+        new_ranks = rule.calculate(
+            np.asarray(current_ranks, dtype=np.int64),
+            np.asarray(kills, dtype=np.int64),
+            np.asarray(deaths, dtype=np.int64),
+        )
+
+        return np.clip(new_ranks, RANKING_MIN_RANK, RANKING_MAX_RANK)
 
 
 class RankUpdater:
@@ -36,6 +54,19 @@ class RankUpdater:
         self.player_manager = PlayerManager(self.db)
         self.player_stat_manager = PlayerMatchStatManager(self.db)
         self.rank_change_manager = PlayerRankChangeManager(self.db)
+        self.leaderboard = Leaderboard()
+
+        self.player_loader = BatchLoader(self.player_manager, key="steam_id")
+        self.player_stat_loader = BatchLoader(
+            self.player_stat_manager,
+            key="player_steam_id",
+            filter_by={"cs2_match_id": cs2_match_id},
+        )
+        self.rank_change_loader = BatchLoader(
+            self.rank_change_manager,
+            key="player_steam_id",
+            filter_by={"cs2_match_id": cs2_match_id},
+        )
 
 
     async def update_player_ranks(self, overwrite: bool = False) -> None:
@@ -52,20 +83,20 @@ class RankUpdater:
 
 
     async def _get_match(self) -> Match:
-        match = await self.match_manager.get(raise_not_found=True, cs2_match_id=self.cs2_match_id)
+        match = await match_cache.get(
+            ("cs2_match_id", self.cs2_match_id),
+            lambda: self.match_manager.get(raise_not_found=True, cs2_match_id=self.cs2_match_id),
+        )
 
         return match
 
     async def _update_player_rank(self, player_steam_id: str, overwrite: bool) -> None:
-        player: Player | None = await self.player_manager.get(steam_id=player_steam_id)
+        player: Player | None = await self.player_loader.load(player_steam_id)
         if not player:
             logger.error("RankUpdater: Player with steam id %s not exists in DB", player_steam_id)
             return
 
-        player_stat: PlayerMatchStat = await self.player_stat_manager.get(
-            cs2_match_id=self.cs2_match_id,
-            player_steam_id=player_steam_id,
-        )
+        player_stat: PlayerMatchStat | None = await self.player_stat_loader.load(player_steam_id)
         if not player_stat:
             logger.error(
                 "RankUpdater: Could not find match statistic for match = %s | player_steam_id = %s",
@@ -74,10 +105,7 @@ class RankUpdater:
             )
             return
 
-        existing_rank_change = await self.rank_change_manager.get(
-            cs2_match_id=self.cs2_match_id,
-            player_steam_id=player_steam_id,
-        )
+        existing_rank_change = await self.rank_change_loader.load(player_steam_id)
         if existing_rank_change and not overwrite:
             logger.warning(
                 "RankUpdater: Rank for player %s and match %s was already calculated. Skipping",
@@ -99,12 +127,18 @@ class RankUpdater:
         )
         logger.info("RankUpdater: Setting new rank for player %s to %s", player_steam_id, new_rank)
 
-        await self.player_manager.update(
-            id_=player.id,
+        player = await self.player_manager.increment(
+            search_by={
+                "id": player.id,
+            },
+            inc={
+                "rank_sequence": 1,
+            },
             patch={
                 "rank": new_rank,
             }
         )
+        await self.leaderboard.set_score(LeaderboardMetric.RANK, player_steam_id, new_rank)
         await self.rank_change_manager.create_or_update(
             search_by={
                 "player_steam_id": player_steam_id,
@@ -113,6 +147,7 @@ class RankUpdater:
             update={
                 "old_rank": old_rank,
                 "new_rank": new_rank,
+                "sequence": player.rank_sequence,
             }
         )
 
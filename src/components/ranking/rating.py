@@ -0,0 +1,61 @@
+from abc import ABC, abstractmethod
+from typing import ClassVar
+
+import numpy as np
+
+
+class RatingRule(ABC):
+    name: ClassVar[str]
+
+    @abstractmethod
+    def calculate(self, current_ranks: np.ndarray, kills: np.ndarray, deaths: np.ndarray) -> np.ndarray:
+        pass
+
+    @abstractmethod
+    def calculate_one(self, current_rank: int, kills: int, deaths: int) -> int:
+        pass
+
+
+class KDDiffRatingRule(RatingRule):
+    name = "kd_diff"
+    threshold: ClassVar[int] = 1
+
+    def calculate(self, current_ranks: np.ndarray, kills: np.ndarray, deaths: np.ndarray) -> np.ndarray:
+        kd_diff = kills - deaths
+        step = (kd_diff > self.threshold).astype(np.int64) - (kd_diff < -self.threshold).astype(np.int64)
+
+        return current_ranks + step
+
+    def calculate_one(self, current_rank: int, kills: int, deaths: int) -> int:
+        kd_diff = kills - deaths
+
+        return current_rank + int(kd_diff > self.threshold) - int(kd_diff < -self.threshold)
+
+
+class KDRatioRatingRule(RatingRule):
+    name = "kd_ratio"
+    promote_ratio: ClassVar[float] = 1.3
+    demote_ratio: ClassVar[float] = 0.7
+
+    def calculate(self, current_ranks: np.ndarray, kills: np.ndarray, deaths: np.ndarray) -> np.ndarray:
+        ratio = kills / np.maximum(deaths, 1)
+        step = (ratio >= self.promote_ratio).astype(np.int64) - (ratio <= self.demote_ratio).astype(np.int64)
+
+        return current_ranks + step
+
+    def calculate_one(self, current_rank: int, kills: int, deaths: int) -> int:
+        ratio = kills / max(deaths, 1)
+
+        return current_rank + int(ratio >= self.promote_ratio) - int(ratio <= self.demote_ratio)
+
+
+RATING_RULES: dict[str, type[RatingRule]] = {
+    rule.name: rule for rule in (KDDiffRatingRule, KDRatioRatingRule)
+}
+
+
+def get_rating_rule(name: str) -> RatingRule:
+    try:
+        return RATING_RULES[name]()
+    except KeyError:
+        raise ValueError(f"Unknown rating rule {name}") from None
@@ -0,0 +1,166 @@
+import asyncio
+import logging
+
+from components.ranking.leaderboard import Leaderboard
+from components.ranking.models import LeaderboardMetric, MatchRollbackResult
+from components.ranking.player_stats import PlayerStatsUpdater
+from components.ranking.rank_updater import PlayerRankCalculator
+from conf.ranking import RANKING_INCREMENTAL_STATS, RANKING_INITIAL_RANK
+from db import get_database
+from db.managers.cache import match_cache, match_cache_keys
+from db.managers.managers import MatchManager, PlayerMatchStatManager, PlayerManager, PlayerRankChangeManager
+from db.models.models import Match, Player, PlayerMatchStat, PlayerRankChange
+from utils.time_utils import utcnow
+
+logger = logging.getLogger(__name__)
+
+
+class MatchRollback:
+
+    def __init__(self, cs2_match_id: int) -> None:
+        self.cs2_match_id = cs2_match_id
+        self.db = get_database()
+        self.match_manager = MatchManager(self.db)
+        self.player_manager = PlayerManager(self.db)
+        self.player_stat_manager = PlayerMatchStatManager(self.db)
+        self.rank_change_manager = PlayerRankChangeManager(self.db)
+        self.stats_updater = PlayerStatsUpdater()
+        self.leaderboard = Leaderboard()
+
+    async def rollback(self) -> MatchRollbackResult:
+        logger.info("MatchRollback: Rolling back match %s", self.cs2_match_id)
+
+        match: Match = await self.match_manager.get(raise_not_found=True, cs2_match_id=self.cs2_match_id)
+        if match.rolled_back_at is not None:
+            raise ValueError(f"Match {self.cs2_match_id} is already rolled back")
+
+        rank_changes: list[PlayerRankChange] = await self.rank_change_manager.list_(
+            filter_by={
+                "cs2_match_id": self.cs2_match_id,
+            }
+        )
+
+        results = await asyncio.gather(*[
+            self._rollback_rank_change(rank_change) for rank_change in rank_changes
+        ])
+        await self._rollback_stats()
+
+        await self.rank_change_manager.delete_many(filter_by={"cs2_match_id": self.cs2_match_id})
+        await self.match_manager.update(
+            id_=match.id,
+            patch={
+                "rolled_back_at": utcnow(),
+            }
+        )
+        await match_cache.invalidate(*match_cache_keys(match))
+
+        replayed = {steam_id for steam_id, replayed in results if replayed}
+        return MatchRollbackResult(
+            cs2_match_id=self.cs2_match_id,
+            reverted_steam_ids=sorted({steam_id for steam_id, _ in results} - replayed),
+            replayed_steam_ids=sorted(replayed),
+        )
+
+    async def _rollback_rank_change(self, rank_change: PlayerRankChange) -> tuple[str, bool]:
+        player_steam_id = rank_change.player_steam_id
+        later_changes = await self._list_later_changes(rank_change)
+        rank = rank_change.old_rank if rank_change.old_rank is not None else RANKING_INITIAL_RANK
+
+        if later_changes:
+            logger.info(
+                "MatchRollback: Replaying %s later matches for player %s",
+                len(later_changes),
+                player_steam_id,
+            )
+            rank = await self._replay(player_steam_id, rank, later_changes)
+
+        await self.player_manager.update(
+            search_by={
+                "steam_id": player_steam_id,
+            },
+            patch={
+                "rank": rank,
+            }
+        )
+        await self.leaderboard.set_score(LeaderboardMetric.RANK, player_steam_id, rank)
+
+        return player_steam_id, bool(later_changes)
+
+    async def _list_later_changes(self, rank_change: PlayerRankChange) -> list[PlayerRankChange]:
+        unsequenced = await self.rank_change_manager.count(
+            filter_by={
+                "player_steam_id": rank_change.player_steam_id,
+                "sequence": {"$not": {"$gt": 0}},
+            }
+        )
+        if unsequenced:
+            # rows written before the ledger was sequenced, until RankLedgerSequencer has run
+            return await self.rank_change_manager.list_(
+                filter_by={
+                    "player_steam_id": rank_change.player_steam_id,
+                    "created": {"$gt": rank_change.created},
+                },
+                sort=[("created", 1)],
+            )
+
+        return await self.rank_change_manager.list_(
+            filter_by={
+                "player_steam_id": rank_change.player_steam_id,
+                "sequence": {"$gt": rank_change.sequence},
+            },
+            sort=[("sequence", 1)],
+        )
+
+    async def _replay(self, player_steam_id: str, rank: int, rank_changes: list[PlayerRankChange]) -> int:
+        match_stats: list[PlayerMatchStat] = await self.player_stat_manager.list_(
+            filter_by={
+                "player_steam_id": player_steam_id,
+                "cs2_match_id": {
+                    "$in": [rank_change.cs2_match_id for rank_change in rank_changes],
+                },
+            }
+        )
+        stats_by_match = {match_stat.cs2_match_id: match_stat for match_stat in match_stats}
+
+        for rank_change in rank_changes:
+            match_stat = stats_by_match.get(rank_change.cs2_match_id)
+            if not match_stat:
+                logger.error(
+                    "MatchRollback: Could not find match statistic for match = %s | player_steam_id = %s",
+                    rank_change.cs2_match_id,
+                    player_steam_id,
+                )
+                continue
+
+            old_rank, new_rank = PlayerRankCalculator.calculate_player_rank_change(
+                player=Player(steam_id=player_steam_id, display_name="", rank=rank),
+                match_stat=match_stat,
+            )
+            await self.rank_change_manager.update(
+                id_=rank_change.id,
+                patch={
+                    "old_rank": old_rank,
+                    "new_rank": new_rank,
+                }
+            )
+            rank = new_rank
+
+        return rank
+
+    async def _rollback_stats(self) -> None:
+        match_stats: list[PlayerMatchStat] = await self.player_stat_manager.list_(
+            filter_by={
+                "cs2_match_id": self.cs2_match_id,
+            }
+        )
+        await self.player_stat_manager.delete_many(filter_by={"cs2_match_id": self.cs2_match_id})
+
+        if not RANKING_INCREMENTAL_STATS:
+            await self.stats_updater.calculate_players_stats(
+                [match_stat.player_steam_id for match_stat in match_stats]
+            )
+            return
+
+        await asyncio.gather(*[
+            self.stats_updater.revert_match_stat(match_stat) for match_stat in match_stats
+        ])
@@ -0,0 +1,128 @@
+import asyncio
+import logging
+import time
+from collections.abc import Iterable
+from typing import Awaitable, Callable
+
+from components.runner.models import MatchSourceCursor, MatchHistoryCrawlResult
+from components.steam_connector.steam_api import SteamAPIClient
+from conf.steam_connector import STEAM_API_MAX_PARALLEL_CONNECTIONS
+from db import get_database
+from db.managers.managers import MatchSourceManager
+from db.models.models import MatchSource
+
+logger = logging.getLogger(__name__)
+
+
+class MatchHistoryCrawler:
+
+    def __init__(
+        self,
+        on_match_code: Callable[[MatchSourceCursor, str], Awaitable[None]] | None = None,
+        on_source_done: Callable[[MatchSourceCursor], Awaitable[None]] | None = None,
+        workers: int | None = None,
+    ) -> None:
+        self.on_match_code = on_match_code
+        self.on_source_done = on_source_done
+        self.workers = workers or STEAM_API_MAX_PARALLEL_CONNECTIONS
+        self.db = get_database()
+        self.source_manager = MatchSourceManager(self.db)
+
+        self._seen_codes: set[str] = set()
+        self._match_codes: list[str] = []
+        self._failed_sources = 0
+        self._checkpoint_lock = asyncio.Lock()
+
+    async def crawl(self, sources: list[MatchSource]) -> MatchHistoryCrawlResult:
+        started = time.monotonic()
+
+        # every step re-queues its source at the tail, so sources advance round-robin
+        queue: asyncio.Queue[MatchSourceCursor] = asyncio.Queue()
+        for source in sources:
+            queue.put_nowait(MatchSourceCursor(source=source, current_code=source.last_match_code))
+
+        workers = [
+            asyncio.create_task(self._worker(queue))
+            for _ in range(min(self.workers, len(sources)))
+        ]
+        try:
+            await queue.join()
+        finally:
+            for worker in workers:
+                worker.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+
+        result = MatchHistoryCrawlResult(
+            sources=len(sources),
+            failed_sources=self._failed_sources,
+            match_codes=self._match_codes,
+            elapsed=time.monotonic() - started,
+        )
+        logger.info(
+            "MatchHistoryCrawler: Found %s match codes from %s sources in %.2fs (%.2f codes/s)",
+            len(result.match_codes),
+            result.sources,
+            result.elapsed,
+            result.codes_per_second,
+        )
+        return result
+
+    async def _worker(self, queue: asyncio.Queue[MatchSourceCursor]) -> None:
+        # one client per worker: the Steam API semaphore slot is bound to the client
+        async with SteamAPIClient() as client:
+            while True:
+                cursor = await queue.get()
+                try:
+                    if await self._step(client, cursor):
+                        queue.put_nowait(cursor)
+                    elif self.on_source_done:
+                        await self.on_source_done(cursor)
+                except Exception as exc:
+                    self._failed_sources += 1
+                    logger.error("MatchHistoryCrawler: Failed to crawl source %s: %s", cursor.source.id, exc)
+                finally:
+                    queue.task_done()
+
+    async def _step(self, client: SteamAPIClient, cursor: MatchSourceCursor) -> bool:
+        source = cursor.source
+        next_code = await client.get_next_match_code(
+            player_steam_id=source.steam_id,
+            access_code=source.auth_code,
+            known_match_code=cursor.current_code,
+        )
+        if not next_code:
+            return False
+
+        cursor.match_codes.append(next_code)
+        cursor.current_code = next_code
+
+        if next_code in self._seen_codes or not self.on_match_code:
+            # a code another source already reported is checkpointed with that source's dispatch
+            await self.checkpoint(cursor, [next_code])
+        else:
+            self._seen_codes.add(next_code)
+            self._match_codes.append(next_code)
+            await self.on_match_code(cursor, next_code)
+
+        return True
+
+    async def checkpoint(self, cursor: MatchSourceCursor, match_codes: Iterable[str]) -> None:
+        # last_match_code only moves past codes the consumer has handed off,
+        # so an interrupted crawl resumes before anything that was still buffered
+        cursor.handled_codes.update(match_codes)
+
+        async with self._checkpoint_lock:
+            position = cursor.checkpointed
+            while position < len(cursor.match_codes) and cursor.match_codes[position] in cursor.handled_codes:
+                position += 1
+            if position == cursor.checkpointed:
+                return
+
+            patch = {
+                "last_match_code": cursor.match_codes[position - 1],
+            }
+            if not cursor.checkpointed:
+                patch["first_match_code"] = cursor.match_codes[0]
+
+            await self.source_manager.update(id_=cursor.source.id, patch=patch)
+            cursor.checkpointed = position
@@ -1,11 +1,13 @@
-import asyncio
 import logging
+from typing import Awaitable, Callable
 
-from components.steam_connector.steam_api import SteamAPIClient
+from components.runner.match_history_crawler import MatchHistoryCrawler
+from components.runner.models import MatchHistoryCrawlResult, ParsingDispatchResult, MatchSourceCursor, PipelineLane
+from components.steam_connector.demo_urls import DemoUrlResolver
+from conf.parsing import PARSING_LIVE_LANE_CODES, PARSING_BACKFILL_DISPATCH_CHUNK
 from db import get_database
 from db.managers.managers import MatchSourceManager, MatchManager
 from db.models.models import MatchSource
-from utils.concurrency import RedisLockException
 
 logger = logging.getLogger(__name__)
 
@@ -20,98 +22,119 @@ class MatchSourceCollector:
     async def rollback_all_sources(self):
         pass
 
-    async def collect_all_sources(self) -> None:
+    async def collect_all_sources(self, prefetch_demo_urls: bool = False) -> MatchHistoryCrawlResult:
         logger.info(f'MatchSourceCollector: Collecting all sources')
 
         sources = await self.source_manager.list_(filter_by={"active": True})
 
-        tasks = []
+        return await self._crawl(sources, prefetch_demo_urls)
 
-        async def _get_source_match_codes(source_: MatchSource) -> tuple[MatchSource, list[str]]:
-            try:
-                return source_, await self._get_source_match_codes(source_)
-            except Exception as exc:
-                logger.error("MatchSourceCollector: Failed to collect source %s: %s", source_, exc.args[0])
-                return source_, []
 
-
-        for source in sources:
-            tasks.append(
-                _get_source_match_codes(source)
-            )
-
-        results = await asyncio.gather(*tasks)
-        update_last_code_tasks = []
-        all_match_codes = []
-
-        for source, match_codes in results:
-            if not match_codes:
-                continue
-
-            update_last_code_tasks.append(
-                self._update_last_code(source, match_codes)
-            )
-            all_match_codes.extend(match_codes)
-
-        await asyncio.gather(*update_last_code_tasks)
-        await self._run_parsing_for_codes(all_match_codes)
-
-
-    async def collect_source(self, source: MatchSource | str) -> None:
+    async def collect_source(
+        self,
+        source: MatchSource | str,
+        prefetch_demo_urls: bool = False,
+    ) -> MatchHistoryCrawlResult | None:
         logger.info(f'MatchSourceCollector: Collecting from source: {source}')
         if not isinstance(source, MatchSource):
             source = await self.source_manager.get(id_=source, raise_not_found=True)
 
         if not source.active:
             logger.info(f'MatchSourceCollector: Source {source} not active, skipping')
-            return
+            return None
 
-        match_codes = await self._get_source_match_codes(source)
+        return await self._crawl([source], prefetch_demo_urls)
 
-        await asyncio.gather(
-            self._run_parsing_for_codes(match_codes),
-            self._update_last_code(source, match_codes),
+    async def _crawl(self, sources: list[MatchSource], prefetch_demo_urls: bool = False) -> MatchHistoryCrawlResult:
+        # without prefetch codes are dispatched while crawling, with it once their demo urls are resolved
+        dispatcher = CrawlDispatcher(dispatch_early=not prefetch_demo_urls)
+        crawler = MatchHistoryCrawler(
+            on_match_code=dispatcher.on_match_code,
+            on_source_done=dispatcher.on_source_done,
         )
+        dispatcher.on_dispatched = crawler.checkpoint
+        result = await crawler.crawl(sources)
+
+        if prefetch_demo_urls:
+            # resolve every new code up front so slow connector calls overlap here
+            # instead of each holding a parsing worker in request_demo_url_task
+            await DemoUrlResolver().resolve(result.match_codes)
+
+        result.dispatch = await dispatcher.finish()
+        return result
+
+
+class CrawlDispatcher:
+    # a source's newest codes of a crawl are live, anything older is its history being caught up
+
+    def __init__(
+        self,
+        dispatch_early: bool = True,
+        on_dispatched: Callable[[MatchSourceCursor, list[str]], Awaitable[None]] | None = None,
+    ):
+        self.dispatch_early = dispatch_early
+        self.on_dispatched = on_dispatched
+        self.result = ParsingDispatchResult()
+
+        self._cursors: dict[str, MatchSourceCursor] = {}
+        self._pending: dict[str, list[str]] = {}
+        self._lanes: dict[PipelineLane, list[str]] = {lane: [] for lane in PipelineLane}
+
+    async def on_match_code(self, cursor: MatchSourceCursor, match_code: str) -> None:
+        self._cursors[match_code] = cursor
+        pending = self._pending.setdefault(cursor.source.id, [])
+        pending.append(match_code)
+        if len(pending) > PARSING_LIVE_LANE_CODES:
+            await self._assign([pending.pop(0)], PipelineLane.BACKFILL)
+
+    async def on_source_done(self, cursor: MatchSourceCursor) -> None:
+        await self._assign(self._pending.pop(cursor.source.id, []), PipelineLane.LIVE)
+        if self.dispatch_early:
+            await self._flush(PipelineLane.BACKFILL)
+
+    async def finish(self) -> ParsingDispatchResult:
+        # sources that failed mid-crawl still have their newest codes pending
+        for source_id in list(self._pending):
+            await self._assign(self._pending.pop(source_id), PipelineLane.LIVE)
+
+        for lane in PipelineLane:
+            await self._flush(lane)
+
+        return self.result
+
+    async def _assign(self, match_codes: list[str], lane: PipelineLane) -> None:
+        self._lanes[lane].extend(match_codes)
+        if not self.dispatch_early:
+            return
 
-    @staticmethod
-    async def _get_source_match_codes(source: MatchSource) -> list[str]:
-        async with SteamAPIClient() as client:
-            match_codes = await client.get_match_history(
-                player_steam_id=source.steam_id,
-                access_code=source.auth_code,
-                known_match_code=source.last_match_code,
-            )
+        # backfill codes go out in chunks, one bulk dispatch per chunk instead of per code
+        if lane == PipelineLane.LIVE or len(self._lanes[lane]) >= PARSING_BACKFILL_DISPATCH_CHUNK:
+            await self._flush(lane)
 
-        return match_codes
+    async def _flush(self, lane: PipelineLane) -> None:
+        match_codes, self._lanes[lane] = self._lanes[lane], []
+        await self._dispatch(match_codes, lane)
 
+    async def _dispatch(self, match_codes: list[str], lane: PipelineLane) -> None:
+        from components.runner.parsing_runner import run_demo_parsing_bulk
 
-    async def _update_last_code(self, source: MatchSource, match_codes: list[str]) -> None:
         if not match_codes:
             return
 
-        last_match_code = match_codes[-1]
-        first_match_code = match_codes[0]
-        await self.source_manager.update(
-            id_=source.id,
-            patch={
-                "last_match_code": last_match_code,
-                "first_match_code": first_match_code,
-            }
-        )
+        result = await run_demo_parsing_bulk(match_codes, lane)
+        self.result.extend(result)
 
-    async def _run_parsing_for_codes(self, match_codes: list[str]) -> None:
-        from components.runner.parsing_runner import run_demo_parsing
-
-        if not match_codes:
-            return
-
-        match_codes = set(match_codes)  # deduplication
+        # codes dropped without a pipeline (connector logged out) stay behind the source checkpoint
+        handled = {*result.dispatched, *result.existing, *result.locked}
+        for cursor, codes in self._group_by_cursor(match_codes):
+            handled_codes = [code for code in codes if code in handled]
+            if self.on_dispatched and handled_codes:
+                await self.on_dispatched(cursor, handled_codes)
 
+    def _group_by_cursor(self, match_codes: list[str]) -> list[tuple[MatchSourceCursor, list[str]]]:
+        groups: dict[str, tuple[MatchSourceCursor, list[str]]] = {}
         for match_code in match_codes:
-            try:
-                await run_demo_parsing(match_code)
-            except RedisLockException:
-                logger.warning(
-                    "MatchSourceCollector: Parsing for match code %s already in progress, skipping",
-                    match_code
-                )
+            cursor = self._cursors.pop(match_code)
+            groups.setdefault(cursor.source.id, (cursor, []))[1].append(match_code)
+
+        return list(groups.values())
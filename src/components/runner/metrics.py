@@ -0,0 +1,140 @@
+import asyncio
+import logging
+import threading
+import time
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+from datetime import datetime
+
+from aiohttp import web
+from celery import Task
+from celery.exceptions import Retry
+
+from components.runner.models import PipelineLane
+from db.monitoring import count_db_commands
+from redis_client import get_redis
+from utils.metrics import RedisHistogramMetric, RedisCounterMetric, RedisMetric, SIZE_BUCKETS
+
+logger = logging.getLogger(__name__)
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# celery queues by lane, the redis broker keeps each one as a list under the queue name
+LANE_QUEUES = {
+    PipelineLane.LIVE: ("demo_io", "demo_parsing", "demo_collecting", "webhook_delivery"),
+    PipelineLane.BACKFILL: (PipelineLane.BACKFILL.queue("demo_io"), PipelineLane.BACKFILL.queue("demo_parsing")),
+}
+
+TASK_DURATION = RedisHistogramMetric(
+    "pvb_task_duration_seconds",
+    "Celery task run time by stage and outcome",
+    labels=("stage", "outcome"),
+)
+TASK_QUEUE_WAIT = RedisHistogramMetric(
+    "pvb_task_queue_wait_seconds",
+    "Time from enqueue (or eta) to task start",
+    labels=("stage",),
+)
+TASK_DB_COMMANDS = RedisHistogramMetric(
+    "pvb_task_db_commands",
+    "MongoDB commands sent per task run",
+    labels=("stage", "outcome"),
+    buckets=(1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 5000),
+)
+DEMO_DOWNLOAD_BYTES = RedisCounterMetric(
+    "pvb_demo_download_bytes_total",
+    "Bytes received from demo hosts",
+)
+DEMO_SIZE = RedisHistogramMetric(
+    "pvb_demo_size_bytes",
+    "Size of downloaded demos after decompression",
+    buckets=SIZE_BUCKETS,
+)
+DEMO_PARSE_DURATION = RedisHistogramMetric(
+    "pvb_demo_parse_seconds",
+    "Time spent in the demo parser, without db writes",
+)
+
+
+class QueueDepthMetric(RedisMetric):
+    type_ = "gauge"
+
+    async def _list_series(self) -> list[tuple[str, dict[str, str]]]:
+        # the broker lists are the series, nothing is recorded for them
+        return [
+            (queue, {"queue": queue, "lane": lane.value})
+            for lane, lane_queues in LANE_QUEUES.items()
+            for queue in lane_queues
+        ]
+
+    async def _render_series(self, key: str, labels: dict[str, str]) -> list[str]:
+        depth = await get_redis().llen(key)
+
+        return [f"{self.name}{self._format_labels(labels)} {depth}"]
+
+
+QUEUE_DEPTH = QueueDepthMetric(
+    "pvb_queue_depth",
+    "Tasks waiting in a celery queue, reserved ones not included",
+    labels=("queue", "lane"),
+)
+
+
+class TaskRunMetrics:
+
+    def __init__(self, task: Task | None) -> None:
+        self.stage = task.name.rsplit(".", 1)[-1] if task else "unknown"
+        self.request = task.request if task else None
+
+    @asynccontextmanager
+    async def measure(self) -> AsyncIterator[None]:
+        started = time.time()
+        await self._observe_queue_wait(started)
+
+        outcome = "success"
+        with count_db_commands() as db_commands:
+            try:
+                yield
+            except Retry:
+                outcome = "retry"
+                raise
+            except BaseException:
+                outcome = "failure"
+                raise
+            finally:
+                await TASK_DURATION.observe(time.time() - started, stage=self.stage, outcome=outcome)
+                await TASK_DB_COMMANDS.observe(sum(db_commands.values()), stage=self.stage, outcome=outcome)
+
+    async def _observe_queue_wait(self, started: float) -> None:
+        # enqueued_at is stamped on publish, see celery_app
+        enqueued_at = self.request.get("enqueued_at") if self.request else None
+        if not enqueued_at:
+            return
+
+        eta = self.request.get("eta")
+        if eta:
+            enqueued_at = max(enqueued_at, datetime.fromisoformat(eta).timestamp())
+
+        await TASK_QUEUE_WAIT.observe(max(started - enqueued_at, 0), stage=self.stage)
+
+
+def start_metrics_exporter(port: int) -> threading.Thread:
+    # every process writes its metrics to redis, so any process can serve all of them
+    async def metrics_handler(_: web.Request) -> web.Response:
+        body = await RedisMetric.render_all()
+        return web.Response(body=body.encode(), headers={"Content-Type": PROMETHEUS_CONTENT_TYPE})
+
+    async def serve() -> None:
+        app = web.Application()
+        app.router.add_get("/metrics", metrics_handler)
+
+        runner = web.AppRunner(app)
+        await runner.setup()
+        await web.TCPSite(runner, port=port).start()
+        logger.info("MetricsExporter: Serving /metrics on port %s", port)
+
+        await asyncio.Event().wait()
+
+    thread = threading.Thread(target=asyncio.run, args=(serve(),), name="metrics-exporter", daemon=True)
+    thread.start()
+    return thread
@@ -0,0 +1,45 @@
+from pydantic import BaseModel
+
+from db.models.models import MatchSource
+from utils.base_types import StringEnum
+
+
+class PipelineLane(StringEnum):
+    LIVE = "live"
+    BACKFILL = "backfill"
+
+    def queue(self, queue: str) -> str:
+        # live work keeps the stage's own queue, every other lane gets its own queue per stage
+        return queue if self == PipelineLane.LIVE else f"{queue}_{self.value}"
+
+
+class MatchSourceCursor(BaseModel):
+    source: MatchSource
+    current_code: str
+    match_codes: list[str] = []
+    # leading match_codes already written to the source as last_match_code
+    checkpointed: int = 0
+    handled_codes: set[str] = set()
+
+
+class ParsingDispatchResult(BaseModel):
+    dispatched: list[str] = []
+    existing: list[str] = []
+    locked: list[str] = []
+
+    def extend(self, other: "ParsingDispatchResult") -> None:
+        self.dispatched.extend(other.dispatched)
+        self.existing.extend(other.existing)
+        self.locked.extend(other.locked)
+
+
+class MatchHistoryCrawlResult(BaseModel):
+    sources: int
+    failed_sources: int
+    match_codes: list[str]
+    elapsed: float
+    dispatch: ParsingDispatchResult | None = None
+
+    @property
+    def codes_per_second(self) -> float:
+        return len(self.match_codes) / self.elapsed if self.elapsed else 0
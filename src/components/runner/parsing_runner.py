@@ -2,8 +2,11 @@ import logging
 
 import celery
 
+from components.runner.models import ParsingDispatchResult, PipelineLane
 from components.steam_connector.client import SteamConnectorClient
 from conf.parsing import PARSING_DEDUP_KEY_TTL
+from db import get_database
+from db.managers.managers import MatchManager
 from tasks.demo import DemoParsingContext, request_demo_url_task, download_demo_file_task, parse_demo_task, \
     rank_calculation_task, refresh_steam_profiles_task, send_webhooks_task
 from utils.concurrency import RedisLock
@@ -11,7 +14,7 @@ from utils.concurrency import RedisLock
 
 logger = logging.getLogger(__name__)
 
-async def run_demo_parsing(match_code: str):
+async def run_demo_parsing(match_code: str, lane: PipelineLane = PipelineLane.LIVE):
 
     logged_in = await SteamConnectorClient().is_connector_logged_in()
     if not logged_in:
@@ -24,22 +27,83 @@ async def run_demo_parsing(match_code: str):
     )
     parsing_lock = RedisLock(context.lock_key, ttl=PARSING_DEDUP_KEY_TTL)
     await parsing_lock.acquire(raise_locked=True)
+    context.lock_token = parsing_lock.token
 
     try:
-        chain = [
-            request_demo_url_task.s(context.model_dump()),
-            download_demo_file_task.s(),
-            parse_demo_task.s(),
-            rank_calculation_task.s(),
-            refresh_steam_profiles_task.s(),
-            send_webhooks_task.s(),
-        ]
-
-        workflow = celery.chain(*chain)
+        workflow = _build_workflow(context, lane)
         workflow.apply_async()
-        logger.info("run_demo_parsing: Run for match code %s", match_code)
+        logger.info("run_demo_parsing: Run for match code %s in %s lane", match_code, lane.value)
 
     except Exception as exc:
         logger.exception("run_demo_parsing: Failed with error", exc_info=exc)
         await parsing_lock.release()
 
+
+async def run_demo_parsing_bulk(
+    match_codes: list[str],
+    lane: PipelineLane = PipelineLane.LIVE,
+) -> ParsingDispatchResult:
+    match_codes = list(dict.fromkeys(match_codes))
+    result = ParsingDispatchResult()
+    if not match_codes:
+        return result
+
+    logged_in = await SteamConnectorClient().is_connector_logged_in()
+    if not logged_in:
+        logger.error("run_demo_parsing_bulk: steam connector not logged in. Aborting")
+        return result
+
+    docs = await MatchManager(get_database()).collection.find(
+        {"match_code": {"$in": match_codes}},
+        projection={"match_code": 1},
+    ).to_list()
+    existing = {doc["match_code"] for doc in docs}
+    result.existing = [code for code in match_codes if code in existing]
+
+    new_codes = [code for code in match_codes if code not in existing]
+    parsing_locks = {
+        lock.key: lock for lock in await RedisLock.try_acquire_many(new_codes, ttl=PARSING_DEDUP_KEY_TTL)
+    }
+    result.locked = [code for code in new_codes if code not in parsing_locks]
+
+    workflows = []
+    for match_code, parsing_lock in parsing_locks.items():
+        context = DemoParsingContext(
+            match_code=match_code,
+            lock_key=match_code,
+            lock_token=parsing_lock.token,
+        )
+        workflows.append(_build_workflow(context, lane))
+
+    if workflows:
+        try:
+            # one publish over a single broker connection
+            celery.group(workflows).apply_async()
+        except Exception as exc:
+            logger.exception("run_demo_parsing_bulk: Failed with error", exc_info=exc)
+            for parsing_lock in parsing_locks.values():
+                await parsing_lock.release()
+            raise
+
+    result.dispatched = list(parsing_locks)
+    logger.info(
+        "run_demo_parsing_bulk: Dispatched %s match codes to %s lane, %s already parsed, %s already locked",
+        len(result.dispatched),
+        lane.value,
+        len(result.existing),
+        len(result.locked),
+    )
+    return result
+
+
+def _build_workflow(context: DemoParsingContext, lane: PipelineLane) -> celery.Signature:
+    stages = [
+        request_demo_url_task.s(context.dump()),
+        download_demo_file_task.s(),
+        parse_demo_task.s(),
+        rank_calculation_task.s(),
+        refresh_steam_profiles_task.s(),
+        send_webhooks_task.s(),
+    ]
+
+    return celery.chain(*[stage.set(queue=lane.queue(stage.type.queue)) for stage in stages])
@@ -1,10 +1,15 @@
+import asyncio
 import logging
 from typing import Any
 
 import aiohttp
 
 from components.steam_connector.models import CS2DemoInfo
-from conf.steam_connector import STEAM_CONNECTOR_HOST, STEAM_CONNECTOR_PORT, STEAM_CONNECTOR_TIMEOUT
+from conf.steam_connector import STEAM_CONNECTOR_HOST, STEAM_CONNECTOR_PORT, STEAM_CONNECTOR_TIMEOUT, \
+    STEAM_CONNECTOR_LOGIN_CACHE_TTL, STEAM_CONNECTOR_MAX_CONNECTIONS, STEAM_CONNECTOR_MAX_PARALLEL_REQUESTS
+from redis_client import get_redis
+from utils.concurrency import SingleFlight
+from utils.http import HTTPClientPool
 
 
 class SteamClientConnectionError(Exception):
@@ -16,21 +21,19 @@ logger = logging.getLogger(__name__)
 
 class SteamConnectorClient:
     base_url = f"http://{STEAM_CONNECTOR_HOST}:{STEAM_CONNECTOR_PORT}"
+    login_cache_key = "steam-connector:logged-in"
 
-    def __init__(
-        self,
-    ) -> None:
-        self._timeout = aiohttp.ClientTimeout(total=STEAM_CONNECTOR_TIMEOUT)
-        self._session: aiohttp.ClientSession | None = None
-
-    async def _get_session(self) -> aiohttp.ClientSession:
-        if self._session is None or self._session.closed:
-            self._session = aiohttp.ClientSession(timeout=self._timeout)
-        return self._session
+    http_pool = HTTPClientPool(
+        "steam_connector",
+        limit=STEAM_CONNECTOR_MAX_CONNECTIONS,
+        limit_per_host=STEAM_CONNECTOR_MAX_CONNECTIONS,
+        total_timeout=STEAM_CONNECTOR_TIMEOUT,
+    )
+    _single_flight = SingleFlight()
 
     async def close(self) -> None:
-        if self._session and not self._session.closed:
-            await self._session.close()
+        # the session belongs to the process-wide http_pool and outlives client instances
+        pass
 
 
     async def __aenter__(self) -> "SteamConnectorClient":
@@ -41,15 +44,49 @@ class SteamConnectorClient:
 
 
     async def get_demo_url(self, match_code: str) -> CS2DemoInfo:
-        response: dict = await self._safe_request(
-            method="GET",
-            url="/api/cs2/demo/",
-            query_params={"match_code": match_code},
+        response: dict = await self._single_flight.do(
+            ("get_demo_url", match_code),
+            lambda: self._safe_request(
+                method="GET",
+                url="/api/cs2/demo/",
+                query_params={"match_code": match_code},
+            ),
         )
         return CS2DemoInfo.model_validate(response)
 
+    async def get_demo_urls(
+        self,
+        match_codes: list[str],
+        concurrency: int | None = None,
+    ) -> dict[str, CS2DemoInfo | None]:
+        semaphore = asyncio.Semaphore(concurrency or STEAM_CONNECTOR_MAX_PARALLEL_REQUESTS)
+
+        async def _get_demo_url(match_code: str) -> CS2DemoInfo | None:
+            async with semaphore:
+                try:
+                    return await self.get_demo_url(match_code)
+                except Exception as exc:
+                    logger.error("SteamConnectorClient[get_demo_urls]: Failed to resolve %s: %s", match_code, exc)
+                    return None
+
+        match_codes = list(dict.fromkeys(match_codes))
+        results = await asyncio.gather(*[_get_demo_url(match_code) for match_code in match_codes])
+
+        return dict(zip(match_codes, results))
+
+
+    async def is_connector_logged_in(self) -> bool:
+        redis = get_redis()
+        cached = await redis.get(self.login_cache_key)
+        if cached is not None:
+            return cached == "1"
+
+        logged_in = await self._single_flight.do("is_connector_logged_in", self._request_login_status)
+        await redis.set(self.login_cache_key, int(logged_in), ex=STEAM_CONNECTOR_LOGIN_CACHE_TTL)
+
+        return logged_in
 
-    async def is_connector_logged_in(self):
+    async def _request_login_status(self) -> bool:
         response: dict = await self._safe_request(
             method="GET",
             url="/api/steam/login_info/",
@@ -69,7 +106,7 @@ class SteamConnectorClient:
 
         full_url = f"{self.base_url}{url}"
 
-        session = await self._get_session()
+        session = await self.http_pool.get_session()
 
         try:
             async with session.request(
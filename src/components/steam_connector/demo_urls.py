@@ -0,0 +1,61 @@
+import logging
+
+from components.steam_connector.client import SteamConnectorClient
+from components.steam_connector.models import CS2DemoInfo
+from conf.steam_connector import STEAM_CONNECTOR_DEMO_INFO_CACHE_TTL
+from db import get_database
+from db.managers.managers import MatchManager
+from redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+
+class DemoUrlResolver:
+    cache_key_prefix = "demo-info"
+
+    def __init__(self):
+        self.redis = get_redis()
+        self.match_manager = MatchManager(get_database())
+
+    async def resolve(self, match_codes: list[str]) -> dict[str, CS2DemoInfo | None]:
+        match_codes = list(dict.fromkeys(match_codes))
+        result: dict[str, CS2DemoInfo | None] = dict.fromkeys(match_codes)
+        if not match_codes:
+            return result
+
+        # known matches already carry their demo info
+        docs = await self.match_manager.collection.find(
+            {"match_code": {"$in": match_codes}, "demo_info": {"$ne": None}},
+            projection={"match_code": 1, "demo_info": 1},
+        ).to_list()
+        for doc in docs:
+            result[doc["match_code"]] = CS2DemoInfo.model_validate(doc["demo_info"])
+
+        unresolved = [code for code in match_codes if result[code] is None]
+        if unresolved:
+            cached = await self.redis.mget([self._cache_key(code) for code in unresolved])
+            for code, raw in zip(unresolved, cached):
+                if raw:
+                    result[code] = CS2DemoInfo.model_validate_json(raw)
+
+        unresolved = [code for code in match_codes if result[code] is None]
+        if unresolved:
+            logger.info("DemoUrlResolver: Requesting %s demo urls from connector", len(unresolved))
+            async with SteamConnectorClient() as client:
+                resolved = await client.get_demo_urls(unresolved)
+
+            await self._store(resolved)
+            result.update(resolved)
+
+        return result
+
+    async def _store(self, demo_infos: dict[str, CS2DemoInfo | None]) -> None:
+        pipe = self.redis.pipeline(transaction=False)
+        for match_code, demo_info in demo_infos.items():
+            if demo_info and demo_info.demo_url:
+                pipe.set(self._cache_key(match_code), demo_info.model_dump_json(), ex=STEAM_CONNECTOR_DEMO_INFO_CACHE_TTL)
+
+        await pipe.execute()
+
+    def _cache_key(self, match_code: str) -> str:
+        return f"{self.cache_key_prefix}:{match_code}"
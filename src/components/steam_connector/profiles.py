@@ -0,0 +1,116 @@
+import asyncio
+import datetime
+import logging
+from typing import Any
+
+from components.steam_connector.steam_api import SteamAPIClient
+from conf.steam_connector import STEAM_PROFILE_TTL, STEAM_PROFILE_REFRESH_DELAY, STEAM_PROFILE_MISSING_RETRY_TTL
+from db import get_database
+from db.managers.managers import PlayerManager
+from db.models.models import Player
+from redis_client import get_redis
+from utils.time_utils import utcnow
+
+logger = logging.getLogger(__name__)
+
+
+class SteamProfileRefresher:
+    pending_key = "steam-profiles:pending"
+    flush_scheduled_key = "steam-profiles:flush-scheduled"
+
+    def __init__(self):
+        self.redis = get_redis()
+        self.player_manager = PlayerManager(get_database())
+
+    async def split_by_freshness(self, steam_ids: list[str]) -> tuple[list[str], list[str]]:
+        stale_before = utcnow() - datetime.timedelta(seconds=STEAM_PROFILE_TTL)
+        players: list[Player] = await self.player_manager.list_(
+            filter_by={
+                "steam_id": {"$in": steam_ids},
+                "$or": [
+                    {"profile_refreshed_at": None},
+                    {"profile_refreshed_at": {"$lt": stale_before}},
+                ],
+            }
+        )
+
+        missing = [player.steam_id for player in players if player.profile_refreshed_at is None]
+        stale = [player.steam_id for player in players if player.profile_refreshed_at is not None]
+        return missing, stale
+
+    async def enqueue(self, steam_ids: list[str]) -> tuple[int, bool]:
+        pipe = self.redis.pipeline(transaction=False)
+        pipe.sadd(self.pending_key, *steam_ids)
+        pipe.scard(self.pending_key)
+        pipe.set(self.flush_scheduled_key, 1, nx=True, ex=STEAM_PROFILE_REFRESH_DELAY * 2)
+        _, pending_count, schedule_flush = await pipe.execute()
+
+        return pending_count, bool(schedule_flush)
+
+    async def flush(self) -> int:
+        await self.redis.delete(self.flush_scheduled_key)
+
+        refreshed = 0
+        async with SteamAPIClient() as client:
+            while True:
+                steam_ids: list[str] = await self.redis.spop(self.pending_key, SteamAPIClient.max_ids_per_request)
+                if not steam_ids:
+                    break
+
+                try:
+                    await self.refresh(steam_ids, client=client)
+                except Exception:
+                    logger.warning("SteamProfileRefresher: Refresh failed, returning %s ids to pending", len(steam_ids))
+                    await self.redis.sadd(self.pending_key, *steam_ids)
+                    raise
+                refreshed += len(steam_ids)
+
+        logger.info("SteamProfileRefresher: Refreshed %s profiles", refreshed)
+        return refreshed
+
+    async def refresh(self, steam_ids: list[str], client: SteamAPIClient | None = None) -> None:
+        if client is None:
+            async with SteamAPIClient() as client:
+                steam_profiles_info = await client.get_profiles_info(steam_ids)
+        else:
+            steam_profiles_info = await client.get_profiles_info(steam_ids)
+
+        await asyncio.gather(*[
+            self._update_player(steam_id, info) for steam_id, info in steam_profiles_info.items()
+        ])
+
+    async def _update_player(self, steam_id: str, info: dict[str, Any] | None) -> None:
+        if not info:
+            logger.warning("SteamProfileRefresher: No info for steam id %s", steam_id)
+            # goes stale after the retry ttl instead of being refetched on every match
+            await self.player_manager.update(
+                search_by={
+                    "steam_id": steam_id,
+                },
+                patch={
+                    "profile_refreshed_at": utcnow() - datetime.timedelta(
+                        seconds=max(STEAM_PROFILE_TTL - STEAM_PROFILE_MISSING_RETRY_TTL, 0)
+                    ),
+                }
+            )
+            return
+
+        data_to_update: dict[str, Any] = {
+            "profile_refreshed_at": utcnow(),
+        }
+        profile_url = info.get("profileurl")
+        avatar_url = info.get("avatarfull")
+        steam_profile_name = info.get("personaname")
+        if profile_url:
+            data_to_update["profile_url"] = profile_url
+        if avatar_url:
+            data_to_update["avatar_url"] = avatar_url
+        if steam_profile_name:
+            data_to_update["steam_profile_name"] = steam_profile_name
+
+        await self.player_manager.update(
+            search_by={
+                "steam_id": steam_id,
+            },
+            patch=data_to_update
+        )
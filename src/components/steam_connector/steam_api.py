@@ -1,16 +1,22 @@
-import asyncio
 import logging
-import random
 from typing import Any
 
 import aiohttp
 
 from conf.steam_connector import (
     STEAM_API_KEY,
+    STEAM_API_BASE_URL,
     STEAM_API_MAX_PARALLEL_CONNECTIONS,
     STEAM_API_TIMEOUT,
+    STEAM_API_RATE,
+    STEAM_API_BURST,
+    STEAM_API_MIN_RATE,
+    STEAM_API_RATE_INCREASE,
+    STEAM_API_RATE_DECREASE,
+    STEAM_API_MAX_RETRIES,
 )
-from utils.concurrency import RedisSemaphore
+from utils.concurrency import RedisSemaphore, RedisTokenBucket
+from utils.http import HTTPClientPool
 
 logger = logging.getLogger(__name__)
 
@@ -20,26 +26,38 @@ class SteamAPIClientError(Exception):
 
 
 class SteamAPIClient:
-    base_url = "https://api.steampowered.com"
+    base_url = STEAM_API_BASE_URL
     max_ids_per_request = 100
+    rate_limiter_key = "steam-api-client-rate-limiter"
+    semaphore_key = "steam-api-client-semaphore"
+    http_pool = HTTPClientPool(
+        "steam_api",
+        limit_per_host=STEAM_API_MAX_PARALLEL_CONNECTIONS,
+        total_timeout=STEAM_API_TIMEOUT,
+    )
 
     def __init__(self) -> None:
         self._api_key = STEAM_API_KEY
-        self._timeout = aiohttp.ClientTimeout(total=STEAM_API_TIMEOUT)
-        self._session: aiohttp.ClientSession | None = None
         self._semaphore = RedisSemaphore(
-            "steam-api-client-semaphore",
+            self.semaphore_key,
             capacity=STEAM_API_MAX_PARALLEL_CONNECTIONS,
         )
-
-    async def _get_session(self) -> aiohttp.ClientSession:
-        if self._session is None or self._session.closed:
-            self._session = aiohttp.ClientSession(timeout=self._timeout)
-        return self._session
+        self._rate_limiter = self.get_rate_limiter()
+
+    @classmethod
+    def get_rate_limiter(cls) -> RedisTokenBucket:
+        return RedisTokenBucket(
+            cls.rate_limiter_key,
+            rate=STEAM_API_RATE,
+            burst=STEAM_API_BURST,
+            min_rate=STEAM_API_MIN_RATE,
+            rate_increase=STEAM_API_RATE_INCREASE,
+            rate_decrease=STEAM_API_RATE_DECREASE,
+        )
 
     async def close(self) -> None:
-        if self._session and not self._session.closed:
-            await self._session.close()
+        # the session belongs to the process-wide http_pool and outlives client instances
+        pass
 
     async def __aenter__(self) -> "SteamAPIClient":
         return self
@@ -57,36 +75,32 @@ class SteamAPIClient:
         if not steam_ids:
             return result
 
-        await self._semaphore.acquire()
-        try:
-            for i in range(0, len(steam_ids), self.max_ids_per_request):
-                batch = steam_ids[i : i + self.max_ids_per_request]
-
-                params = {
-                    "key": self._api_key,
-                    "steamids": ",".join(str(x) for x in batch),
-                }
-
-
-                data = await self._safe_request(
-                    method="GET",
-                    url="/ISteamUser/GetPlayerSummaries/v2/",
-                    query_params=params,
-                )
-                players = (
-                    data.get("response", {}).get("players", [])
-                    if isinstance(data, dict)
-                    else []
-                )
-
-                for p in players:
-                    sid = p.get("steamid") if isinstance(p, dict) else None
-                    if sid in result:
-                        result[sid] = p
+        for i in range(0, len(steam_ids), self.max_ids_per_request):
+            batch = steam_ids[i : i + self.max_ids_per_request]
 
-            return result
-        finally:
-            await self._semaphore.release()
+            params = {
+                "key": self._api_key,
+                "steamids": ",".join(str(x) for x in batch),
+            }
+
+
+            data = await self._safe_request(
+                method="GET",
+                url="/ISteamUser/GetPlayerSummaries/v2/",
+                query_params=params,
+            )
+            players = (
+                data.get("response", {}).get("players", [])
+                if isinstance(data, dict)
+                else []
+            )
+
+            for p in players:
+                sid = p.get("steamid") if isinstance(p, dict) else None
+                if sid in result:
+                    result[sid] = p
+
+        return result
 
 
     async def get_match_history(
@@ -98,35 +112,43 @@ class SteamAPIClient:
         result: list[str] = []
         current_code = known_match_code
 
-        await self._semaphore.acquire()
-        try:
-            while True:
-                data = await self._safe_request(
-                    method="GET",
-                    url="/ICSGOPlayers_730/GetNextMatchSharingCode/v1/",
-                    query_params={
-                        "key": self._api_key,
-                        "steamid": player_steam_id,
-                        "steamidkey": access_code,
-                        "knowncode": current_code,
-                    },
-                )
-
-                next_code = (
-                    data.get("result", {}).get("nextcode")
-                    if isinstance(data, dict)
-                    else None
-                )
-
-                if not next_code or next_code == "n/a":
-                    break
-
-                result.append(next_code)
-                current_code = next_code
+        while True:
+            next_code = await self.get_next_match_code(player_steam_id, access_code, current_code)
+            if not next_code:
+                break
 
-            return result
-        finally:
-            await self._semaphore.release()
+            result.append(next_code)
+            current_code = next_code
+
+        return result
+
+    async def get_next_match_code(
+        self,
+        player_steam_id: str,
+        access_code: str,
+        known_match_code: str,
+    ) -> str | None:
+        data = await self._safe_request(
+            method="GET",
+            url="/ICSGOPlayers_730/GetNextMatchSharingCode/v1/",
+            query_params={
+                "key": self._api_key,
+                "steamid": player_steam_id,
+                "steamidkey": access_code,
+                "knowncode": known_match_code,
+            },
+        )
+
+        next_code = (
+            data.get("result", {}).get("nextcode")
+            if isinstance(data, dict)
+            else None
+        )
+
+        if not next_code or next_code == "n/a":
+            return None
+
+        return next_code
 
 
     async def _safe_request(
@@ -142,30 +164,62 @@ class SteamAPIClient:
             url = f"/{url}"
 
         full_url = f"{self.base_url}{url}"
-        session = await self._get_session()
-
+        session = await self.http_pool.get_session()
+
+        for attempt in range(STEAM_API_MAX_RETRIES + 1):
+            # the slot is held per attempt only, so a throttled request waits for tokens without blocking others
+            await self._rate_limiter.acquire()
+            await self._semaphore.acquire()
+
+            try:
+                async with session.request(
+                    method=method.upper(),
+                    url=full_url,
+                    json=payload,
+                    params=query_params,
+                ) as resp:
+                    if resp.status == 429:
+                        retry_after = self._parse_retry_after(resp.headers.get("Retry-After"))
+                        await self._rate_limiter.on_throttled(retry_after)
+                        if attempt < STEAM_API_MAX_RETRIES:
+                            logger.warning(
+                                "SteamAPIClient[_safe_request]: Throttled on %s, retrying (%s/%s)",
+                                url,
+                                attempt + 1,
+                                STEAM_API_MAX_RETRIES,
+                            )
+                            continue
+
+                        text = await resp.text()
+                        raise SteamAPIClientError(f"Steam API rate limit exceeded (HTTP 429): {text}")
+
+                    if resp.status in (401, 403):
+                        text = await resp.text()
+                        raise SteamAPIClientError(f"Steam API key invalid (HTTP {resp.status}): {text}")
+
+                    if resp.status >= 400:
+                        text = await resp.text()
+                        raise SteamAPIClientError(f"Steam API error {resp.status}: {text}")
+
+                    await self._rate_limiter.on_success()
+
+                    content_type = resp.headers.get("Content-Type", "")
+                    if "application/json" in content_type:
+                        return await resp.json(content_type=None)
+
+                    return await resp.text()
+
+            except aiohttp.ClientError as e:
+                logger.exception("SteamAPIClient[_safe_request]:", exc_info=e)
+                raise SteamAPIClientError(f"Steam API request failed: {e}") from e
+            finally:
+                await self._semaphore.release()
+
+    @staticmethod
+    def _parse_retry_after(value: str | None) -> float | None:
+        if not value:
+            return None
         try:
-            await asyncio.sleep(random.randint(200, 2000) / 1000)
-            async with session.request(
-                method=method.upper(),
-                url=full_url,
-                json=payload,
-                params=query_params,
-            ) as resp:
-                if resp.status in (401, 403):
-                    text = await resp.text()
-                    raise SteamAPIClientError(f"Steam API key invalid (HTTP {resp.status}): {text}")
-
-                if resp.status >= 400:
-                    text = await resp.text()
-                    raise SteamAPIClientError(f"Steam API error {resp.status}: {text}")
-
-                content_type = resp.headers.get("Content-Type", "")
-                if "application/json" in content_type:
-                    return await resp.json(content_type=None)
-
-                return await resp.text()
-
-        except aiohttp.ClientError as e:
-            logger.exception("SteamAPIClient[_safe_request]:", exc_info=e)
-            raise SteamAPIClientError(f"Steam API request failed: {e}") from e
+            return max(float(value), 0)
+        except ValueError:
+            return None
@@ -0,0 +1,427 @@
+import json
+import logging
+import random
+import uuid
+from datetime import timedelta
+
+import aiohttp
+
+from components.webhook.models import WebhookBatchBody, WebhookEnqueueResult, WebhookType
+from components.webhook.payload import WebhookPayloadEncoder
+from components.webhook.sender import BaseWebhookSender
+from conf.http import WEBHOOK_TIMEOUT
+from conf.webhook import (
+    WEBHOOK_DELIVERY_MAX_ATTEMPTS,
+    WEBHOOK_DELIVERY_BACKOFF_BASE,
+    WEBHOOK_DELIVERY_BACKOFF_MAX,
+    WEBHOOK_DELIVERY_MAX_CONCURRENCY_PER_ENDPOINT,
+    WEBHOOK_DELIVERY_BUSY_DELAY,
+    WEBHOOK_DELIVERY_REQUEUE_GRACE,
+    WEBHOOK_CIRCUIT_FAILURE_THRESHOLD,
+    WEBHOOK_CIRCUIT_RESET_TIMEOUT,
+    WEBHOOK_BATCH_MAX_EVENTS,
+    WEBHOOK_BATCH_ORPHAN_LOOKBACK,
+)
+from db import get_database
+from db.managers.cache import webhook_cache
+from db.managers.managers import WebhookDeliveryManager, WebhookManager
+from db.models.models import Webhook, WebhookDelivery, WebhookDeliveryStatus
+from redis_client import get_redis
+from utils.concurrency import RedisCircuitBreaker, RedisSemaphore, RedisLockException
+from utils.time_utils import utcnow
+
+logger = logging.getLogger(__name__)
+
+# client errors that will not go away by retrying the same payload
+NON_RETRYABLE_STATUSES = {400, 401, 403, 404, 405, 410, 413, 415, 422}
+
+
+class WebhookDeliveryQueue:
+
+    def __init__(self):
+        self.db = get_database()
+        self.delivery_manager = WebhookDeliveryManager(self.db)
+        self.webhook_manager = WebhookManager(self.db)
+
+    @staticmethod
+    def get_circuit_breaker(webhook_id: str) -> RedisCircuitBreaker:
+        return RedisCircuitBreaker(
+            f"webhook-delivery:{webhook_id}:circuit",
+            failure_threshold=WEBHOOK_CIRCUIT_FAILURE_THRESHOLD,
+            reset_timeout=WEBHOOK_CIRCUIT_RESET_TIMEOUT,
+        )
+
+    @staticmethod
+    def get_semaphore(webhook: Webhook) -> RedisSemaphore:
+        return RedisSemaphore(
+            f"webhook-delivery:{webhook.id}:semaphore",
+            # deltas are computed against the last delivered state, so they have to go out one by one
+            capacity=1 if webhook.delta_players else WEBHOOK_DELIVERY_MAX_CONCURRENCY_PER_ENDPOINT,
+            ttl=int(WEBHOOK_TIMEOUT) * 2,
+            raise_locked=True,
+        )
+
+    @staticmethod
+    def batch_flush_scheduled_key(webhook_id: str) -> str:
+        return f"webhook-delivery:{webhook_id}:batch-flush-scheduled"
+
+    async def enqueue(
+        self,
+        sender: BaseWebhookSender,
+        source: str | None = None,
+        webhooks: list[Webhook] | None = None,
+    ) -> WebhookEnqueueResult:
+        result = WebhookEnqueueResult()
+        for webhook, payload in await sender.get_payloads(webhooks):
+            batched = bool(webhook.batch_window)
+            delivery = await self.delivery_manager.create({
+                "webhook_id": webhook.id,
+                "webhook_type": sender.webhook_type,
+                "payload": payload.decode(),
+                "source": source,
+                "status": WebhookDeliveryStatus.BATCHED if batched else WebhookDeliveryStatus.PENDING,
+                "next_attempt_at": utcnow() + timedelta(seconds=webhook.batch_window or 0),
+            })
+            if not batched:
+                result.deliveries.append(delivery)
+                continue
+
+            flush_in = await self._schedule_batch_flush(webhook)
+            if flush_in is not None:
+                result.batch_flushes[webhook.id] = flush_in
+
+        logger.info(
+            "WebhookDeliveryQueue: Enqueued %s %s deliveries for %s (%s batches to flush)",
+            len(result.deliveries),
+            sender.webhook_type,
+            source,
+            len(result.batch_flushes),
+        )
+        return result
+
+    async def _schedule_batch_flush(self, webhook: Webhook) -> float | None:
+        pending_count = await self.delivery_manager.count(
+            filter_by={
+                "webhook_id": webhook.id,
+                "status": WebhookDeliveryStatus.BATCHED,
+            }
+        )
+        if pending_count >= (webhook.batch_max_events or WEBHOOK_BATCH_MAX_EVENTS):
+            return 0
+
+        # the first event of a window schedules its flush, later ones ride along
+        schedule_flush = await get_redis().set(
+            self.batch_flush_scheduled_key(webhook.id),
+            1,
+            nx=True,
+            ex=int(webhook.batch_window * 2) + 1,
+        )
+        return webhook.batch_window if schedule_flush else None
+
+    async def flush_batch(self, webhook_id: str) -> tuple[WebhookDelivery | None, bool]:
+        # returns the merged delivery to send and whether events are left for another batch
+        await get_redis().delete(self.batch_flush_scheduled_key(webhook_id))
+
+        webhook = await self._get_webhook(webhook_id)
+        max_events = (webhook.batch_max_events if webhook else None) or WEBHOOK_BATCH_MAX_EVENTS
+
+        candidates = await self._list_batched(webhook_id, max_events + 1)
+        if not candidates:
+            return None, False
+
+        batch_delivery_id = str(uuid.uuid4())
+        # concurrent flushes claim disjoint sets: only still BATCHED events switch to MERGED
+        await self.delivery_manager.update_many(
+            filter_by={
+                "id": {"$in": [delivery.id for delivery in candidates[:max_events]]},
+                "status": WebhookDeliveryStatus.BATCHED,
+            },
+            patch={
+                "status": WebhookDeliveryStatus.MERGED,
+                "batch_delivery_id": batch_delivery_id,
+            },
+        )
+        events = await self.delivery_manager.list_(
+            filter_by={
+                "batch_delivery_id": batch_delivery_id,
+            },
+            sort=[("created", 1)],
+        )
+        has_more = len(candidates) > max_events
+        if not events:
+            return None, has_more
+
+        try:
+            batch_delivery = await self.delivery_manager.create({
+                "id": batch_delivery_id,
+                "webhook_id": webhook_id,
+                "webhook_type": WebhookType.BATCH,
+                "payload": self._merge_events(webhook_id, events),
+                "source": f"batch of {len(events)}",
+                "next_attempt_at": utcnow(),
+            })
+        except Exception:
+            await self._release_merged([batch_delivery_id])
+            raise
+        logger.info("WebhookDeliveryQueue: Merged %s events for webhook %s into %s", len(events), webhook_id, batch_delivery_id)
+        return batch_delivery, has_more
+
+    async def _list_batched(self, webhook_id: str, limit: int) -> list[WebhookDelivery]:
+        return await self.delivery_manager.list_(
+            filter_by={
+                "webhook_id": webhook_id,
+                "status": WebhookDeliveryStatus.BATCHED,
+            },
+            sort=[("created", 1)],
+            limit=limit,
+        )
+
+    @staticmethod
+    def _merge_events(webhook_id: str, events: list[WebhookDelivery]) -> str:
+        players: dict[str, dict] = {}
+        rank_descriptions: list[dict] = []
+        bodies = []
+        for event in events:
+            body: dict = json.loads(event.payload)
+            body.pop("webhook_id", None)
+            # events are in creation order, so the latest player state wins
+            for player in body.pop("players", []):
+                players[player["steam_id"]] = player
+            rank_descriptions = body.pop("rank_descriptions", rank_descriptions)
+            bodies.append(body)
+
+        return WebhookBatchBody(
+            webhook_id=webhook_id,
+            webhook_type=WebhookType.BATCH,
+            events=bodies,
+            players=list(players.values()),
+            rank_descriptions=rank_descriptions,
+        ).model_dump_json()
+
+    async def deliver(self, delivery_id: str) -> float | None:
+        # returns the countdown for the next attempt, None once the delivery is settled
+        delivery = await self._claim(delivery_id)
+        if not delivery:
+            logger.info("WebhookDeliveryQueue: Delivery %s is settled, leased or not due yet", delivery_id)
+            return None
+
+        webhook = await self._get_webhook(delivery.webhook_id)
+        if not webhook or not webhook.active or not webhook.url:
+            await self._settle(
+                delivery,
+                WebhookDeliveryStatus.DEAD,
+                error="Webhook deleted, disabled or without url",
+                attempts=delivery.attempts,
+            )
+            return None
+
+        circuit_breaker = self.get_circuit_breaker(webhook.id)
+        retry_in = await circuit_breaker.retry_in()
+        if retry_in > 0:
+            return await self._defer(delivery, retry_in)
+
+        semaphore = self.get_semaphore(webhook)
+        try:
+            await semaphore.acquire()
+        except RedisLockException:
+            return await self._defer(delivery, WEBHOOK_DELIVERY_BUSY_DELAY)
+
+        try:
+            status_code, error = await self._post(webhook, delivery.payload)
+        finally:
+            await semaphore.release()
+
+        if error is None:
+            await circuit_breaker.on_success()
+            await self._settle(delivery, WebhookDeliveryStatus.DELIVERED, status_code=status_code)
+            return None
+
+        await circuit_breaker.on_failure()
+        return await self._fail(delivery, status_code, error)
+
+    async def replay(self, *, delivery_id: str | None = None, webhook_id: str | None = None) -> list[WebhookDelivery]:
+        filter_by = {
+            "status": WebhookDeliveryStatus.DEAD,
+        }
+        if delivery_id:
+            filter_by["id"] = delivery_id
+        if webhook_id:
+            filter_by["webhook_id"] = webhook_id
+
+        deliveries = await self.delivery_manager.list_(filter_by=filter_by)
+        replayed = []
+        for delivery in deliveries:
+            replayed_delivery = await self.delivery_manager.update(
+                search_by={
+                    "id": delivery.id,
+                    "status": WebhookDeliveryStatus.DEAD,
+                },
+                patch={
+                    "status": WebhookDeliveryStatus.PENDING,
+                    "attempts": 0,
+                    "next_attempt_at": utcnow(),
+                    "lease_until": None,
+                },
+            )
+            if replayed_delivery:
+                replayed.append(replayed_delivery)
+
+        logger.info("WebhookDeliveryQueue: Replaying %s dead deliveries", len(replayed))
+        return replayed
+
+    async def list_overdue(self) -> list[WebhookDelivery]:
+        # deliveries whose celery message was lost, e.g. a worker died with the task prefetched
+        return await self.delivery_manager.list_(
+            filter_by={
+                "status": {"$in": [WebhookDeliveryStatus.PENDING, WebhookDeliveryStatus.RETRYING]},
+                "next_attempt_at": {"$lt": utcnow() - timedelta(seconds=WEBHOOK_DELIVERY_REQUEUE_GRACE)},
+            },
+        )
+
+    async def list_overdue_batches(self) -> list[str]:
+        # webhook ids whose batch flush was lost
+        return await self.delivery_manager.collection.distinct(
+            "webhook_id",
+            {
+                "status": WebhookDeliveryStatus.BATCHED,
+                "next_attempt_at": {"$lt": utcnow() - timedelta(seconds=WEBHOOK_DELIVERY_REQUEUE_GRACE)},
+            },
+        )
+
+    async def release_orphaned_merges(self) -> int:
+        # events a flush switched to MERGED before dying without creating their batch delivery
+        now = utcnow()
+        batch_delivery_ids: list[str] = await self.delivery_manager.collection.distinct(
+            "batch_delivery_id",
+            {
+                "status": WebhookDeliveryStatus.MERGED,
+                "updated": {
+                    "$gte": now - timedelta(seconds=WEBHOOK_DELIVERY_REQUEUE_GRACE + WEBHOOK_BATCH_ORPHAN_LOOKBACK),
+                    "$lt": now - timedelta(seconds=WEBHOOK_DELIVERY_REQUEUE_GRACE),
+                },
+            },
+        )
+        if not batch_delivery_ids:
+            return 0
+
+        existing = set(await self.delivery_manager.collection.distinct("id", {"id": {"$in": batch_delivery_ids}}))
+        orphaned = [batch_delivery_id for batch_delivery_id in batch_delivery_ids if batch_delivery_id not in existing]
+        if not orphaned:
+            return 0
+
+        released = await self._release_merged(orphaned)
+        logger.warning("WebhookDeliveryQueue: Returned %s orphaned merged events to their batches", released)
+        return released
+
+    async def _release_merged(self, batch_delivery_ids: list[str]) -> int:
+        return await self.delivery_manager.update_many(
+            filter_by={
+                "status": WebhookDeliveryStatus.MERGED,
+                "batch_delivery_id": {"$in": batch_delivery_ids},
+            },
+            patch={
+                "status": WebhookDeliveryStatus.BATCHED,
+                "batch_delivery_id": None,
+            },
+        )
+
+    async def _get_webhook(self, webhook_id: str) -> Webhook | None:
+        return await webhook_cache.get(webhook_id, lambda: self.webhook_manager.get(id_=webhook_id))
+
+    async def _claim(self, delivery_id: str) -> WebhookDelivery | None:
+        now = utcnow()
+        # the lease keeps duplicate task messages from sending the same delivery twice
+        return await self.delivery_manager.update(
+            search_by={
+                "id": delivery_id,
+                "status": {"$in": [WebhookDeliveryStatus.PENDING, WebhookDeliveryStatus.RETRYING]},
+                "next_attempt_at": {"$lte": now + timedelta(seconds=1)},
+                "$or": [
+                    {"lease_until": None},
+                    {"lease_until": {"$lt": now}},
+                ],
+            },
+            patch={
+                "lease_until": now + timedelta(seconds=WEBHOOK_TIMEOUT * 2),
+            },
+        )
+
+    async def _post(self, webhook: Webhook, payload: str) -> tuple[int | None, str | None]:
+        encoder = WebhookPayloadEncoder(webhook)
+        encoded = await encoder.encode(payload)
+        session = await BaseWebhookSender.http_pool.get_session()
+        try:
+            async with session.post(webhook.url, data=encoded.body, headers=encoded.headers) as response:
+                if response.status >= 400:
+                    text = await response.text()
+                    return response.status, f"HTTP {response.status}: {text[:500]}"
+
+        except (aiohttp.ClientError, TimeoutError) as exc:
+            return None, f"{exc.__class__.__name__}: {exc}"
+
+        await encoder.acknowledge(encoded)
+        return response.status, None
+
+    async def _defer(self, delivery: WebhookDelivery, delay: float) -> float:
+        await self.delivery_manager.update(
+            id_=delivery.id,
+            patch={
+                "next_attempt_at": utcnow() + timedelta(seconds=delay),
+                "lease_until": None,
+            },
+        )
+        return delay
+
+    async def _fail(self, delivery: WebhookDelivery, status_code: int | None, error: str) -> float | None:
+        attempts = delivery.attempts + 1
+        logger.warning(
+            "WebhookDeliveryQueue: Delivery %s to webhook %s failed (attempt %s/%s): %s",
+            delivery.id,
+            delivery.webhook_id,
+            attempts,
+            WEBHOOK_DELIVERY_MAX_ATTEMPTS,
+            error,
+        )
+
+        if attempts >= WEBHOOK_DELIVERY_MAX_ATTEMPTS or status_code in NON_RETRYABLE_STATUSES:
+            await self._settle(delivery, WebhookDeliveryStatus.DEAD, status_code=status_code, error=error, attempts=attempts)
+            return None
+
+        # full jitter keeps retries of a recovering endpoint from arriving in lockstep
+        delay = min(WEBHOOK_DELIVERY_BACKOFF_BASE * 2 ** (attempts - 1), WEBHOOK_DELIVERY_BACKOFF_MAX)
+        delay = random.uniform(0, delay)
+
+        await self.delivery_manager.update(
+            id_=delivery.id,
+            patch={
+                "status": WebhookDeliveryStatus.RETRYING,
+                "attempts": attempts,
+                "next_attempt_at": utcnow() + timedelta(seconds=delay),
+                "lease_until": None,
+                "last_status_code": status_code,
+                "last_error": error,
+            },
+        )
+        return delay
+
+    async def _settle(
+        self,
+        delivery: WebhookDelivery,
+        status: WebhookDeliveryStatus,
+        status_code: int | None = None,
+        error: str | None = None,
+        attempts: int | None = None,
+    ) -> None:
+        patch = {
+            "status": status,
+            "attempts": attempts if attempts is not None else delivery.attempts + 1,
+            "lease_until": None,
+            "last_status_code": status_code,
+            "last_error": error,
+        }
+        if status == WebhookDeliveryStatus.DELIVERED:
+            patch["delivered_at"] = utcnow()
+        else:
+            logger.error("WebhookDeliveryQueue: Delivery %s dead-lettered: %s", delivery.id, error)
+
+        await self.delivery_manager.update(id_=delivery.id, patch=patch)
@@ -1,7 +1,9 @@
+from typing import Any
+
 from pydantic import BaseModel
 
 from components.ranking.models import RankDescription
-from db.models.models import Match, PlayerMatchStat, PlayerRankChange, Player
+from db.models.models import Match, PlayerMatchStat, PlayerRankChange, Player, WebhookDelivery
 from utils.base_types import StringEnum
 
 
@@ -17,6 +19,7 @@ class WebhookType(StringEnum):
     MATCH_STATS = "MATCH_STATS"
     PLAYER_STATS = "PLAYER_STATS"
     CALIBRATION = "CALIBRATION"
+    BATCH = "BATCH"
 
 
 class WebhookBaseBody(BaseModel):
@@ -41,6 +44,27 @@ class CalibrationWebhookBody(WebhookBaseBody):
     players: list[Player]
     rank_descriptions: list[RankDescription]
 
+
+class WebhookBatchBody(WebhookBaseBody):
+    # events keep their own fields except players, which are merged and deduplicated here
+    events: list[dict[str, Any]]
+    players: list[dict[str, Any]]
+    rank_descriptions: list[dict[str, Any]]
+
+
+class WebhookEnqueueResult(BaseModel):
+    deliveries: list[WebhookDelivery] = []
+    # webhook id -> seconds until its batch has to be flushed
+    batch_flushes: dict[str, float] = {}
+
+
+class WebhookEncodedPayload(BaseModel):
+    body: bytes
+    headers: dict[str, str]
+    # full player documents of the payload, remembered as delivered once the endpoint accepts it
+    players: list[dict[str, Any]] = []
+
+
 class WebhookSendResult(BaseModel):
     id: str
     status: WebhookSendStatus
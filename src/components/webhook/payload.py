@@ -0,0 +1,104 @@
+import asyncio
+import gzip
+import json
+import logging
+from typing import Any
+
+import zstandard
+
+from components.ranking.models import RANK_DESCRIPTIONS_VERSION
+from components.webhook.models import WebhookEncodedPayload
+from conf.webhook import WEBHOOK_DELTA_SNAPSHOT_TTL, WEBHOOK_COMPRESSION_MIN_SIZE
+from db.models.models import Webhook, WebhookCompression
+from redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+# player fields that change on every write and are not worth a delta entry
+DELTA_IGNORED_FIELDS = {"updated"}
+# compressing bigger bodies off the event loop keeps other deliveries moving
+COMPRESSION_THREAD_MIN_SIZE = 256 * 1024
+
+
+class WebhookPayloadEncoder:
+
+    def __init__(self, webhook: Webhook):
+        self.webhook = webhook
+        self.redis = get_redis()
+
+    @property
+    def snapshot_key(self) -> str:
+        return f"webhook-delivery:{self.webhook.id}:players"
+
+    async def encode(self, payload: str) -> WebhookEncodedPayload:
+        headers = {
+            "Content-Type": "application/json",
+        }
+        players = []
+
+        if self.webhook.slim_payload or self.webhook.delta_players:
+            body: dict[str, Any] = json.loads(payload)
+
+            if self.webhook.slim_payload and "rank_descriptions" in body:
+                del body["rank_descriptions"]
+                body["rank_descriptions_version"] = RANK_DESCRIPTIONS_VERSION
+
+            if self.webhook.delta_players and "players" in body:
+                players = body["players"]
+                body["players"] = await self._delta_players(players)
+                body["players_delta"] = True
+
+            payload = json.dumps(body, separators=(",", ":"))
+
+        data = payload.encode()
+        if self.webhook.compression and len(data) >= WEBHOOK_COMPRESSION_MIN_SIZE:
+            if len(data) >= COMPRESSION_THREAD_MIN_SIZE:
+                data = await asyncio.to_thread(self._compress, data)
+            else:
+                data = self._compress(data)
+            headers["Content-Encoding"] = self.webhook.compression.value
+
+        return WebhookEncodedPayload(body=data, headers=headers, players=players)
+
+    async def acknowledge(self, encoded: WebhookEncodedPayload) -> None:
+        # the endpoint has these player states now, next deltas are computed against them
+        if not self.webhook.delta_players or not encoded.players:
+            return
+
+        pipe = self.redis.pipeline(transaction=False)
+        pipe.hset(self.snapshot_key, mapping={
+            player["steam_id"]: json.dumps(player, sort_keys=True) for player in encoded.players
+        })
+        pipe.expire(self.snapshot_key, WEBHOOK_DELTA_SNAPSHOT_TTL)
+        await pipe.execute()
+
+    async def reset(self) -> None:
+        await self.redis.delete(self.snapshot_key)
+
+    async def _delta_players(self, players: list[dict[str, Any]]) -> list[dict[str, Any]]:
+        if not players:
+            return []
+
+        delivered = await self.redis.hmget(self.snapshot_key, [player["steam_id"] for player in players])
+
+        delta = []
+        for player, delivered_player in zip(players, delivered):
+            if delivered_player is None:
+                delta.append(player)
+                continue
+
+            delivered_player = json.loads(delivered_player)
+            changed = {
+                field: value for field, value in player.items()
+                if field not in DELTA_IGNORED_FIELDS and delivered_player.get(field) != value
+            }
+            if changed:
+                delta.append({"steam_id": player["steam_id"], **changed})
+
+        return delta
+
+    def _compress(self, data: bytes) -> bytes:
+        if self.webhook.compression == WebhookCompression.ZSTD:
+            return zstandard.ZstdCompressor(level=3).compress(data)
+
+        return gzip.compress(data, compresslevel=6)
@@ -1,23 +1,32 @@
 import asyncio
+import json
 import logging
 from abc import abstractmethod, ABC
-
-import aiohttp
-from anyio.functools import lru_cache
+from typing import Hashable
 
 from components.ranking.models import RANK_DESCRIPTIONS
 from components.webhook.models import WebhookSendResult, WebhookSendStatus, MatchStatWebhookBody, WebhookType, \
     PlayerStatWebhookBody, WebhookBaseBody, CalibrationWebhookBody
+from components.webhook.payload import WebhookPayloadEncoder
+from conf.http import WEBHOOK_TIMEOUT, WEBHOOK_MAX_CONNECTIONS_PER_HOST
 from db import get_database
+from db.managers.cache import webhook_cache, match_cache
+from db.managers.loader import BatchLoader
 from db.managers.managers import MatchManager, WebhookManager, PlayerRankChangeManager, \
     PlayerMatchStatManager, PlayerManager
 from db.models.models import Match, Webhook, Player, PlayerMatchStat, PlayerRankChange
+from utils.http import HTTPClientPool
 
 logger = logging.getLogger(__name__)
 
 
 class BaseWebhookSender(ABC):
-
+    webhook_type: WebhookType
+    http_pool = HTTPClientPool(
+        "webhook",
+        limit_per_host=WEBHOOK_MAX_CONNECTIONS_PER_HOST,
+        total_timeout=WEBHOOK_TIMEOUT,
+    )
 
     def __init__(self):
         self.db = get_database()
@@ -27,12 +36,13 @@ class BaseWebhookSender(ABC):
         self.stats_manager = PlayerMatchStatManager(self.db)
         self.player_manager = PlayerManager(self.db)
 
+        self.player_loader = BatchLoader(self.player_manager, key="steam_id")
+
+        # serialized bodies without webhook_id, shared by every webhook with the same payload key
+        self._payloads: dict[Hashable, asyncio.Future[bytes]] = {}
+
     async def send_all(self) -> dict[str, WebhookSendResult]:
-        webhooks = await self.webhook_manager.list_(
-            filter_by={
-                "active": True,
-            }
-        )
+        webhooks = await self.webhook_manager.list_(filter_by=await self._webhooks_filter())
         tasks = []
         for webhook in webhooks:
             tasks.append(
@@ -44,6 +54,14 @@ class BaseWebhookSender(ABC):
             result.id: result for result in results
         }
 
+    async def get_payloads(self, webhooks: list[Webhook] | None = None) -> list[tuple[Webhook, bytes]]:
+        if webhooks is None:
+            webhooks = await self.webhook_manager.list_(filter_by=await self._webhooks_filter())
+        webhooks = [webhook for webhook in webhooks if webhook.url and await self._is_interested(webhook)]
+        payloads = await asyncio.gather(*[self._get_payload(webhook) for webhook in webhooks])
+
+        return list(zip(webhooks, payloads))
+
     async def send(self, webhook: str | Webhook) -> WebhookSendResult:
 
         if not isinstance(webhook, Webhook):
@@ -56,46 +74,92 @@ class BaseWebhookSender(ABC):
         if not webhook.active:
             return WebhookSendResult(id=webhook.id, status=WebhookSendStatus.DISABLED)
 
-
-        webhook_body: WebhookBaseBody = await self._get_body(webhook.id)
+        if not await self._is_interested(webhook):
+            return WebhookSendResult(id=webhook.id, status=WebhookSendStatus.NO_INTERESTS)
 
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.post(webhook.url, json=webhook_body.model_dump(mode="json")) as response:
-                    response.raise_for_status()
-                    logger.info("MatchStatWebhookSenderMatchStatWebhookSender: Webhook %s sent successfully",
-                                webhook.url)
-                    return WebhookSendResult(id=webhook.id, status=WebhookSendStatus.SUCCESS)
+            payload = await self._get_payload(webhook)
+            encoder = WebhookPayloadEncoder(webhook)
+            encoded = await encoder.encode(payload.decode())
+            session = await self.http_pool.get_session()
+            async with session.post(webhook.url, data=encoded.body, headers=encoded.headers) as response:
+                response.raise_for_status()
+
+            await encoder.acknowledge(encoded)
+            logger.info("%s: Webhook %s sent successfully", self.__class__.__name__, webhook.url)
+            return WebhookSendResult(id=webhook.id, status=WebhookSendStatus.SUCCESS)
 
         except Exception as exc:
             logger.exception(exc)
             return WebhookSendResult(id=webhook.id, status=WebhookSendStatus.FAILED)
 
-        finally:
-            await session.close()
 
-
-    @lru_cache
     async def _get_webhook(self, webhook_id: str) -> Webhook:
-        webhook = await self.webhook_manager.get(id_=webhook_id, raise_not_found=True)
+        webhook = await webhook_cache.get(
+            webhook_id,
+            lambda: self.webhook_manager.get(id_=webhook_id, raise_not_found=True),
+        )
 
         return webhook
 
+    async def _webhooks_filter(self) -> dict:
+        return {
+            "active": True,
+        }
+
+    async def _is_interested(self, webhook: Webhook) -> bool:
+        return True
+
+    async def _get_payload(self, webhook: Webhook) -> bytes:
+        key = self._payload_key(webhook)
+        payload = self._payloads.get(key)
+        if payload is None:
+            payload = self._payloads[key] = asyncio.ensure_future(self._build_payload(webhook))
+
+        return self._with_webhook_id(await payload, webhook.id)
+
+    async def _build_payload(self, webhook: Webhook) -> bytes:
+        webhook_body: WebhookBaseBody = await self._get_body(webhook)
+
+        return webhook_body.model_dump_json(exclude={"webhook_id"}).encode()
+
+    def _payload_key(self, webhook: Webhook) -> Hashable:
+        return None
+
+    @staticmethod
+    def _with_webhook_id(payload: bytes, webhook_id: str) -> bytes:
+        return b'{"webhook_id":' + json.dumps(webhook_id).encode() + b"," + payload[1:]
+
+    async def _load_players(self, player_steam_ids: list[str]) -> list[Player]:
+        players = await self.player_loader.load_many(dict.fromkeys(player_steam_ids))
+
+        return [player for player in players if player]
+
     @abstractmethod
-    async def _get_body(self, webhook_id: str) -> WebhookBaseBody:
+    async def _get_body(self, webhook: Webhook) -> WebhookBaseBody:
         pass
 
 
 class MatchStatWebhookSender(BaseWebhookSender):
+    webhook_type = WebhookType.MATCH_STATS
 
     def __init__(self, match_code: str):
         super().__init__()
         self.match_code = match_code
 
-    async def send(self, webhook: str | Webhook) -> WebhookSendResult:
-        if not isinstance(webhook, Webhook):
-            webhook: Webhook = await self._get_webhook(webhook)
+        self.stats_loader = BatchLoader(self.stats_manager, key="cs2_match_id", many=True)
+        self.rank_change_loader = BatchLoader(self.rank_change_manager, key="cs2_match_id", many=True)
+
+    async def _webhooks_filter(self) -> dict:
+        match: Match = await self._get_match()
+
+        # served by the multikey expected_steam_ids index: one lookup per match player
+        return {
+            "active": True,
+            "expected_steam_ids": {"$in": match.player_steam_ids},
+        }
 
+    async def _is_interested(self, webhook: Webhook) -> bool:
         match: Match = await self._get_match()
 
         logger.info("MatchStatWebhookSender: Checking webhook %s for match %s", webhook.url,
@@ -104,47 +168,36 @@ class MatchStatWebhookSender(BaseWebhookSender):
         expected_steam_ids = set(webhook.expected_steam_ids)
         actual_steam_ids = set(match.player_steam_ids)
 
-        if not expected_steam_ids.intersection(actual_steam_ids):
-            return WebhookSendResult(id=webhook.id, status=WebhookSendStatus.NO_INTERESTS)
+        return bool(expected_steam_ids.intersection(actual_steam_ids))
 
-        return await super().send(webhook)
 
-
-    @lru_cache
     async def _get_match(self) -> Match:
-        match = await self.match_manager.get(raise_not_found=True, match_code=self.match_code)
+        match = await match_cache.get(
+            ("match_code", self.match_code),
+            lambda: self.match_manager.get(raise_not_found=True, match_code=self.match_code),
+        )
 
         return match
 
 
-    async def _get_body(self, webhook_id: str) -> MatchStatWebhookBody:
+    async def _get_body(self, webhook: Webhook) -> MatchStatWebhookBody:
         match: Match = await self._get_match()
-        players: list[Player] =  await self.player_manager.list_(
-            filter_by={
-                "steam_id": {
-                    "$in": match.player_steam_ids
-                }
-            }
-        )
-        match_stats: list[PlayerMatchStat] = await self.stats_manager.list_(
-            filter_by={
-                "cs2_match_id": match.cs2_match_id,
-                "player_steam_id": {
-                    "$in": match.player_steam_ids
-                }
-            }
-        )
-        rank_changes: list[PlayerRankChange] = await self.rank_change_manager.list_(
-            filter_by={
-                "cs2_match_id": match.cs2_match_id,
-                "player_steam_id": {
-                    "$in": match.player_steam_ids
-                }
-            }
+        player_steam_ids = set(match.player_steam_ids)
+
+        players, match_stats, rank_changes = await asyncio.gather(
+            self._load_players(match.player_steam_ids),
+            self.stats_loader.load(match.cs2_match_id),
+            self.rank_change_loader.load(match.cs2_match_id),
         )
+        match_stats: list[PlayerMatchStat] = [
+            match_stat for match_stat in match_stats if match_stat.player_steam_id in player_steam_ids
+        ]
+        rank_changes: list[PlayerRankChange] = [
+            rank_change for rank_change in rank_changes if rank_change.player_steam_id in player_steam_ids
+        ]
         return MatchStatWebhookBody(
             webhook_type=WebhookType.MATCH_STATS,
-            webhook_id=webhook_id,
+            webhook_id=webhook.id,
             match=match,
             stats=match_stats,
             rank_changes=rank_changes,
@@ -154,25 +207,20 @@ class MatchStatWebhookSender(BaseWebhookSender):
 
 
 class PlayerStatWebhookSender(BaseWebhookSender):
+    webhook_type = WebhookType.PLAYER_STATS
 
     def __init__(self, player_steam_ids: list[str]):
         super().__init__()
         self.player_steam_ids = player_steam_ids
 
 
-    async def _get_body(self, webhook_id: str) -> PlayerStatWebhookBody:
+    async def _get_body(self, webhook: Webhook) -> PlayerStatWebhookBody:
 
-        players: list[Player] = await self.player_manager.list_(
-            filter_by={
-                "steam_id": {
-                    "$in": self.player_steam_ids
-                }
-            }
-        )
+        players: list[Player] = await self._load_players(self.player_steam_ids)
 
         return PlayerStatWebhookBody(
             webhook_type=WebhookType.PLAYER_STATS,
-            webhook_id=webhook_id,
+            webhook_id=webhook.id,
             players=players,
             rank_descriptions=RANK_DESCRIPTIONS,
         )
@@ -180,23 +228,19 @@ class PlayerStatWebhookSender(BaseWebhookSender):
 
 
 class CalibrationWebhookSender(BaseWebhookSender):
+    webhook_type = WebhookType.CALIBRATION
 
 
-    async def _get_body(self, webhook_id: str) -> CalibrationWebhookBody:
+    def _payload_key(self, webhook: Webhook) -> Hashable:
+        return frozenset(webhook.expected_steam_ids)
 
-        webhook = await self._get_webhook(webhook_id)
+    async def _get_body(self, webhook: Webhook) -> CalibrationWebhookBody:
 
-        players: list[Player] = await self.player_manager.list_(
-            filter_by={
-                "steam_id": {
-                    "$in": webhook.expected_steam_ids
-                }
-            }
-        )
+        players: list[Player] = await self._load_players(webhook.expected_steam_ids)
 
         return CalibrationWebhookBody(
             webhook_type=WebhookType.CALIBRATION,
-            webhook_id=webhook_id,
+            webhook_id=webhook.id,
             players=players,
             rank_descriptions=RANK_DESCRIPTIONS,
         )
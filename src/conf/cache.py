@@ -0,0 +1,8 @@
+import os
+
+CACHE_INVALIDATION_CHECK_INTERVAL = float(os.getenv("CACHE_INVALIDATION_CHECK_INTERVAL", "1"))
+CACHE_STATS_TTL = int(os.getenv("CACHE_STATS_TTL", "3600"))  # 1 hour
+WEBHOOK_CACHE_TTL = float(os.getenv("WEBHOOK_CACHE_TTL", "300"))  # 5 minutes
+WEBHOOK_CACHE_SIZE = int(os.getenv("WEBHOOK_CACHE_SIZE", "4096"))
+MATCH_CACHE_TTL = float(os.getenv("MATCH_CACHE_TTL", "600"))  # 10 minutes
+MATCH_CACHE_SIZE = int(os.getenv("MATCH_CACHE_SIZE", "1024"))
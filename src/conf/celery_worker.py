@@ -1,3 +1,9 @@
+import os
 import sys
 
 IN_CELERY_WORKER_PROCESS = sys.argv and 'celery' in sys.argv[0] and 'worker' in sys.argv
+
+CELERY_TASK_SERIALIZER = os.getenv("CELERY_TASK_SERIALIZER", "msgpack")
+CELERY_RESULT_EXPIRES = int(os.getenv("CELERY_RESULT_EXPIRES", "3600"))  # 1 hour
+# serves /metrics from the worker main process when set
+CELERY_METRICS_EXPORTER_PORT = int(os.getenv("CELERY_METRICS_EXPORTER_PORT", "0"))
@@ -0,0 +1,11 @@
+import os
+
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "100"))
+HTTP_MAX_CONNECTIONS_PER_HOST = int(os.getenv("HTTP_MAX_CONNECTIONS_PER_HOST", "10"))
+HTTP_KEEPALIVE_TIMEOUT = float(os.getenv("HTTP_KEEPALIVE_TIMEOUT", "30"))
+HTTP_DNS_CACHE_TTL = int(os.getenv("HTTP_DNS_CACHE_TTL", "300"))  # 5 minutes
+HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", "10"))
+HTTP_POOL_STATS_TTL = int(os.getenv("HTTP_POOL_STATS_TTL", "3600"))  # 1 hour
+WEBHOOK_TIMEOUT = float(os.getenv("WEBHOOK_TIMEOUT", "30"))
+WEBHOOK_MAX_CONNECTIONS_PER_HOST = int(os.getenv("WEBHOOK_MAX_CONNECTIONS_PER_HOST", "4"))
+DEMO_DOWNLOAD_READ_TIMEOUT = float(os.getenv("DEMO_DOWNLOAD_READ_TIMEOUT", "60"))
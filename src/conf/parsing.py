@@ -1,3 +1,10 @@
 import os
 
+from utils.type_cast import strtobool
+
 PARSING_DEDUP_KEY_TTL = int(os.getenv("PARSING_DEDUP_KEY_TTL", "3600"))
+# pipeline stages pass only ids and paths and load the match themselves
+PARSING_COMPACT_CONTEXT = strtobool(os.getenv("PARSING_COMPACT_CONTEXT", "true"))
+# a source's newest codes of one crawl go to the live lane, older ones are history catch-up (backfill)
+PARSING_LIVE_LANE_CODES = int(os.getenv("PARSING_LIVE_LANE_CODES", "3"))
+PARSING_BACKFILL_DISPATCH_CHUNK = int(os.getenv("PARSING_BACKFILL_DISPATCH_CHUNK", "50"))
@@ -1,5 +1,10 @@
 import os
 
+from utils.type_cast import strtobool
+
 RANKING_INITIAL_RANK = int(os.getenv("RANKING_INITIAL_RANK", 5))
 RANKING_MIN_RANK = int(os.getenv("RANKING_MIN_RANK", -2))
-RANKING_MAX_RANK = int(os.getenv("RANKING_MIN_RANK", 11))
\ No newline at end of file
+RANKING_MAX_RANK = int(os.getenv("RANKING_MIN_RANK", 11))
+RANKING_INCREMENTAL_STATS = strtobool(os.getenv("RANKING_INCREMENTAL_STATS", "true"))
+RANKING_LEADERBOARD_KEY_PREFIX = os.getenv("RANKING_LEADERBOARD_KEY_PREFIX", "leaderboard")
+RANKING_RATING_RULE = os.getenv("RANKING_RATING_RULE", "kd_diff")
@@ -5,6 +5,7 @@ REDIS_PORT = os.getenv("REDIS_PORT", "6379")
 REDIS_DB = os.getenv("REDIS_DB", "0")
 REDIS_LOCK_TTL = int(os.getenv("REDIS_LOCK_TTL", "900"))  # 15 minutes
 REDIS_LOCK_TIMEOUT = int(os.getenv("REDIS_LOCK_TIMEOUT", "300")) # 5 minutes
+REDIS_SEMAPHORE_POLL_INTERVAL = float(os.getenv("REDIS_SEMAPHORE_POLL_INTERVAL", "1"))
 
 class RedisSettings:
     host = REDIS_HOST
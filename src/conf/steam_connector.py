@@ -4,5 +4,19 @@ STEAM_CONNECTOR_HOST = os.getenv("STEAM_CONNECTOR_HOST", "localhost")
 STEAM_CONNECTOR_PORT = os.getenv("STEAM_CONNECTOR_PORT", "8001")
 STEAM_CONNECTOR_TIMEOUT = int(os.getenv("STEAM_CONNECTOR_TIMEOUT", "360"))
 STEAM_API_KEY = os.getenv("STEAM_API_KEY", None)
+STEAM_API_BASE_URL = os.getenv("STEAM_API_BASE_URL", "https://api.steampowered.com")
 STEAM_API_TIMEOUT = int(os.getenv("STEAM_API_TIMEOUT", "120"))
-STEAM_API_MAX_PARALLEL_CONNECTIONS = int(os.getenv("STEAM_API_MAX_PARALLEL_CONNECTIONS", "5"))
\ No newline at end of file
+STEAM_API_MAX_PARALLEL_CONNECTIONS = int(os.getenv("STEAM_API_MAX_PARALLEL_CONNECTIONS", "5"))
+STEAM_API_RATE = float(os.getenv("STEAM_API_RATE", "2"))  # requests per second
+STEAM_API_BURST = int(os.getenv("STEAM_API_BURST", "5"))
+STEAM_API_MIN_RATE = float(os.getenv("STEAM_API_MIN_RATE", "0.1"))
+STEAM_API_RATE_INCREASE = float(os.getenv("STEAM_API_RATE_INCREASE", "0.05"))
+STEAM_API_RATE_DECREASE = float(os.getenv("STEAM_API_RATE_DECREASE", "0.5"))
+STEAM_API_MAX_RETRIES = int(os.getenv("STEAM_API_MAX_RETRIES", "3"))
+STEAM_PROFILE_TTL = int(os.getenv("STEAM_PROFILE_TTL", "86400"))  # 1 day
+STEAM_PROFILE_MISSING_RETRY_TTL = int(os.getenv("STEAM_PROFILE_MISSING_RETRY_TTL", "3600"))  # 1 hour
+STEAM_PROFILE_REFRESH_DELAY = int(os.getenv("STEAM_PROFILE_REFRESH_DELAY", "60"))
+STEAM_CONNECTOR_LOGIN_CACHE_TTL = int(os.getenv("STEAM_CONNECTOR_LOGIN_CACHE_TTL", "30"))
+STEAM_CONNECTOR_MAX_CONNECTIONS = int(os.getenv("STEAM_CONNECTOR_MAX_CONNECTIONS", "20"))
+STEAM_CONNECTOR_MAX_PARALLEL_REQUESTS = int(os.getenv("STEAM_CONNECTOR_MAX_PARALLEL_REQUESTS", "5"))
+STEAM_CONNECTOR_DEMO_INFO_CACHE_TTL = int(os.getenv("STEAM_CONNECTOR_DEMO_INFO_CACHE_TTL", "86400"))  # 1 day
@@ -0,0 +1,15 @@
+import os
+
+WEBHOOK_DELIVERY_MAX_ATTEMPTS = int(os.getenv("WEBHOOK_DELIVERY_MAX_ATTEMPTS", "8"))
+WEBHOOK_DELIVERY_BACKOFF_BASE = float(os.getenv("WEBHOOK_DELIVERY_BACKOFF_BASE", "5"))
+WEBHOOK_DELIVERY_BACKOFF_MAX = float(os.getenv("WEBHOOK_DELIVERY_BACKOFF_MAX", "1800"))  # 30 minutes, below the broker visibility timeout
+WEBHOOK_DELIVERY_MAX_CONCURRENCY_PER_ENDPOINT = int(os.getenv("WEBHOOK_DELIVERY_MAX_CONCURRENCY_PER_ENDPOINT", "4"))
+WEBHOOK_DELIVERY_BUSY_DELAY = float(os.getenv("WEBHOOK_DELIVERY_BUSY_DELAY", "2"))
+WEBHOOK_DELIVERY_REQUEUE_GRACE = int(os.getenv("WEBHOOK_DELIVERY_REQUEUE_GRACE", "300"))  # 5 minutes
+WEBHOOK_DELIVERY_REQUEUE_INTERVAL = int(os.getenv("WEBHOOK_DELIVERY_REQUEUE_INTERVAL", "60"))  # 1 minute
+WEBHOOK_CIRCUIT_FAILURE_THRESHOLD = int(os.getenv("WEBHOOK_CIRCUIT_FAILURE_THRESHOLD", "5"))
+WEBHOOK_CIRCUIT_RESET_TIMEOUT = float(os.getenv("WEBHOOK_CIRCUIT_RESET_TIMEOUT", "60"))
+WEBHOOK_BATCH_MAX_EVENTS = int(os.getenv("WEBHOOK_BATCH_MAX_EVENTS", "100"))
+WEBHOOK_BATCH_ORPHAN_LOOKBACK = int(os.getenv("WEBHOOK_BATCH_ORPHAN_LOOKBACK", "86400"))  # 1 day
+WEBHOOK_DELTA_SNAPSHOT_TTL = int(os.getenv("WEBHOOK_DELTA_SNAPSHOT_TTL", "2592000"))  # 30 days
+WEBHOOK_COMPRESSION_MIN_SIZE = int(os.getenv("WEBHOOK_COMPRESSION_MIN_SIZE", "1024"))
@@ -0,0 +1,35 @@
+from components.ranking.leaderboard import Leaderboard
+from components.ranking.models import LeaderboardMetric, LeaderboardEntry, LeaderboardPlayerPosition
+from db.managers.base import NotFoundError
+from tasks.demo import rebuild_leaderboard_task
+
+
+async def leaderboard_top_controller(metric: LeaderboardMetric, limit: int = 10) -> list[LeaderboardEntry]:
+    if limit < 1:
+        raise ValueError("limit must be positive")
+
+    return await Leaderboard().top(metric, limit=limit)
+
+
+async def leaderboard_range_controller(
+    metric: LeaderboardMetric,
+    start: int = 0,
+    stop: int = 99,
+) -> list[LeaderboardEntry]:
+    if start < 0 or stop < start:
+        raise ValueError("Invalid leaderboard range")
+
+    return await Leaderboard().range(metric, start=start, stop=stop)
+
+
+async def leaderboard_player_controller(metric: LeaderboardMetric, steam_id: str) -> LeaderboardPlayerPosition:
+    position = await Leaderboard().player_position(metric, steam_id)
+    if position is None:
+        raise NotFoundError(f"Player {steam_id} not found in {metric.value} leaderboard")
+
+    return position
+
+
+async def leaderboard_rebuild_controller() -> None:
+
+    rebuild_leaderboard_task.apply_async()
@@ -8,13 +8,13 @@ from db.models.models import MatchSource
 from tasks.collecting import collect_demos
 
 
-async def collect_match_source_controller(match_source_id: str) -> None:
+async def collect_match_source_controller(match_source_id: str, prefetch_demo_urls: bool = False) -> None:
 
-    collect_demos.apply_async(kwargs={'match_source_id': match_source_id})
+    collect_demos.apply_async(kwargs={'match_source_id': match_source_id, 'prefetch_demo_urls': prefetch_demo_urls})
 
 
-async def collect_all_match_sources_controller() -> None:
-    collect_demos.apply_async()
+async def collect_all_match_sources_controller(prefetch_demo_urls: bool = False) -> None:
+    collect_demos.apply_async(kwargs={'prefetch_demo_urls': prefetch_demo_urls})
 
 async def match_source_list_controller() -> list[MatchSource]:
     manager = MatchSourceManager(get_mongo_db())
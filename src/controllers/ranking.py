@@ -1,8 +1,36 @@
+from components.ranking.models import MatchRollbackResult
+from components.ranking.rollback import MatchRollback
+from db import get_mongo_db
+from db.managers.managers import MatchManager
 from db.models.models import Match
-from tasks.demo import all_players_calibration_task
+from tasks.demo import all_players_calibration_task, rebuild_players_stats_task, resequence_rank_ledger_task
 
 
 async def recalibrate_all():
 
 
     all_players_calibration_task.apply_async()
+
+
+async def rebuild_players_stats():
+
+    rebuild_players_stats_task.apply_async()
+
+
+async def resequence_rank_ledger():
+
+    resequence_rank_ledger_task.apply_async()
+
+
+async def rollback_match_controller(match: str) -> MatchRollbackResult:
+    filter_by = {}
+    if str(match).startswith("CSGO"):
+        filter_by["match_code"] = match
+    elif match.isdigit():
+        filter_by["cs2_match_id"] = int(match)
+    else:
+        raise ValueError("Invalid match identity")
+
+    match: Match = await MatchManager(get_mongo_db()).get(**filter_by, raise_not_found=True)
+
+    return await MatchRollback(match.cs2_match_id).rollback()
@@ -1,7 +1,38 @@
 from starlette.requests import Request
 from starlette.responses import Response, PlainTextResponse
 
+from components.runner.metrics import PROMETHEUS_CONTENT_TYPE
+from components.steam_connector.steam_api import SteamAPIClient
+from utils.cache import AsyncTTLCache
+from utils.http import HTTPClientPool
+from utils.metrics import RedisHistogram, RedisMetric
+
 
 def ping_controller(request: Request) -> PlainTextResponse:
 
-    return PlainTextResponse("pong")
\ No newline at end of file
+    return PlainTextResponse("pong")
+
+
+async def steam_api_rate_controller() -> dict[str, float]:
+
+    return await SteamAPIClient.get_rate_limiter().metrics()
+
+
+async def steam_api_semaphore_wait_controller() -> dict[str, float]:
+
+    return await RedisHistogram(f"{SteamAPIClient.semaphore_key}:wait-seconds").snapshot()
+
+
+async def http_pools_controller() -> dict[str, dict[str, dict[str, int | float]]]:
+
+    return await HTTPClientPool.collect_stats()
+
+
+async def caches_controller() -> dict[str, dict[str, dict[str, int | float]]]:
+
+    return await AsyncTTLCache.collect_stats()
+
+
+async def metrics_controller() -> Response:
+
+    return Response(content=await RedisMetric.render_all(), media_type=PROMETHEUS_CONTENT_TYPE)
@@ -1,12 +1,17 @@
 from starlette.responses import Response
 
 from api_models.webhook import MatchStatsWebhookPayload, PlayerStatWebhookRequestBody
+from components.webhook.delivery import WebhookDeliveryQueue
+from components.ranking.models import RANK_DESCRIPTIONS, RANK_DESCRIPTIONS_VERSION, RankDescriptionsVersion
 from components.webhook.models import WebhookSendResult
+from components.webhook.payload import WebhookPayloadEncoder
 from components.webhook.sender import PlayerStatWebhookSender
 from db import get_mongo_db
-from db.managers.managers import WebhookManager, MatchManager
-from db.models.models import Webhook, Match
-from tasks import DemoParsingContext, send_webhooks_task
+from db.managers.base import NotFoundError
+from db.managers.cache import webhook_cache
+from db.managers.managers import WebhookManager, MatchManager, WebhookDeliveryManager
+from db.models.models import Webhook, Match, WebhookDelivery, WebhookDeliveryStatus
+from tasks import DemoParsingContext, send_webhooks_task, deliver_webhook_task, requeue_webhook_deliveries_task
 
 
 async def webhook_list_controller() -> list[Webhook]:
@@ -28,17 +33,32 @@ async def webhook_create_controller(payload: MatchStatsWebhookPayload) -> Webhoo
 async def webhook_patch_controller(webhook_id: str, payload: MatchStatsWebhookPayload) -> Webhook:
     manager = WebhookManager(get_mongo_db())
 
-    return await manager.update(id_=webhook_id, patch=payload.model_dump())
+    webhook = await manager.update(id_=webhook_id, patch=payload.model_dump())
+    await webhook_cache.invalidate(webhook_id)
+    if webhook:
+        # the endpoint or its settings changed: start deltas over from full player documents
+        await WebhookPayloadEncoder(webhook).reset()
+
+    return webhook
 
 
 async def webhook_delete_controller(webhook_id: str) -> Response:
     manager = WebhookManager(get_mongo_db())
 
+    webhook = await manager.get(id_=webhook_id)
     await manager.delete(id_=webhook_id)
+    await webhook_cache.invalidate(webhook_id)
+    if webhook:
+        await WebhookPayloadEncoder(webhook).reset()
 
     return Response(status_code=204)
 
 
+async def rank_descriptions_controller() -> RankDescriptionsVersion:
+
+    return RankDescriptionsVersion(version=RANK_DESCRIPTIONS_VERSION, rank_descriptions=RANK_DESCRIPTIONS)
+
+
 async def send_match_stats_webhook_controller(match: str):
     filter_by = {}
     if str(match).startswith("CSGO"):
@@ -51,11 +71,11 @@ async def send_match_stats_webhook_controller(match: str):
 
     match: Match = await MatchManager(get_mongo_db()).get(**filter_by, raise_not_found=True)
     context = DemoParsingContext(
-        match=match,
         match_code=match.match_code,
         lock_key=match.match_code,
     )
-    send_webhooks_task.apply_async(args=(context.model_dump(),))
+    context.set_match(match, created=False)
+    send_webhooks_task.apply_async(args=(context.dump(),))
 
 
 async def send_player_stats_webhook_controller(webhook_id: str, body: PlayerStatWebhookRequestBody) -> WebhookSendResult:
@@ -63,4 +83,51 @@ async def send_player_stats_webhook_controller(webhook_id: str, body: PlayerStat
     webhook = await WebhookManager(get_mongo_db()).get(id_=webhook_id, raise_not_found=True)
     result = await sender.send(webhook=webhook)
 
-    return result
\ No newline at end of file
+    return result
+
+
+async def webhook_deliveries_list_controller(
+    status: WebhookDeliveryStatus | None = None,
+    webhook_id: str | None = None,
+    limit: int = 100,
+) -> list[WebhookDelivery]:
+    filter_by = {}
+    if status:
+        filter_by["status"] = status
+    if webhook_id:
+        filter_by["webhook_id"] = webhook_id
+
+    return await WebhookDeliveryManager(get_mongo_db()).list_(
+        filter_by=filter_by,
+        sort=[("created", -1)],
+        limit=limit,
+    )
+
+
+async def replay_webhook_delivery_controller(delivery_id: str) -> list[WebhookDelivery]:
+    delivery = await WebhookDeliveryManager(get_mongo_db()).get(id_=delivery_id, raise_not_found=True)
+    if delivery.status != WebhookDeliveryStatus.DEAD:
+        raise ValueError(f"Only dead deliveries can be replayed, delivery is {delivery.status}")
+
+    return await _replay_deliveries(delivery_id=delivery_id)
+
+
+async def replay_webhook_deliveries_controller(webhook_id: str) -> list[WebhookDelivery]:
+    if not await WebhookManager(get_mongo_db()).exists(id_=webhook_id):
+        raise NotFoundError(f"Webhook with id {webhook_id} not found")
+
+    return await _replay_deliveries(webhook_id=webhook_id)
+
+
+async def requeue_webhook_deliveries_controller() -> Response:
+    requeue_webhook_deliveries_task.apply_async()
+
+    return Response(status_code=202)
+
+
+async def _replay_deliveries(**filter_by) -> list[WebhookDelivery]:
+    deliveries = await WebhookDeliveryQueue().replay(**filter_by)
+    for delivery in deliveries:
+        deliver_webhook_task.apply_async(args=(delivery.id,))
+
+    return deliveries
@@ -3,6 +3,7 @@ from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorDatabase
 
 from conf.celery_worker import IN_CELERY_WORKER_PROCESS
 from conf.db import MongoSettings
+from db.monitoring import command_counter
 
 
 def get_mongo_client() -> AsyncIOMotorClient:
@@ -10,6 +11,7 @@ def get_mongo_client() -> AsyncIOMotorClient:
         MongoSettings.uri,
         minPoolSize=MongoSettings.min_pool_size,
         maxPoolSize=MongoSettings.max_pool_size,
+        event_listeners=[command_counter],
     )
     return _client
 
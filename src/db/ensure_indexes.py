@@ -0,0 +1,18 @@
+# deploy step, fails loudly where the api lifespan only logs:
+#
+#   python -m db.ensure_indexes
+import asyncio
+from logging.config import dictConfig
+
+from conf.logging import LOGGING_CONFIG
+from db import get_mongo_db
+from db.managers.managers import ensure_all_indexes
+
+
+async def main() -> None:
+    await ensure_all_indexes(get_mongo_db(), raise_errors=True)
+
+
+if __name__ == "__main__":
+    dictConfig(LOGGING_CONFIG)
+    asyncio.run(main())
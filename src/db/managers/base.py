@@ -140,6 +140,23 @@ class BaseMongoDBManager(Generic[TModel]):
             raise NotFoundError(f"{self.model.__name__} with id {id_} not found")
         return await self.get(id_=id_)
 
+    async def increment(
+        self,
+        *,
+        search_by: dict[str, Any],
+        inc: dict[str, int | float],
+        patch: dict[str, Any] | None = None,
+    ) -> TModel | None:
+        set_doc = dict(patch or {})
+        set_doc["updated"] = utcnow()
+
+        doc = await self.collection.find_one_and_update(
+            search_by,
+            {"$inc": inc, "$set": set_doc},
+            return_document=ReturnDocument.AFTER,
+        )
+        return self._from_doc(doc) if doc else None
+
     async def replace(self, *, id_: str, data: TModel | dict[str, Any], upsert: bool = False) -> TModel | None:
         existing = await self.get(id_=id_)
         now = utcnow()
@@ -164,6 +181,16 @@ class BaseMongoDBManager(Generic[TModel]):
         res = await self.collection.delete_many(filter_by)
         return int(res.deleted_count)
 
+    async def update_many(self, *, filter_by: dict[str, Any], patch: dict[str, Any]) -> int:
+        patch_doc = dict(patch)
+        patch_doc["updated"] = utcnow()
+
+        patch_doc.pop("id", None)
+        patch_doc.pop("created", None)
+
+        res = await self.collection.update_many(filter_by, {"$set": patch_doc})
+        return int(res.modified_count)
+
     async def count(self, *, filter_by: dict[str, Any] | None = None) -> int:
         return int(await self.collection.count_documents(filter_by or {}))
 
@@ -0,0 +1,12 @@
+from conf.cache import WEBHOOK_CACHE_TTL, WEBHOOK_CACHE_SIZE, MATCH_CACHE_TTL, MATCH_CACHE_SIZE
+from db.models.models import Webhook, Match
+from utils.cache import AsyncTTLCache
+
+# keyed by webhook id
+webhook_cache: AsyncTTLCache[Webhook] = AsyncTTLCache("webhooks", maxsize=WEBHOOK_CACHE_SIZE, ttl=WEBHOOK_CACHE_TTL)
+# keyed by match_cache_keys(), a match is reachable by its code and by its cs2 id
+match_cache: AsyncTTLCache[Match] = AsyncTTLCache("matches", maxsize=MATCH_CACHE_SIZE, ttl=MATCH_CACHE_TTL)
+
+
+def match_cache_keys(match: Match) -> tuple[tuple[str, str], tuple[str, int]]:
+    return ("match_code", match.match_code), ("cs2_match_id", match.cs2_match_id)
@@ -0,0 +1,85 @@
+import asyncio
+from collections.abc import Hashable, Iterable
+from typing import Any, Generic
+
+from db.managers.base import BaseMongoDBManager, TModel
+
+
+class BatchLoader(Generic[TModel]):
+
+    def __init__(
+        self,
+        manager: BaseMongoDBManager[TModel],
+        key: str = "id",
+        filter_by: dict[str, Any] | None = None,
+        many: bool = False,
+    ) -> None:
+        self.manager = manager
+        self.key = key
+        self.filter_by = filter_by or {}
+        self.many = many
+
+        self._cache: dict[Hashable, asyncio.Future[Any]] = {}
+        self._pending: list[Hashable] = []
+        self._dispatch_task: asyncio.Task | None = None
+
+    def load(self, key: Hashable) -> asyncio.Future[Any]:
+        if key in self._cache:
+            return self._cache[key]
+
+        loop = asyncio.get_running_loop()
+        future: asyncio.Future[Any] = loop.create_future()
+        self._cache[key] = future
+        self._pending.append(key)
+
+        if self._dispatch_task is None:
+            # keys requested by other coroutines in the same loop tick join this batch
+            self._dispatch_task = loop.create_task(self._dispatch())
+
+        return future
+
+    async def load_many(self, keys: Iterable[Hashable]) -> list[Any]:
+        return list(await asyncio.gather(*[self.load(key) for key in keys]))
+
+    def prime(self, key: Hashable, value: Any) -> None:
+        future = self._cache.get(key)
+        if future is None or future.done():
+            future = asyncio.get_running_loop().create_future()
+            self._cache[key] = future
+        future.set_result(value)
+
+    def clear(self, key: Hashable | None = None) -> None:
+        if key is None:
+            self._cache.clear()
+        else:
+            self._cache.pop(key, None)
+
+    async def _dispatch(self) -> None:
+        keys, self._pending = self._pending, []
+        self._dispatch_task = None
+
+        try:
+            objects: list[TModel] = await self.manager.list_(
+                filter_by={
+                    **self.filter_by,
+                    self.key: {"$in": keys},
+                }
+            )
+        except Exception as exc:
+            for key in keys:
+                future = self._cache.pop(key, None)
+                if future is not None and not future.done():
+                    future.set_exception(exc)
+            return
+
+        by_key: dict[Hashable, Any] = {}
+        for obj in objects:
+            if self.many:
+                by_key.setdefault(getattr(obj, self.key), []).append(obj)
+            else:
+                by_key[getattr(obj, self.key)] = obj
+
+        for key in keys:
+            future = self._cache.get(key)
+            if future is not None and not future.done():
+                future.set_result(by_key.get(key, [] if self.many else None))
@@ -1,6 +1,12 @@
+import logging
+
+from motor.motor_asyncio import AsyncIOMotorDatabase
+
 from db.managers.base import BaseMongoDBManager
 from db.models.models import DemoParsingTask, Match, Player, PlayerMatchStat, PlayerRankChange, Webhook, \
-    MatchSource
+    MatchSource, WebhookDelivery
+
+logger = logging.getLogger(__name__)
 
 
 class DemoParsingTaskManager(BaseMongoDBManager):
@@ -29,7 +35,42 @@ class PlayerMatchStatManager(BaseMongoDBManager):
 class PlayerRankChangeManager(BaseMongoDBManager):
     model = PlayerRankChange
     collection_name = 'player_rank_changes'
+    indexes = [
+        {"keys": [("player_steam_id", 1), ("sequence", 1)]},
+        {"keys": [("player_steam_id", 1), ("created", 1)]},
+        {"keys": [("cs2_match_id", 1), ("player_steam_id", 1)], "kwargs": {"unique": True}},
+    ]
 
 class WebhookManager(BaseMongoDBManager):
     model = Webhook
     collection_name = 'webhooks'
+    indexes = [
+        # multikey: one entry per subscribed steam id, an inverted index maintained by mongo on every write
+        {"keys": [("expected_steam_ids", 1), ("active", 1)]},
+    ]
+
+
+class WebhookDeliveryManager(BaseMongoDBManager):
+    model = WebhookDelivery
+    collection_name = 'webhook_deliveries'
+    indexes = [
+        {"keys": [("status", 1), ("next_attempt_at", 1)]},
+        {"keys": [("webhook_id", 1), ("status", 1)]},
+        {"keys": [("batch_delivery_id", 1)]},
+        {"keys": [("status", 1), ("updated", 1)]},
+    ]
+
+
+async def ensure_all_indexes(db: AsyncIOMotorDatabase, raise_errors: bool = False) -> None:
+    failed = []
+    for manager_class in BaseMongoDBManager.__subclasses__():
+        if not manager_class.indexes:
+            continue
+        try:
+            await manager_class(db).ensure_indexes()
+        except Exception as exc:
+            failed.append(manager_class.__name__)
+            logger.error("ensure_all_indexes: Failed to create indexes for %s: %s", manager_class.__name__, exc)
+
+    if failed and raise_errors:
+        raise RuntimeError(f"Failed to create indexes for {', '.join(failed)}")
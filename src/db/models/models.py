@@ -1,6 +1,9 @@
+from datetime import datetime
+
 from components.parsing.models import DemoParsingState
 from components.steam_connector.models import CS2DemoInfo
 from db.models.base import BaseMongoModel
+from utils.base_types import StringEnum
 
 
 class Player(BaseMongoModel):
@@ -10,13 +13,17 @@ class Player(BaseMongoModel):
     profile_url: str | None = None
     avatar_url: str | None = None
     steam_profile_name: str | None = None
+    profile_refreshed_at: datetime | None = None
 
     # stats
     rank: int | None = None
     avg_kd: float | None = None
+    kills_total: int | None = None
+    deaths_total: int | None = None
     games_played: int | None = None
     plus_kd_games: int | None = None
     minus_kd_games: int | None = None
+    rank_sequence: int = 0
 
 
 
@@ -30,6 +37,7 @@ class Match(BaseMongoModel):
     ct_score: int
 
     demo_info: CS2DemoInfo | None = None
+    rolled_back_at: datetime | None = None
 
 
 class PlayerMatchStat(BaseMongoModel):
@@ -45,6 +53,12 @@ class PlayerRankChange(BaseMongoModel):
     cs2_match_id: int
     old_rank: int | None = None
     new_rank: int
+    sequence: int = 0
+
+
+class WebhookCompression(StringEnum):
+    GZIP = "gzip"
+    ZSTD = "zstd"
 
 
 class Webhook(BaseMongoModel):
@@ -52,6 +66,41 @@ class Webhook(BaseMongoModel):
     active: bool
     expected_steam_ids: list[str]
 
+    # seconds to collect events into one batched body, None sends every event on its own
+    batch_window: float | None = None
+    batch_max_events: int | None = None
+
+    # payload options
+    compression: WebhookCompression | None = None
+    slim_payload: bool = False
+    delta_players: bool = False
+
+
+class WebhookDeliveryStatus(StringEnum):
+    PENDING = "PENDING"
+    RETRYING = "RETRYING"
+    DELIVERED = "DELIVERED"
+    DEAD = "DEAD"
+    BATCHED = "BATCHED"
+    MERGED = "MERGED"
+
+
+class WebhookDelivery(BaseMongoModel):
+    webhook_id: str
+    webhook_type: str
+    payload: str
+    source: str | None = None
+
+    status: WebhookDeliveryStatus = WebhookDeliveryStatus.PENDING
+    attempts: int = 0
+    next_attempt_at: datetime | None = None
+    lease_until: datetime | None = None
+    delivered_at: datetime | None = None
+    last_status_code: int | None = None
+    last_error: str | None = None
+    batch_delivery_id: str | None = None
+
+
 class MatchSource(BaseMongoModel):
     steam_id: str
     auth_code: str
@@ -0,0 +1,36 @@
+from collections import Counter
+from collections.abc import Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from pymongo import monitoring
+
+# motor runs commands on executor threads with a copy of the caller's context, so this reaches them
+_command_counts: ContextVar[Counter[str] | None] = ContextVar("db_command_counts", default=None)
+
+
+class CommandCounter(monitoring.CommandListener):
+
+    def started(self, event: monitoring.CommandStartedEvent) -> None:
+        counts = _command_counts.get()
+        if counts is not None:
+            counts[event.command_name] += 1
+
+    def succeeded(self, event: monitoring.CommandSucceededEvent) -> None:
+        pass
+
+    def failed(self, event: monitoring.CommandFailedEvent) -> None:
+        pass
+
+
+@contextmanager
+def count_db_commands() -> Iterator[Counter[str]]:
+    counts: Counter[str] = Counter()
+    token = _command_counts.set(counts)
+    try:
+        yield counts
+    finally:
+        _command_counts.reset(token)
+
+
+command_counter = CommandCounter()
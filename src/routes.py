@@ -1,23 +1,41 @@
 from fastapi import FastAPI
 
 from controllers.demo import run_demo_parsing_controller
+from controllers.leaderboard import leaderboard_top_controller, leaderboard_range_controller, \
+    leaderboard_player_controller, leaderboard_rebuild_controller
 from controllers.match_source import match_source_list_controller, match_source_detail_controller, \
     match_source_create_controller, match_source_patch_controller, match_source_delete_controller, \
     collect_all_match_sources_controller, collect_match_source_controller
-from controllers.ranking import recalibrate_all
-from controllers.service import ping_controller
+from controllers.ranking import recalibrate_all, rebuild_players_stats, resequence_rank_ledger, \
+    rollback_match_controller
+from controllers.service import ping_controller, steam_api_rate_controller, steam_api_semaphore_wait_controller, \
+    http_pools_controller, caches_controller, metrics_controller
 from controllers.webhook import webhook_list_controller, webhook_detail_controller, webhook_create_controller, \
     webhook_patch_controller, webhook_delete_controller, send_match_stats_webhook_controller, \
-    send_player_stats_webhook_controller
+    send_player_stats_webhook_controller, webhook_deliveries_list_controller, replay_webhook_delivery_controller, \
+    replay_webhook_deliveries_controller, requeue_webhook_deliveries_controller, rank_descriptions_controller
 
 
 def prepare_routes(app: FastAPI) -> None:
 
     app.add_api_route("/api/ping/", ping_controller, methods=["GET"], tags=["Service"])
+    app.add_api_route("/metrics", metrics_controller, methods=["GET"], tags=["Service"])
+    app.add_api_route("/api/service/steam_api_rate/", steam_api_rate_controller, methods=["GET"], tags=["Service"])
+    app.add_api_route("/api/service/steam_api_semaphore_wait/", steam_api_semaphore_wait_controller, methods=["GET"], tags=["Service"])
+    app.add_api_route("/api/service/http_pools/", http_pools_controller, methods=["GET"], tags=["Service"])
+    app.add_api_route("/api/service/caches/", caches_controller, methods=["GET"], tags=["Service"])
     app.add_api_route("/api/service/recalibrate_all/", recalibrate_all, methods=["POST"], tags=["Service"])
+    app.add_api_route("/api/service/rebuild_players_stats/", rebuild_players_stats, methods=["POST"], tags=["Service"])
+    app.add_api_route("/api/service/resequence_rank_ledger/", resequence_rank_ledger, methods=["POST"], tags=["Service"])
 
     app.add_api_route("/api/demo/parse/", run_demo_parsing_controller, methods=["POST"], tags=["Demo"])
+    app.add_api_route("/api/match/{match}/rollback/", rollback_match_controller, methods=["POST"], tags=["Demo"])
 
+    app.add_api_route("/api/webhook/deliveries/", webhook_deliveries_list_controller, methods=["GET"], tags=["Webhook"])
+    app.add_api_route("/api/webhook/rank_descriptions/", rank_descriptions_controller, methods=["GET"], tags=["Webhook"])
+    app.add_api_route("/api/webhook/deliveries/requeue/", requeue_webhook_deliveries_controller, methods=["POST"], tags=["Webhook"])
+    app.add_api_route("/api/webhook/deliveries/{delivery_id}/replay/", replay_webhook_delivery_controller, methods=["POST"], tags=["Webhook"])
+    app.add_api_route("/api/webhook/{webhook_id}/deliveries/replay/", replay_webhook_deliveries_controller, methods=["POST"], tags=["Webhook"])
     app.add_api_route("/api/webhook/", webhook_list_controller, methods=["GET"], tags=["Webhook"])
     app.add_api_route("/api/webhook/", webhook_create_controller, methods=["POST"], tags=["Webhook"])
     app.add_api_route("/api/webhook/{webhook_id}/", webhook_detail_controller, methods=["GET"], tags=["Webhook"])
@@ -34,4 +52,9 @@ def prepare_routes(app: FastAPI) -> None:
     app.add_api_route("/api/match_source/collect_all/", collect_all_match_sources_controller, methods=["POST"], tags=["MatchSource"])
     app.add_api_route("/api/match_source/{match_source_id}/collect/", collect_match_source_controller, methods=["POST"], tags=["MatchSource"])
 
+    app.add_api_route("/api/leaderboard/rebuild/", leaderboard_rebuild_controller, methods=["POST"], tags=["Leaderboard"])
+    app.add_api_route("/api/leaderboard/{metric}/", leaderboard_range_controller, methods=["GET"], tags=["Leaderboard"])
+    app.add_api_route("/api/leaderboard/{metric}/top/", leaderboard_top_controller, methods=["GET"], tags=["Leaderboard"])
+    app.add_api_route("/api/leaderboard/{metric}/player/{steam_id}/", leaderboard_player_controller, methods=["GET"], tags=["Leaderboard"])
+
 
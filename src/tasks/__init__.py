@@ -1,2 +1,3 @@
 from .demo import *
-from .collecting import *
\ No newline at end of file
+from .collecting import *
+from .webhook import *
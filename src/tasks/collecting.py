@@ -8,9 +8,9 @@ __all__ = [
 
 @celery_app.task(queue="demo_collecting")
 @async_context
-async def collect_demos(match_source_id: str | None = None):
+async def collect_demos(match_source_id: str | None = None, prefetch_demo_urls: bool = False):
     collector = MatchSourceCollector()
     if match_source_id:
-        await collector.collect_source(match_source_id)
+        await collector.collect_source(match_source_id, prefetch_demo_urls=prefetch_demo_urls)
     else:
-        await collector.collect_all_sources()
\ No newline at end of file
+        await collector.collect_all_sources(prefetch_demo_urls=prefetch_demo_urls)
\ No newline at end of file
@@ -4,30 +4,39 @@ import logging
 import math
 import os
 from pathlib import Path
-from typing import Callable, Coroutine
+from typing import Callable, Coroutine, Self
 from urllib.parse import urlparse, unquote
 
-import aiohttp
 from celery import Task
-from pydantic import BaseModel
+from pydantic import BaseModel, model_validator
 
 from celery_app import celery_app, async_context
 from components.demo.processing import DemoProcessing
 from components.parsing.checkers import DemoParsingDeduplicationChecker
+from components.ranking.leaderboard import Leaderboard
+from components.ranking.ledger import RankLedgerSequencer
 from components.ranking.player_stats import PlayerStatsUpdater
 from components.ranking.rank_updater import RankUpdater
-from components.steam_connector.client import SteamConnectorClient
+from components.runner.metrics import DEMO_DOWNLOAD_BYTES, DEMO_SIZE, DEMO_PARSE_DURATION
+from components.steam_connector.demo_urls import DemoUrlResolver
 from components.steam_connector.models import CS2DemoInfo
+from components.steam_connector.profiles import SteamProfileRefresher
 from components.steam_connector.steam_api import SteamAPIClient
+from components.webhook.delivery import WebhookDeliveryQueue
 from components.webhook.models import WebhookType
 from components.webhook.sender import MatchStatWebhookSender, CalibrationWebhookSender, PlayerStatWebhookSender
 from conf.demo import DEMO_BASE_DIR
-from conf.parsing import PARSING_DEDUP_KEY_TTL
-from conf.ranking import RANKING_INITIAL_RANK
-from db import get_database, get_mongo_db
+from conf.http import DEMO_DOWNLOAD_READ_TIMEOUT
+from conf.parsing import PARSING_DEDUP_KEY_TTL, PARSING_COMPACT_CONTEXT
+from conf.ranking import RANKING_INITIAL_RANK, RANKING_INCREMENTAL_STATS
+from conf.steam_connector import STEAM_PROFILE_REFRESH_DELAY
+from db import get_mongo_db
+from db.managers.cache import match_cache
 from db.managers.managers import PlayerManager, MatchManager, WebhookManager
 from db.models.models import Match
+from tasks.webhook import dispatch_webhook_deliveries
 from utils.concurrency import RedisLock
+from utils.http import HTTPClientPool
 
 
 __all__ = [
@@ -37,7 +46,11 @@ __all__ = [
     "parse_demo_task",
     "rank_calculation_task",
     "refresh_steam_profiles_task",
-    "send_webhooks_task"
+    "send_webhooks_task",
+    "rebuild_players_stats_task",
+    "rebuild_leaderboard_task",
+    "resequence_rank_ledger_task",
+    "refresh_steam_profiles_batch_task",
 ]
 
 logger = logging.getLogger(__name__)
@@ -45,45 +58,87 @@ logger = logging.getLogger(__name__)
 class DemoParsingContext(BaseModel):
     match_code: str
     lock_key: str
+    lock_token: str | None = None
     demo_info: CS2DemoInfo | None = None
     demo_file_path: str | None = None
+    cs2_match_id: int | None = None
     match: Match | None = None
     match_was_created: bool | None = None
 
+    @model_validator(mode="after")
+    def _fill_cs2_match_id(self) -> Self:
+        # contexts queued before cs2_match_id existed carry only the full match
+        if self.cs2_match_id is None and self.match is not None:
+            self.cs2_match_id = self.match.cs2_match_id
+        return self
+
+    def set_match(self, match: Match, created: bool) -> None:
+        self.cs2_match_id = match.cs2_match_id
+        self.match_was_created = created
+        if PARSING_COMPACT_CONTEXT:
+            # the match document keeps the demo info, later stages load it by id
+            self.demo_info = None
+        else:
+            self.match = match
+
+    async def get_match(self) -> Match:
+        if self.match:
+            return self.match
+
+        return await match_cache.get(
+            ("cs2_match_id", self.cs2_match_id),
+            lambda: MatchManager(get_mongo_db()).get(raise_not_found=True, cs2_match_id=self.cs2_match_id),
+        )
+
+    def dump(self) -> dict:
+        # plain types only, whatever the task serializer
+        return self.model_dump(mode="json", exclude_none=True)
+
 
 class DemoParsingError(Exception):
     pass
 
+def _find_context(args: tuple, kwargs: dict) -> dict:
+    context = kwargs.get("context", {})
+    if context.get("lock_key"):
+        return context
+
+    for arg in args:
+        if isinstance(arg, dict) and arg.get("lock_key"):
+            return arg
+
+    return {}
+
+
 def unlock_on_error(func: Callable[[dict], Coroutine]) -> Callable:
     @functools.wraps(func)
     async def wrapper(*args, **kwargs):
+        context = _find_context(args, kwargs)
+        lock_key = context.get("lock_key", None)
+        lock_token = context.get("lock_token", None)
+        lock = RedisLock(lock_key, ttl=PARSING_DEDUP_KEY_TTL, token=lock_token) if lock_key and lock_token else None
+
         try:
+            if lock:
+                async with lock.renewing():
+                    return await func(*args, **kwargs)
+
             return await func(*args, **kwargs)
+
         except Exception as exc:
             logger.exception(exc)
-            context = kwargs.get("context", {})
-            lock_key = context.get("lock_key", None)
-
-            if not lock_key:
-                for arg in args:
-                    if isinstance(arg, dict):
-                        lock_key = arg.get("lock_key", None)
-                        if lock_key:
-                            break
-            if lock_key:
-                lock = RedisLock(lock_key)
+            if lock:
                 await lock.release()
 
             else:
-                logger.error("DemoParsing: Could not find lock key in call args")
+                logger.error("DemoParsing: Could not find lock key and owner token in call args")
 
-            logger.exception(exc)
             raise exc
 
 
     return wrapper
 
-@celery_app.task(queue="demo_parsing")
+@celery_app.task(queue="demo_io", ignore_result=True)
 @async_context
 @unlock_on_error
 async def request_demo_url_task(context: dict) -> dict:
@@ -99,32 +154,29 @@ async def request_demo_url_task(context: dict) -> dict:
 
 
     await DemoParsingDeduplicationChecker.check_parsing_duplicate(match_code, raise_exc=True)
-    parsing_lock = RedisLock(context.lock_key, ttl=PARSING_DEDUP_KEY_TTL)
+    parsing_lock = RedisLock(context.lock_key, ttl=PARSING_DEDUP_KEY_TTL, token=context.lock_token)
     await parsing_lock.reacquire()
+    context.lock_token = parsing_lock.token
 
-    existing_match: Match = await MatchManager(get_database()).get(match_code=match_code)
-
-    demo_info: CS2DemoInfo | None = None
-    if existing_match and existing_match.demo_info:
-        demo_info = existing_match.demo_info
-        logger.info(
-            "request_demo_url_task: Found existing match %s with existing demo info. Skipping request to connector",
-            match_code
-        )
-    else:
-        async with SteamConnectorClient() as client:
-            demo_info = await client.get_demo_url(match_code)
+    demo_infos = await DemoUrlResolver().resolve([match_code])
+    demo_info: CS2DemoInfo | None = demo_infos.get(match_code)
+    if not demo_info:
+        raise DemoParsingError(f"Could not resolve demo info for {match_code}")
 
     context.demo_info = demo_info
     logger.info("request_demo_url_task: found demo url %s", demo_info.demo_url)
-    return context.model_dump()
+    return context.dump()
 
 
 class DownloadDemoFileTask(Task):
     name = "download_demo_file"
-    queue = "demo_parsing"
+    queue = "demo_io"
+    # the chain hands the context to the next stage, the result backend doesn't need it
+    ignore_result = True
 
     retry_kwargs = {"max_retries": 5}
+    # no total timeout: demos are large, a stalled transfer is caught by the read timeout
+    http_pool = HTTPClientPool("demo_download", read_timeout=DEMO_DOWNLOAD_READ_TIMEOUT)
 
     @async_context
     @unlock_on_error
@@ -147,24 +199,28 @@ class DownloadDemoFileTask(Task):
         final_path = demo_base_dir / f"{match_code}__{url_name}"
 
         logger.info("DownloadDemoFileTask: Starting download demo file for %s. Output path: %s", match_code, final_path)
-        async with aiohttp.ClientSession() as session:
-            async with session.get(demo_url) as resp:
-                resp.raise_for_status()
-                content_length = resp.headers.get("Content-Length")
-                if not content_length:
-                    logger.warning("DownloadDemoFileTask: No content length for %s", demo_url)
-                else:
-                    content_length = int(content_length)
-                chunk_size = 1024 * 1024
-                total_chunks = content_length // chunk_size if content_length else None
-                current_chunk = 0
-                with tmp_path.open("wb") as f:
-                    async for chunk in resp.content.iter_chunked(1024 * 1024):
-                        if logger.isEnabledFor(logging.DEBUG) and total_chunks:
-                            logger.debug("DownloadDemoFileTask: downloaded %s / %s chunks...", current_chunk, total_chunks)
-                        if chunk:
-                            f.write(chunk)
-                            current_chunk += 1
+        session = await self.http_pool.get_session()
+        async with session.get(demo_url) as resp:
+            resp.raise_for_status()
+            content_length = resp.headers.get("Content-Length")
+            if not content_length:
+                logger.warning("DownloadDemoFileTask: No content length for %s", demo_url)
+            else:
+                content_length = int(content_length)
+            chunk_size = 1024 * 1024
+            total_chunks = content_length // chunk_size if content_length else None
+            current_chunk = 0
+            downloaded_bytes = 0
+            with tmp_path.open("wb") as f:
+                async for chunk in resp.content.iter_chunked(1024 * 1024):
+                    if logger.isEnabledFor(logging.DEBUG) and total_chunks:
+                        logger.debug("DownloadDemoFileTask: downloaded %s / %s chunks...", current_chunk, total_chunks)
+                    if chunk:
+                        f.write(chunk)
+                        current_chunk += 1
+                        downloaded_bytes += len(chunk)
+
+        await DEMO_DOWNLOAD_BYTES.inc(downloaded_bytes)
 
         with tmp_path.open("rb") as f:
             head = f.read(16)
@@ -187,8 +243,10 @@ class DownloadDemoFileTask(Task):
             os.replace(tmp_path, final_path)
             result_path = final_path
 
+        await DEMO_SIZE.observe(result_path.stat().st_size)
+
         context.demo_file_path = str(result_path)
-        return context.model_dump()
+        return context.dump()
 
     @staticmethod
     def _filename_from_url(url: str, match_code: str) -> str:
@@ -201,7 +259,8 @@ class DownloadDemoFileTask(Task):
         return len(first_bytes) >= 3 and first_bytes[:3] == b"BZh"
 
 
-@celery_app.task(queue="demo_parsing")
+# the only cpu-bound stage: a crashed worker must not lose the demo, it is redelivered instead
+@celery_app.task(queue="demo_parsing", ignore_result=True, acks_late=True, reject_on_worker_lost=True)
 @async_context
 @unlock_on_error
 async def parse_demo_task(context: dict) -> dict:
@@ -210,47 +269,56 @@ async def parse_demo_task(context: dict) -> dict:
 
     demo_processing = DemoProcessing(demo_file_path, context.demo_info)
     match, created = await demo_processing.process_demo()
-    context.match = match
-    context.match_was_created = created
+    await DEMO_PARSE_DURATION.observe(demo_processing.parse_seconds)
+    context.set_match(match, created)
 
-    return context.model_dump()
+    return context.dump()
 
 
-@celery_app.task(queue="demo_parsing")
+@celery_app.task(queue="demo_io", ignore_result=True)
 @async_context
 @unlock_on_error
 async def rank_calculation_task(context: dict) -> dict:
     context: DemoParsingContext = DemoParsingContext.model_validate(context)
-    cs2_match_id = context.match.cs2_match_id
-    rank_updater = RankUpdater(cs2_match_id)
-    stats_updater = PlayerStatsUpdater()
+    rank_updater = RankUpdater(context.cs2_match_id)
     await rank_updater.update_player_ranks()
-    await stats_updater.calculate_players_stats(context.match.player_steam_ids)
+
+    if not RANKING_INCREMENTAL_STATS:
+        match: Match = await context.get_match()
+        stats_updater = PlayerStatsUpdater()
+        await stats_updater.calculate_players_stats(match.player_steam_ids)
 
 
-    return context.model_dump()
+    return context.dump()
 
 
-@celery_app.task(queue="demo_parsing")
+@celery_app.task(queue="demo_parsing_backfill")
 @async_context
 @unlock_on_error
 async def all_players_calibration_task():
     db = get_mongo_db()
     player_manager = PlayerManager(db)
 
+    players = await player_manager.list_()
+    # served by the multikey expected_steam_ids index: one lookup per player instead of a scan
     webhooks = await WebhookManager(db).list_(
         filter_by={
             "active": True,
+            "expected_steam_ids": {"$in": [player.steam_id for player in players]},
         }
     )
-    sender = CalibrationWebhookSender()
-    await sender.send_all()
+    delivery_queue = WebhookDeliveryQueue()
+    result = await delivery_queue.enqueue(CalibrationWebhookSender(), source="calibration", webhooks=webhooks)
+    dispatch_webhook_deliveries(result)
 
     matches = await MatchManager(db).list_(
+        filter_by={
+            "rolled_back_at": None,
+        },
         sort=[("created", 1)]
     )
 
-    for player in await player_manager.list_():
+    for player in players:
         await player_manager.update(
             search_by={
                 "steam_id": player.steam_id,
@@ -262,72 +330,90 @@ async def all_players_calibration_task():
 
     for match in matches:
         rank_updater = RankUpdater(match.cs2_match_id)
-        stats_updater = PlayerStatsUpdater()
         await rank_updater.update_player_ranks(overwrite=True)
-        await stats_updater.calculate_players_stats(match.player_steam_ids)
+
+    await PlayerStatsUpdater().rebuild_all_players_stats()
 
     for webhook in webhooks:
         player_stat_sender = PlayerStatWebhookSender(
             webhook.expected_steam_ids
         )
-        await player_stat_sender.send(webhook)
+        result = await delivery_queue.enqueue(player_stat_sender, source="calibration", webhooks=[webhook])
+        dispatch_webhook_deliveries(result)
+
+
+@celery_app.task(queue="demo_parsing_backfill")
+@async_context
+async def rebuild_players_stats_task():
+    await PlayerStatsUpdater().rebuild_all_players_stats()
+
+
+@celery_app.task(queue="demo_parsing_backfill")
+@async_context
+async def resequence_rank_ledger_task():
+    players_count = await RankLedgerSequencer().resequence_all()
+    logger.info("resequence_rank_ledger_task: Resequenced rank ledger for %s players", players_count)
+
 
+@celery_app.task(queue="demo_io_backfill")
+@async_context
+async def rebuild_leaderboard_task():
+    players_count = await Leaderboard().rebuild()
+    logger.info("rebuild_leaderboard_task: Rebuilt leaderboard from %s players", players_count)
 
 
 class RefreshSteamProfilesTask(Task):
     name = "refresh_steam_profiles_task"
-    queue = "demo_parsing"
+    queue = "demo_io"
+    ignore_result = True
 
 
     @async_context
     @unlock_on_error
     async def run(self, context: dict) -> dict:
         context: DemoParsingContext = DemoParsingContext.model_validate(context)
-        player_steam_ids = context.match.player_steam_ids
-
-        async with SteamAPIClient() as client:
-            steam_profiles_info = await client.get_profiles_info(player_steam_ids)
-
-        player_manager = PlayerManager(get_database())
-
-        logger.info("RefreshSteamProfilesTask: Updating steam profiles info for steam ids %s",  player_steam_ids)
-        for steam_id, info in steam_profiles_info.items():
-            if not info:
-                logger.warning("RefreshSteamProfilesTask: No info for steam id %s", steam_id)
-                continue
-
-            profile_url = info.get("profileurl")
-            avatar_url = info.get("avatarfull")
-            steam_profile_name = info.get("personaname")
-            data_to_update = {}
-            if profile_url:
-                data_to_update["profile_url"] = profile_url
-            if avatar_url:
-                data_to_update["avatar_url"] = avatar_url
-            if steam_profile_name:
-                data_to_update["steam_profile_name"] = steam_profile_name
-
-            if data_to_update:
-                await player_manager.update(
-                    search_by={
-                        "steam_id": steam_id,
-                    },
-                    patch=data_to_update
-                )
-
-        return context.model_dump()
-
-
-@celery_app.task(queue="demo_parsing")
+        match: Match = await context.get_match()
+        player_steam_ids = match.player_steam_ids
+
+        refresher = SteamProfileRefresher()
+        missing_steam_ids, stale_steam_ids = await refresher.split_by_freshness(player_steam_ids)
+
+        if missing_steam_ids:
+            logger.info("RefreshSteamProfilesTask: Fetching steam profiles info for new steam ids %s", missing_steam_ids)
+            await refresher.refresh(missing_steam_ids)
+
+        if stale_steam_ids:
+            pending_count, schedule_flush = await refresher.enqueue(stale_steam_ids)
+            logger.info(
+                "RefreshSteamProfilesTask: Queued stale steam ids %s for batched refresh (%s pending)",
+                stale_steam_ids,
+                pending_count,
+            )
+            if pending_count >= SteamAPIClient.max_ids_per_request:
+                refresh_steam_profiles_batch_task.apply_async()
+            elif schedule_flush:
+                refresh_steam_profiles_batch_task.apply_async(countdown=STEAM_PROFILE_REFRESH_DELAY)
+
+        return context.dump()
+
+
+@celery_app.task(queue="demo_io")
+@async_context
+async def refresh_steam_profiles_batch_task():
+    await SteamProfileRefresher().flush()
+
+
+@celery_app.task(queue="demo_io", ignore_result=True)
 @async_context
 @unlock_on_error
 async def send_webhooks_task(context: dict) -> dict:
     context: DemoParsingContext = DemoParsingContext.model_validate(context)
-    match_code = context.match.match_code
+    match_code = context.match_code
     sender = MatchStatWebhookSender(match_code)
-    await sender.send_all()
+    result = await WebhookDeliveryQueue().enqueue(sender, source=match_code)
+    dispatch_webhook_deliveries(result)
 
-    return context.model_dump()
+    return context.dump()
 
 
 download_demo_file_task = celery_app.register_task(DownloadDemoFileTask)
@@ -0,0 +1,62 @@
+import logging
+
+from celery_app import celery_app, async_context
+from components.webhook.delivery import WebhookDeliveryQueue
+from components.webhook.models import WebhookEnqueueResult
+
+
+__all__ = [
+    "deliver_webhook_task",
+    "flush_webhook_batch_task",
+    "requeue_webhook_deliveries_task",
+    "dispatch_webhook_deliveries",
+]
+
+logger = logging.getLogger(__name__)
+
+
+def dispatch_webhook_deliveries(result: WebhookEnqueueResult) -> None:
+    for delivery in result.deliveries:
+        deliver_webhook_task.apply_async(args=(delivery.id,))
+
+    for webhook_id, flush_in in result.batch_flushes.items():
+        flush_webhook_batch_task.apply_async(args=(webhook_id,), countdown=flush_in)
+
+
+@celery_app.task(queue="webhook_delivery")
+@async_context
+async def deliver_webhook_task(delivery_id: str):
+    retry_in = await WebhookDeliveryQueue().deliver(delivery_id)
+    if retry_in is not None:
+        deliver_webhook_task.apply_async(args=(delivery_id,), countdown=retry_in)
+
+
+@celery_app.task(queue="webhook_delivery")
+@async_context
+async def flush_webhook_batch_task(webhook_id: str):
+    batch_delivery, has_more = await WebhookDeliveryQueue().flush_batch(webhook_id)
+    if batch_delivery:
+        deliver_webhook_task.apply_async(args=(batch_delivery.id,))
+
+    if has_more:
+        flush_webhook_batch_task.apply_async(args=(webhook_id,))
+
+
+@celery_app.task(queue="webhook_delivery")
+@async_context
+async def requeue_webhook_deliveries_task():
+    delivery_queue = WebhookDeliveryQueue()
+    await delivery_queue.release_orphaned_merges()
+    deliveries = await delivery_queue.list_overdue()
+    for delivery in deliveries:
+        deliver_webhook_task.apply_async(args=(delivery.id,))
+
+    webhook_ids = await delivery_queue.list_overdue_batches()
+    for webhook_id in webhook_ids:
+        flush_webhook_batch_task.apply_async(args=(webhook_id,))
+
+    logger.info(
+        "requeue_webhook_deliveries_task: Requeued %s overdue deliveries and %s overdue batches",
+        len(deliveries),
+        len(webhook_ids),
+    )
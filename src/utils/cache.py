@@ -0,0 +1,158 @@
+import logging
+import threading
+import time
+from collections import Counter, OrderedDict
+from collections.abc import Awaitable, Callable, Hashable
+from typing import Generic, TypeVar
+
+from conf.cache import CACHE_INVALIDATION_CHECK_INTERVAL, CACHE_STATS_TTL
+from redis_client import get_redis
+from utils.concurrency import SingleFlight
+from utils.metrics import publish_process_stats, collect_process_stats
+
+logger = logging.getLogger(__name__)
+
+V = TypeVar("V")
+
+
+class AsyncTTLCache(Generic[V]):
+    stats_name = "cache"
+
+    # every cache of the process by name, for stats
+    _caches: dict[str, "AsyncTTLCache"] = {}
+    _stats_dirty = False
+
+    def __init__(
+        self,
+        name: str,
+        maxsize: int = 1024,
+        ttl: float = 60,
+        cache_none: bool = False,
+        invalidation_check_interval: float = CACHE_INVALIDATION_CHECK_INTERVAL,
+    ) -> None:
+        self.name = name
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.cache_none = cache_none
+        self.invalidation_check_interval = invalidation_check_interval
+        self.generation_key = f"cache-generation:{name}"
+
+        self._entries: OrderedDict[Hashable, tuple[float, V]] = OrderedDict()
+        # threads-pool workers share the cache between threads, each with its own event loop
+        self._lock = threading.Lock()
+        self._single_flight = SingleFlight()
+        self._counters: Counter[str] = Counter()
+        self._generation: str | None = None
+        self._generation_checked_at = 0.0
+        # bumped on every invalidation, loads started before one must not store their value
+        self._epoch = 0
+
+        self._caches[name] = self
+
+    async def get(self, key: Hashable, loader: Callable[[], Awaitable[V]]) -> V:
+        await self._check_generation()
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at > time.monotonic():
+                    self._entries.move_to_end(key)
+                    self._count("hits")
+                    return value
+
+                del self._entries[key]
+                self._count("expired")
+
+        self._count("misses")
+        # concurrent misses for one key share a single load
+        return await self._single_flight.do(key, lambda: self._load(key, loader))
+
+    def invalidate_local(self, key: Hashable | None = None) -> None:
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
+            self._epoch += 1
+            self._count("invalidations")
+
+    async def invalidate(self, *keys: Hashable) -> None:
+        # drops the keys here and, through the generation stamp, everything cached by other processes
+        if keys:
+            for key in keys:
+                self.invalidate_local(key)
+        else:
+            self.invalidate_local()
+
+        try:
+            self._generation = str(await get_redis().incr(self.generation_key))
+        except Exception as exc:
+            logger.warning("AsyncTTLCache: Failed to bump generation of %s: %s", self.name, exc)
+
+    def stats(self) -> dict[str, int | float]:
+        counters = self._counters
+        lookups = counters["hits"] + counters["misses"]
+        return {
+            "size": len(self._entries),
+            "maxsize": self.maxsize,
+            "ttl": self.ttl,
+            "hits": counters["hits"],
+            "misses": counters["misses"],
+            "hit_ratio": counters["hits"] / lookups if lookups else 0,
+            "loads": counters["loads"],
+            "expired": counters["expired"],
+            "evictions": counters["evictions"],
+            "invalidations": counters["invalidations"],
+        }
+
+    async def _load(self, key: Hashable, loader: Callable[[], Awaitable[V]]) -> V:
+        epoch = self._epoch
+        value = await loader()
+        self._count("loads")
+
+        with self._lock:
+            if epoch == self._epoch and (value is not None or self.cache_none):
+                self._entries[key] = (time.monotonic() + self.ttl, value)
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.maxsize:
+                    self._entries.popitem(last=False)
+                    self._count("evictions")
+
+        return value
+
+    async def _check_generation(self) -> None:
+        now = time.monotonic()
+        if now - self._generation_checked_at < self.invalidation_check_interval:
+            return
+
+        self._generation_checked_at = now
+        try:
+            generation = await get_redis().get(self.generation_key)
+        except Exception as exc:
+            logger.warning("AsyncTTLCache: Failed to check generation of %s: %s", self.name, exc)
+            return
+
+        if generation != self._generation:
+            self._generation = generation
+            self.invalidate_local()
+
+    def _count(self, name: str) -> None:
+        self._counters[name] += 1
+        AsyncTTLCache._stats_dirty = True
+
+    @classmethod
+    def all_stats(cls) -> dict[str, dict[str, int | float]]:
+        return {name: cache.stats() for name, cache in cls._caches.items()}
+
+    @classmethod
+    async def publish_stats(cls) -> None:
+        if not cls._stats_dirty:
+            return
+
+        cls._stats_dirty = False
+        await publish_process_stats(cls.stats_name, cls.all_stats(), ttl=CACHE_STATS_TTL)
+
+    @classmethod
+    async def collect_stats(cls) -> dict[str, dict[str, dict[str, int | float]]]:
+        return await collect_process_stats(cls.stats_name, cls.all_stats())
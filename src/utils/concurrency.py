@@ -1,12 +1,18 @@
 import asyncio
 import datetime
 import logging
+import threading
+import time
 import uuid
-from typing import Self
+import weakref
+from collections.abc import AsyncIterator, Awaitable, Callable, Hashable
+from contextlib import asynccontextmanager, suppress
+from typing import Self, TypeVar
 
 from conf.celery_worker import IN_CELERY_WORKER_PROCESS
-from conf.redis import REDIS_LOCK_TIMEOUT, REDIS_LOCK_TTL
+from conf.redis import REDIS_LOCK_TIMEOUT, REDIS_LOCK_TTL, REDIS_SEMAPHORE_POLL_INTERVAL
 from redis_client import get_redis
+from utils.metrics import RedisHistogram
 from utils.time_utils import utcnow
 
 
@@ -15,47 +21,166 @@ class RedisLockException(Exception):
 
 logger = logging.getLogger(__name__)
 
+T = TypeVar("T")
+
+
+class SingleFlight:
+
+    def __init__(self):
+        # calls are shared per event loop, the worker threads each run their own
+        self._calls: weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, dict[Hashable, asyncio.Future]] = (
+            weakref.WeakKeyDictionary()
+        )
+        self._lock = threading.Lock()
+
+    async def do(self, key: Hashable, func: Callable[[], Awaitable[T]]) -> T:
+        loop = asyncio.get_running_loop()
+
+        with self._lock:
+            calls = self._calls.setdefault(loop, {})
+            future = calls.get(key)
+            if future is None:
+                future = asyncio.ensure_future(func())
+                calls[key] = future
+                future.add_done_callback(lambda done: self._forget(loop, key, done))
+
+        # shield: a cancelled caller must not cancel the call for everyone else
+        return await asyncio.shield(future)
+
+    def _forget(self, loop: asyncio.AbstractEventLoop, key: Hashable, future: asyncio.Future) -> None:
+        with self._lock:
+            calls = self._calls.get(loop, {})
+            if calls.get(key) is future:
+                del calls[key]
+
+
 class RedisLock:
 
-    def __init__(self, key: str, ttl: int | None = None, timeout: int | None = None, raise_locked: bool = False):
+    _acquire_lua = """
+    local key = KEYS[1]
+    local fence_key = KEYS[2]
+    local token = ARGV[1]
+    local ttl_ms = tonumber(ARGV[2])
+
+    if redis.call('SET', key, token, 'NX', 'PX', ttl_ms) then
+        return redis.call('INCR', fence_key)
+    end
+
+    -- already held by this owner: extend the lease and keep its fencing token
+    if redis.call('GET', key) == token then
+        redis.call('PEXPIRE', key, ttl_ms)
+        return tonumber(redis.call('GET', fence_key)) or 0
+    end
+    return -1
+    """
+
+    _renew_lua = """
+    if redis.call('GET', KEYS[1]) == ARGV[1] then
+        return redis.call('PEXPIRE', KEYS[1], tonumber(ARGV[2]))
+    end
+    return 0
+    """
+
+    _release_lua = """
+    local key = KEYS[1]
+    local wakeup_key = KEYS[2]
+
+    if redis.call('GET', key) == ARGV[1] then
+        redis.call('DEL', key)
+        redis.call('LPUSH', wakeup_key, 1)
+        redis.call('LTRIM', wakeup_key, 0, 0)
+        redis.call('EXPIRE', wakeup_key, tonumber(ARGV[2]))
+        return 1
+    end
+    return 0
+    """
+
+    def __init__(
+        self,
+        key: str,
+        ttl: int | None = None,
+        timeout: int | None = None,
+        raise_locked: bool = False,
+        token: str | None = None,
+        poll_interval: float | None = None,
+    ):
         self.key = key
+        self.fence_key = f"{key}:fence"
+        self.wakeup_key = f"{key}:wakeup"
         self.ttl = ttl if ttl is not None else REDIS_LOCK_TTL
         self.timeout = timeout if timeout is not None else REDIS_LOCK_TIMEOUT
         self.raise_locked = raise_locked
+        self.poll_interval = poll_interval if poll_interval is not None else REDIS_SEMAPHORE_POLL_INTERVAL
         self.redis_client = get_redis()
 
+        self.token = token or uuid.uuid4().hex
+        self.fencing_token: int | None = None
+
+        self._acquire_script = self.redis_client.register_script(self._acquire_lua)
+        self._renew_script = self.redis_client.register_script(self._renew_lua)
+        self._release_script = self.redis_client.register_script(self._release_lua)
 
-    async def acquire(self, raise_locked: bool | None = None) -> Self:
-        is_locked = await self._is_locked()
 
+    async def acquire(self, raise_locked: bool | None = None) -> Self:
         if raise_locked is None:
             raise_locked = self.raise_locked
 
+        deadline = time.monotonic() + self.timeout
+        while True:
+            if await self._try_acquire_once():
+                return self
 
-        if raise_locked and is_locked:
-            raise RedisLockException(f"Key {self.key} locked")
+            if raise_locked:
+                raise RedisLockException(f"Key {self.key} locked")
 
-        now = utcnow()
-        timeout_dt = now + datetime.timedelta(seconds=self.timeout)
-        while is_locked:
-            logger.debug(f"RedisLock: awaiting key {self.key}")
-            is_locked = await self._is_locked()
-            now = utcnow()
-            if now > timeout_dt:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
                 raise RedisLockException(f"Key {self.key} locked. Timeout expired")
 
-            await asyncio.sleep(1)
-
-        await self.redis_client.set(self.key, 1)
+            logger.debug(f"RedisLock: awaiting key {self.key}")
+            # woken by release(); the bounded timeout also catches expired leases
+            await self.redis_client.blpop([self.wakeup_key], timeout=min(self.poll_interval, remaining))
 
     async def reacquire(self) -> Self:
-        is_locked = await self._is_locked()
-        if not is_locked:
+        if not await self.renew():
             await self.acquire(raise_locked=False)
+        return self
 
-    async def release(self):
-        if self._is_locked():
-            await self.redis_client.delete(self.key)
+    async def renew(self) -> bool:
+        return bool(await self._renew_script(keys=[self.key], args=[self.token, self._ttl_ms]))
+
+    async def release(self) -> bool:
+        released = bool(await self._release_script(
+            keys=[self.key, self.wakeup_key],
+            args=[self.token, max(int(self.ttl), 5)],
+        ))
+        if not released:
+            logger.warning(f"RedisLock: key {self.key} is not held by this owner, nothing to release")
+        return released
+
+    @asynccontextmanager
+    async def renewing(self, interval: float | None = None) -> AsyncIterator[Self]:
+        interval = interval if interval is not None else max(self.ttl / 3, 1)
+
+        async def _renew_loop():
+            while True:
+                await asyncio.sleep(interval)
+                try:
+                    renewed = await self.renew()
+                except Exception as exc:
+                    logger.warning(f"RedisLock: failed to renew lease on {self.key}, retrying: {exc!r}")
+                    continue
+                if not renewed:
+                    logger.warning(f"RedisLock: lease on {self.key} lost, stopping renewal")
+                    return
+
+        renew_task = asyncio.create_task(_renew_loop())
+        try:
+            yield self
+        finally:
+            renew_task.cancel()
+            with suppress(asyncio.CancelledError):
+                await renew_task
 
 
     async def __aenter__(self) -> Self:
@@ -65,6 +190,41 @@ class RedisLock:
     async def __aexit__(self, exc_type, exc_val, exc_tb):
         await self.release()
 
+    @classmethod
+    async def try_acquire_many(cls, keys: list[str], ttl: int | None = None) -> list[Self]:
+        # a single pipelined round trip, keys held by someone else are left out of the result
+        locks = [cls(key, ttl=ttl) for key in dict.fromkeys(keys)]
+        if not locks:
+            return []
+
+        pipe = locks[0].redis_client.pipeline(transaction=False)
+        for lock in locks:
+            await lock._acquire_script(keys=[lock.key, lock.fence_key], args=[lock.token, lock._ttl_ms], client=pipe)
+        fencing_tokens = await pipe.execute()
+
+        acquired = []
+        for lock, fencing_token in zip(locks, fencing_tokens):
+            if int(fencing_token) >= 0:
+                lock.fencing_token = int(fencing_token)
+                acquired.append(lock)
+
+        return acquired
+
+    @property
+    def _ttl_ms(self) -> int:
+        return int(self.ttl * 1000)
+
+    async def _try_acquire_once(self) -> bool:
+        fencing_token = await self._acquire_script(
+            keys=[self.key, self.fence_key],
+            args=[self.token, self._ttl_ms],
+        )
+        if int(fencing_token) < 0:
+            return False
+
+        self.fencing_token = int(fencing_token)
+        return True
+
     async def _is_locked(self) -> bool:
         return await self.redis_client.get(self.key) is not None
 
@@ -72,6 +232,44 @@ class RedisLock:
 
 class RedisSemaphore:
 
+    # Meow :3
+    _acquire_lua = """
+    local key = KEYS[1]
+    local token = ARGV[1]
+    local now = tonumber(ARGV[2])
+    local expires_at = tonumber(ARGV[3])
+    local capacity = tonumber(ARGV[4])
+    local key_ttl = tonumber(ARGV[5])
+
+    -- remove expired tokens
+    redis.call('ZREMRANGEBYSCORE', key, '-inf', now)
+
+    local count = redis.call('ZCARD', key)
+    if count < capacity then
+        redis.call('ZADD', key, expires_at, token)
+        redis.call('EXPIRE', key, key_ttl)
+        return 1
+    end
+    return 0
+    """
+
+    _release_lua = """
+    local key = KEYS[1]
+    local wakeup_key = KEYS[2]
+    local token = ARGV[1]
+    local capacity = tonumber(ARGV[2])
+    local key_ttl = tonumber(ARGV[3])
+
+    if redis.call('ZREM', key, token) == 1 then
+        -- wake one waiter per freed slot
+        redis.call('LPUSH', wakeup_key, 1)
+        redis.call('LTRIM', wakeup_key, 0, capacity - 1)
+        redis.call('EXPIRE', wakeup_key, key_ttl)
+        return 1
+    end
+    return 0
+    """
+
     def __init__(
         self,
         key: str,
@@ -79,38 +277,46 @@ class RedisSemaphore:
         ttl: int | None = None,
         timeout: int | None = None,
         raise_locked: bool = False,
+        poll_interval: float | None = None,
     ):
         self.key = key
+        self.wakeup_key = f"{key}:wakeup"
         self.capacity = capacity
         self.ttl = ttl if ttl is not None else REDIS_LOCK_TTL
         self.timeout = timeout if timeout is not None else REDIS_LOCK_TIMEOUT
         self.raise_locked = raise_locked
+        self.poll_interval = poll_interval if poll_interval is not None else REDIS_SEMAPHORE_POLL_INTERVAL
         self.redis = get_redis()
 
         self.token = uuid.uuid4().hex
+        self._acquire_script = self.redis.register_script(self._acquire_lua)
+        self._release_script = self.redis.register_script(self._release_lua)
+        self.wait_histogram = RedisHistogram(f"{key}:wait-seconds")
 
     async def acquire(self, raise_locked: bool | None = None) -> Self:
         if raise_locked is None:
             raise_locked = self.raise_locked
 
-        now = utcnow()
-        timeout_dt = now + datetime.timedelta(seconds=self.timeout)
+        started = time.monotonic()
+        deadline = started + self.timeout
 
         while True:
             acquired = await self._try_acquire_once()
 
             if acquired:
+                await self.wait_histogram.observe(time.monotonic() - started)
                 return self
 
             if raise_locked:
                 raise RedisLockException(f"Semaphore {self.key} full")
 
-            now = utcnow()
-            if now > timeout_dt:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
                 raise RedisLockException(f"Semaphore {self.key} full. Timeout expired")
 
             logger.debug(f"RedisSemaphore: awaiting slot for {self.key}")
-            await asyncio.sleep(1)
+            # woken by release(); the bounded timeout also catches slots freed by expiry
+            await self.redis.blpop([self.wakeup_key], timeout=min(self.poll_interval, remaining))
 
     async def reacquire(self) -> Self:
         present = await self._is_held_by_me()
@@ -127,7 +333,10 @@ class RedisSemaphore:
         await self.redis.expire(self.key, int(self.ttl) * 2)
 
     async def release(self) -> None:
-        await self.redis.zrem(self.key, self.token)
+        await self._release_script(
+            keys=[self.key, self.wakeup_key],
+            args=[self.token, int(self.capacity), self._key_ttl],
+        )
 
     async def __aenter__(self) -> Self:
         await self.acquire()
@@ -136,42 +345,23 @@ class RedisSemaphore:
     async def __aexit__(self, exc_type, exc_val, exc_tb):
         await self.release()
 
+    @property
+    def _key_ttl(self) -> int:
+        return max(int(self.ttl) * 2, 5)
+
     async def _try_acquire_once(self) -> bool:
         now_ts = int(utcnow().timestamp())
         expires_at = now_ts + int(self.ttl)
 
-        # Meow :3
-        lua = """
-        local key = KEYS[1]
-        local token = ARGV[1]
-        local now = tonumber(ARGV[2])
-        local expires_at = tonumber(ARGV[3])
-        local capacity = tonumber(ARGV[4])
-        local key_ttl = tonumber(ARGV[5])
-
-        -- remove expired tokens
-        redis.call('ZREMRANGEBYSCORE', key, '-inf', now)
-
-        local count = redis.call('ZCARD', key)
-        if count < capacity then
-            redis.call('ZADD', key, expires_at, token)
-            redis.call('EXPIRE', key, key_ttl)
-            return 1
-        end
-        return 0
-        """
-
-        key_ttl = max(int(self.ttl) * 2, 5)
-
-        res = await self.redis.eval(
-            lua,
-            1,
-            self.key,
-            self.token,
-            now_ts,
-            expires_at,
-            int(self.capacity),
-            key_ttl,
+        res = await self._acquire_script(
+            keys=[self.key],
+            args=[
+                self.token,
+                now_ts,
+                expires_at,
+                int(self.capacity),
+                self._key_ttl,
+            ],
         )
         return bool(res)
 
@@ -180,4 +370,233 @@ class RedisSemaphore:
         if score is None:
             return False
         now_ts = int(utcnow().timestamp())
-        return float(score) > now_ts
\ No newline at end of file
+        return float(score) > now_ts
+
+
+
+class RedisTokenBucket:
+
+    _acquire_lua = """
+    local key = KEYS[1]
+    local max_rate = tonumber(ARGV[1])
+    local burst = tonumber(ARGV[2])
+    local key_ttl = tonumber(ARGV[3])
+
+    local t = redis.call('TIME')
+    local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+
+    local state = redis.call('HMGET', key, 'tokens', 'ts', 'rate', 'blocked_until')
+    local tokens = tonumber(state[1]) or burst
+    local ts = tonumber(state[2]) or now
+    local rate = tonumber(state[3]) or max_rate
+    local blocked_until = tonumber(state[4]) or 0
+
+    tokens = math.min(burst, tokens + math.max(now - ts, 0) * rate)
+
+    local wait = 0
+    if now < blocked_until then
+        wait = blocked_until - now
+    elseif tokens >= 1 then
+        tokens = tokens - 1
+        redis.call('HINCRBY', key, 'granted_total', 1)
+    else
+        wait = (1 - tokens) / rate
+    end
+
+    redis.call('HSET', key, 'tokens', tokens, 'ts', now, 'rate', rate)
+    redis.call('EXPIRE', key, key_ttl)
+    return tostring(wait)
+    """
+
+    # AIMD: additive increase on success, multiplicative decrease on throttling
+    _feedback_lua = """
+    local key = KEYS[1]
+    local throttled = tonumber(ARGV[1])
+    local retry_after = tonumber(ARGV[2])
+    local max_rate = tonumber(ARGV[3])
+    local min_rate = tonumber(ARGV[4])
+    local increase = tonumber(ARGV[5])
+    local decrease = tonumber(ARGV[6])
+    local key_ttl = tonumber(ARGV[7])
+
+    local t = redis.call('TIME')
+    local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+
+    local rate = tonumber(redis.call('HGET', key, 'rate')) or max_rate
+    if throttled == 1 then
+        rate = math.max(min_rate, rate * decrease)
+        local blocked_until = tonumber(redis.call('HGET', key, 'blocked_until')) or 0
+        redis.call('HSET', key, 'blocked_until', math.max(blocked_until, now + retry_after))
+        redis.call('HINCRBY', key, 'throttled_total', 1)
+    else
+        rate = math.min(max_rate, rate + increase)
+    end
+
+    redis.call('HSET', key, 'rate', rate)
+    redis.call('EXPIRE', key, key_ttl)
+    return tostring(rate)
+    """
+
+    def __init__(
+        self,
+        key: str,
+        rate: float,
+        burst: int,
+        min_rate: float | None = None,
+        rate_increase: float = 0.05,
+        rate_decrease: float = 0.5,
+        timeout: int | None = None,
+    ):
+        self.key = key
+        self.rate = rate
+        self.burst = burst
+        self.min_rate = min_rate if min_rate is not None else rate / 10
+        self.rate_increase = rate_increase
+        self.rate_decrease = rate_decrease
+        self.timeout = timeout if timeout is not None else REDIS_LOCK_TIMEOUT
+        self.redis = get_redis()
+
+        self._acquire_script = self.redis.register_script(self._acquire_lua)
+        self._feedback_script = self.redis.register_script(self._feedback_lua)
+        self._key_ttl = max(int(self.burst / self.min_rate) * 2, 60)
+
+    async def acquire(self) -> None:
+        timeout_dt = utcnow() + datetime.timedelta(seconds=self.timeout)
+
+        while True:
+            wait = float(await self._acquire_script(keys=[self.key], args=[self.rate, self.burst, self._key_ttl]))
+            if wait <= 0:
+                return
+
+            if utcnow() + datetime.timedelta(seconds=wait) > timeout_dt:
+                raise RedisLockException(f"Token bucket {self.key} exhausted. Timeout expired")
+
+            logger.debug(f"RedisTokenBucket: awaiting token for {self.key} ({wait:.3f}s)")
+            await asyncio.sleep(wait)
+
+    async def on_success(self) -> None:
+        await self._feedback(throttled=False)
+
+    async def on_throttled(self, retry_after: float | None = None) -> None:
+        rate = await self._feedback(throttled=True, retry_after=retry_after or 0)
+        logger.warning(f"RedisTokenBucket: {self.key} throttled, rate decreased to {rate:.3f}/s")
+
+    async def metrics(self) -> dict[str, float]:
+        state = await self.redis.hgetall(self.key)
+
+        return {
+            "rate": float(state.get("rate", self.rate)),
+            "max_rate": self.rate,
+            "min_rate": self.min_rate,
+            "burst": self.burst,
+            "tokens": float(state.get("tokens", self.burst)),
+            "granted_total": int(state.get("granted_total", 0)),
+            "throttled_total": int(state.get("throttled_total", 0)),
+        }
+
+    async def _feedback(self, throttled: bool, retry_after: float = 0) -> float:
+        rate = await self._feedback_script(
+            keys=[self.key],
+            args=[
+                int(throttled),
+                retry_after,
+                self.rate,
+                self.min_rate,
+                self.rate_increase,
+                self.rate_decrease,
+                self._key_ttl,
+            ],
+        )
+        return float(rate)
+
+
+class RedisCircuitBreaker:
+
+    _allow_lua = """
+    local open_key = KEYS[1]
+    local failures_key = KEYS[2]
+    local probe_key = KEYS[3]
+    local threshold = tonumber(ARGV[1])
+    local reset_ms = tonumber(ARGV[2])
+
+    local open_ttl = redis.call('PTTL', open_key)
+    if open_ttl > 0 then
+        return open_ttl
+    end
+
+    local failures = tonumber(redis.call('GET', failures_key) or '0')
+    if failures < threshold then
+        return 0
+    end
+
+    -- half-open: a single probe goes through, the rest wait for its outcome
+    if redis.call('SET', probe_key, 1, 'NX', 'PX', reset_ms) then
+        return 0
+    end
+    return math.max(redis.call('PTTL', probe_key), 1)
+    """
+
+    _failure_lua = """
+    local open_key = KEYS[1]
+    local failures_key = KEYS[2]
+    local probe_key = KEYS[3]
+    local threshold = tonumber(ARGV[1])
+    local reset_ms = tonumber(ARGV[2])
+    local key_ttl_ms = tonumber(ARGV[3])
+
+    local failures = redis.call('INCR', failures_key)
+    redis.call('PEXPIRE', failures_key, key_ttl_ms)
+    redis.call('DEL', probe_key)
+
+    if failures >= threshold then
+        redis.call('SET', open_key, 1, 'PX', reset_ms)
+    end
+    return failures
+    """
+
+    def __init__(self, key: str, failure_threshold: int, reset_timeout: float):
+        self.key = key
+        self.open_key = f"{key}:open"
+        self.failures_key = f"{key}:failures"
+        self.probe_key = f"{key}:probe"
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.redis = get_redis()
+
+        self._allow_script = self.redis.register_script(self._allow_lua)
+        self._failure_script = self.redis.register_script(self._failure_lua)
+
+    @property
+    def _keys(self) -> list[str]:
+        return [self.open_key, self.failures_key, self.probe_key]
+
+    @property
+    def _reset_ms(self) -> int:
+        return max(int(self.reset_timeout * 1000), 1)
+
+    async def retry_in(self) -> float:
+        # 0 when a call may go through, otherwise seconds until the circuit half-opens
+        wait_ms = await self._allow_script(keys=self._keys, args=[self.failure_threshold, self._reset_ms])
+        return int(wait_ms) / 1000
+
+    async def on_success(self) -> None:
+        await self.redis.delete(*self._keys)
+
+    async def on_failure(self) -> int:
+        failures = int(await self._failure_script(
+            keys=self._keys,
+            args=[self.failure_threshold, self._reset_ms, self._reset_ms * 10],
+        ))
+        if failures == self.failure_threshold:
+            logger.warning(f"RedisCircuitBreaker: {self.key} opened after {failures} consecutive failures")
+        return failures
+
+    async def state(self) -> dict[str, float]:
+        open_ttl, failures = await asyncio.gather(
+            self.redis.pttl(self.open_key),
+            self.redis.get(self.failures_key),
+        )
+        return {
+            "failures": int(failures or 0),
+            "open_for": max(int(open_ttl), 0) / 1000,
+        }
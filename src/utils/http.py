@@ -0,0 +1,172 @@
+import asyncio
+import logging
+import threading
+import weakref
+from collections import Counter
+from types import SimpleNamespace
+
+import aiohttp
+
+from conf.http import (
+    HTTP_MAX_CONNECTIONS,
+    HTTP_MAX_CONNECTIONS_PER_HOST,
+    HTTP_KEEPALIVE_TIMEOUT,
+    HTTP_DNS_CACHE_TTL,
+    HTTP_CONNECT_TIMEOUT,
+    HTTP_POOL_STATS_TTL,
+)
+from utils.metrics import publish_process_stats, collect_process_stats
+
+logger = logging.getLogger(__name__)
+
+
+class HTTPClientPool:
+    stats_name = "http-pool"
+
+    # every pool of the process by name, for stats and shutdown
+    _pools: dict[str, "HTTPClientPool"] = {}
+    _stats_dirty = False
+
+    def __init__(
+        self,
+        name: str,
+        limit: int = HTTP_MAX_CONNECTIONS,
+        limit_per_host: int = HTTP_MAX_CONNECTIONS_PER_HOST,
+        total_timeout: float | None = None,
+        connect_timeout: float | None = HTTP_CONNECT_TIMEOUT,
+        read_timeout: float | None = None,
+        keepalive_timeout: float = HTTP_KEEPALIVE_TIMEOUT,
+        dns_cache_ttl: int = HTTP_DNS_CACHE_TTL,
+    ) -> None:
+        self.name = name
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self.timeout = aiohttp.ClientTimeout(total=total_timeout, connect=connect_timeout, sock_read=read_timeout)
+        self.keepalive_timeout = keepalive_timeout
+        self.dns_cache_ttl = dns_cache_ttl
+
+        # aiohttp sessions are bound to the loop they were created on
+        self._sessions: weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, aiohttp.ClientSession] = (
+            weakref.WeakKeyDictionary()
+        )
+        self._counters: Counter[str] = Counter()
+        # the io worker runs a loop per thread, all of them share the pool
+        self._lock = threading.Lock()
+
+        self._pools[name] = self
+
+    async def get_session(self) -> aiohttp.ClientSession:
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            session = self._sessions.get(loop)
+            if session is None or session.closed:
+                session = aiohttp.ClientSession(
+                    timeout=self.timeout,
+                    connector=aiohttp.TCPConnector(
+                        limit=self.limit,
+                        limit_per_host=self.limit_per_host,
+                        keepalive_timeout=self.keepalive_timeout,
+                        ttl_dns_cache=self.dns_cache_ttl,
+                        use_dns_cache=True,
+                    ),
+                    trace_configs=[self._trace_config()],
+                )
+                self._sessions[loop] = session
+                self._counters["sessions_created"] += 1
+        return session
+
+    async def close(self) -> None:
+        with self._lock:
+            session = self._sessions.pop(asyncio.get_running_loop(), None)
+        if session and not session.closed:
+            await session.close()
+
+    def stats(self) -> dict[str, int | float]:
+        with self._lock:
+            counters = self._counters.copy()
+        connections = counters["connections_created"] + counters["connections_reused"]
+        return {
+            "limit": self.limit,
+            "limit_per_host": self.limit_per_host,
+            "requests": counters["requests"],
+            "in_flight": counters["requests"] - counters["requests_finished"] - counters["requests_failed"],
+            "requests_failed": counters["requests_failed"],
+            "connections_created": counters["connections_created"],
+            "connections_reused": counters["connections_reused"],
+            "connection_reuse_ratio": counters["connections_reused"] / connections if connections else 0,
+            "connection_queued_seconds": counters["connection_queued_seconds"],
+            "dns_cache_hits": counters["dns_cache_hits"],
+            "dns_cache_misses": counters["dns_cache_misses"],
+            "sessions_created": counters["sessions_created"],
+        }
+
+    def _trace_config(self) -> aiohttp.TraceConfig:
+        loop_time = asyncio.get_running_loop().time
+
+        def _add(name: str, value: float) -> None:
+            with self._lock:
+                self._counters[name] += value
+            HTTPClientPool._stats_dirty = True
+
+        async def _count(name: str) -> None:
+            _add(name, 1)
+
+        async def on_request_start(*_) -> None:
+            await _count("requests")
+
+        async def on_request_end(*_) -> None:
+            await _count("requests_finished")
+
+        async def on_request_exception(*_) -> None:
+            await _count("requests_failed")
+
+        async def on_connection_queued_start(_, context: SimpleNamespace, __) -> None:
+            context.queued_at = loop_time()
+
+        async def on_connection_queued_end(_, context: SimpleNamespace, __) -> None:
+            _add("connection_queued_seconds", loop_time() - context.queued_at)
+
+        async def on_connection_create_end(*_) -> None:
+            await _count("connections_created")
+
+        async def on_connection_reuseconn(*_) -> None:
+            await _count("connections_reused")
+
+        async def on_dns_cache_hit(*_) -> None:
+            await _count("dns_cache_hits")
+
+        async def on_dns_cache_miss(*_) -> None:
+            await _count("dns_cache_misses")
+
+        trace_config = aiohttp.TraceConfig()
+        trace_config.on_request_start.append(on_request_start)
+        trace_config.on_request_end.append(on_request_end)
+        trace_config.on_request_exception.append(on_request_exception)
+        trace_config.on_connection_queued_start.append(on_connection_queued_start)
+        trace_config.on_connection_queued_end.append(on_connection_queued_end)
+        trace_config.on_connection_create_end.append(on_connection_create_end)
+        trace_config.on_connection_reuseconn.append(on_connection_reuseconn)
+        trace_config.on_dns_cache_hit.append(on_dns_cache_hit)
+        trace_config.on_dns_cache_miss.append(on_dns_cache_miss)
+        return trace_config
+
+    @classmethod
+    def all_stats(cls) -> dict[str, dict[str, int | float]]:
+        return {name: pool.stats() for name, pool in cls._pools.items()}
+
+    @classmethod
+    async def close_all(cls) -> None:
+        for pool in cls._pools.values():
+            await pool.close()
+
+    @classmethod
+    async def publish_stats(cls) -> None:
+        if not cls._stats_dirty:
+            return
+
+        cls._stats_dirty = False
+        await publish_process_stats(cls.stats_name, cls.all_stats(), ttl=HTTP_POOL_STATS_TTL)
+
+    @classmethod
+    async def collect_stats(cls) -> dict[str, dict[str, dict[str, int | float]]]:
+        return await collect_process_stats(cls.stats_name, cls.all_stats())
@@ -0,0 +1,202 @@
+import json
+import logging
+import math
+import os
+import socket
+from abc import ABC, abstractmethod
+from collections.abc import Callable
+from typing import Any, ClassVar
+
+from redis.asyncio.client import Pipeline
+
+from redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 300)
+SIZE_BUCKETS = (1e5, 1e6, 1e7, 2.5e7, 5e7, 1e8, 2.5e8, 5e8, 1e9)
+PROCESS_STATS_KEY_PREFIX = "process-stats"
+METRICS_KEY_PREFIX = "metrics"
+
+
+def process_stats_key(name: str) -> str:
+    return f"{PROCESS_STATS_KEY_PREFIX}:{name}:{socket.gethostname()}:{os.getpid()}"
+
+
+async def publish_process_stats(name: str, stats: dict[str, Any], ttl: int) -> None:
+    # in-process stats of workers, made visible to the API through redis
+    try:
+        await get_redis().set(process_stats_key(name), json.dumps(stats), ex=ttl)
+    except Exception as exc:
+        logger.warning("publish_process_stats: Failed to publish %s stats: %s", name, exc)
+
+
+async def collect_process_stats(name: str, local_stats: dict[str, Any]) -> dict[str, dict[str, Any]]:
+    redis = get_redis()
+    result = {
+        process_stats_key(name): local_stats,
+    }
+
+    async for key in redis.scan_iter(match=f"{PROCESS_STATS_KEY_PREFIX}:{name}:*"):
+        if key in result:
+            continue
+        raw = await redis.get(key)
+        if raw:
+            result[key] = json.loads(raw)
+
+    return result
+
+
+class RedisHistogram:
+
+    def __init__(self, key: str, buckets: tuple[float, ...] = DEFAULT_LATENCY_BUCKETS, ttl: int | None = None):
+        self.key = key
+        self.buckets = tuple(sorted(buckets))
+        self.ttl = ttl
+        self.redis = get_redis()
+
+    async def observe(self, value: float) -> None:
+        pipe = self.redis.pipeline(transaction=False)
+        self.add_to(pipe, value)
+
+        try:
+            await pipe.execute()
+        except Exception as exc:
+            # metrics must never break the measured code path
+            logger.warning("RedisHistogram: Failed to observe %s: %s", self.key, exc)
+
+    def add_to(self, pipe: Pipeline, value: float) -> None:
+        bucket = next((b for b in self.buckets if value <= b), math.inf)
+
+        pipe.hincrby(self.key, self._bucket_field(bucket), 1)
+        pipe.hincrby(self.key, "count", 1)
+        pipe.hincrbyfloat(self.key, "sum", value)
+        if self.ttl:
+            pipe.expire(self.key, self.ttl)
+
+    async def snapshot(self) -> dict[str, float]:
+        raw = await self.redis.hgetall(self.key)
+
+        result: dict[str, float] = {}
+        cumulative = 0
+        for bucket in (*self.buckets, math.inf):
+            cumulative += int(raw.get(self._bucket_field(bucket), 0))
+            result[self._bucket_field(bucket)] = cumulative
+
+        result["count"] = int(raw.get("count", 0))
+        result["sum"] = float(raw.get("sum", 0))
+        return result
+
+    @staticmethod
+    def _bucket_field(bucket: float) -> str:
+        return "le_+Inf" if bucket == math.inf else f"le_{bucket:g}"
+
+
+class RedisMetric(ABC):
+    # a labelled prometheus metric family, aggregated in redis over every api and worker process
+    type_: ClassVar[str]
+
+    _metrics: ClassVar[dict[str, "RedisMetric"]] = {}
+
+    def __init__(self, name: str, description: str, labels: tuple[str, ...] = ()) -> None:
+        self.name = name
+        self.description = description
+        self.labels = labels
+        self.series_key = f"{METRICS_KEY_PREFIX}:{name}:series"
+
+        self._metrics[name] = self
+
+    async def render(self) -> list[str]:
+        lines = [
+            f"# HELP {self.name} {self.description}",
+            f"# TYPE {self.name} {self.type_}",
+        ]
+        for key, labels in await self._list_series():
+            lines.extend(await self._render_series(key, labels))
+
+        return lines
+
+    async def _list_series(self) -> list[tuple[str, dict[str, str]]]:
+        return [
+            (self._series_data_key(label_values), dict(zip(self.labels, json.loads(label_values))))
+            for label_values in sorted(await get_redis().smembers(self.series_key))
+        ]
+
+    async def _record(self, labels: dict[str, Any], record: Callable[[Pipeline, str], Any]) -> None:
+        label_values = json.dumps([str(labels.get(label, "")) for label in self.labels])
+
+        pipe = get_redis().pipeline(transaction=False)
+        pipe.sadd(self.series_key, label_values)
+        record(pipe, self._series_data_key(label_values))
+
+        try:
+            await pipe.execute()
+        except Exception as exc:
+            logger.warning("RedisMetric: Failed to record %s: %s", self.name, exc)
+
+    def _series_data_key(self, label_values: str) -> str:
+        return f"{METRICS_KEY_PREFIX}:{self.name}:{label_values}"
+
+    @abstractmethod
+    async def _render_series(self, key: str, labels: dict[str, str]) -> list[str]:
+        pass
+
+    @staticmethod
+    def _format_labels(labels: dict[str, str]) -> str:
+        if not labels:
+            return ""
+
+        def escape(value: str) -> str:
+            return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+        return "{" + ",".join(f'{name}="{escape(value)}"' for name, value in labels.items()) + "}"
+
+    @classmethod
+    async def render_all(cls) -> str:
+        lines = []
+        for metric in cls._metrics.values():
+            lines.extend(await metric.render())
+
+        return "\n".join(lines) + "\n"
+
+
+class RedisCounterMetric(RedisMetric):
+    type_ = "counter"
+
+    async def inc(self, amount: float = 1, **labels: Any) -> None:
+        await self._record(labels, lambda pipe, key: pipe.incrbyfloat(key, amount))
+
+    async def _render_series(self, key: str, labels: dict[str, str]) -> list[str]:
+        value = float(await get_redis().get(key) or 0)
+
+        return [f"{self.name}{self._format_labels(labels)} {value!r}"]
+
+
+class RedisHistogramMetric(RedisMetric):
+    type_ = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        description: str,
+        labels: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = DEFAULT_LATENCY_BUCKETS,
+    ) -> None:
+        super().__init__(name, description, labels)
+        self.buckets = tuple(sorted(buckets))
+
+    async def observe(self, value: float, **labels: Any) -> None:
+        await self._record(labels, lambda pipe, key: RedisHistogram(key, self.buckets).add_to(pipe, value))
+
+    async def _render_series(self, key: str, labels: dict[str, str]) -> list[str]:
+        snapshot = await RedisHistogram(key, self.buckets).snapshot()
+
+        lines = []
+        for bucket in (*self.buckets, math.inf):
+            le = "+Inf" if bucket == math.inf else f"{bucket:g}"
+            bucket_labels = self._format_labels({**labels, "le": le})
+            lines.append(f"{self.name}_bucket{bucket_labels} {snapshot[RedisHistogram._bucket_field(bucket)]}")
+
+        lines.append(f"{self.name}_sum{self._format_labels(labels)} {snapshot['sum']!r}")
+        lines.append(f"{self.name}_count{self._format_labels(labels)} {snapshot['count']}")
+        return lines